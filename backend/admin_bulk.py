@@ -0,0 +1,379 @@
+"""
+管理批量操作
+从 CSV / JSONL 流式读取操作记录，每 BULK_BATCH_SIZE 条在一个 json_store 事务内应用
+（每个文件每批只读写一次），每批提交后逐条输出结果。输入与结果都按批处理，
+内存占用只与批大小和存储文件本身有关。
+
+操作（记录的 op 字段，CSV 无 op 列时用 --op 指定）:
+  create_code     code, module, [max_uses=1, 上限 MAX_CODE_USES], [expires_at]
+  revoke_code     code
+  activate_code   code
+  grant_access    user (邮箱或 id), module, [days=30, 上限 MAX_ACCESS_DAYS], [code]
+  revoke_access   user, [module]（缺省时移除全部模块）
+  deactivate_user user
+  activate_user   user
+
+结果每行一条: {"line", "op", "key", "status": ok|unchanged|error, "error"}
+
+用法:
+  python admin_bulk.py apply leaked.csv --op revoke_code > results.jsonl
+  python admin_bulk.py apply grants.jsonl --format jsonl
+  python admin_bulk.py export stats
+  python admin_bulk.py export codes --format csv > codes.csv
+"""
+import io
+import os
+import sys
+import csv
+import json
+import argparse
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Iterable, Iterator, Any, TextIO
+
+# 添加当前目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import MODULE_CONFIG, BULK_BATCH_SIZE
+import json_store
+
+FORMATS = ('csv', 'jsonl')
+# 整数字段的上限：授权天数（约 100 年）与赞助码可用次数
+MAX_ACCESS_DAYS = 36500
+MAX_CODE_USES = 1000000
+STORE_FILES = {
+    'codes': json_store.SPONSOR_CODES_FILE,
+    'users': json_store.USERS_FILE,
+    'access': json_store.USER_ACCESS_FILE,
+}
+
+
+# ==================== 输入 ====================
+
+def read_records(stream: TextIO, fmt: str, default_op: Optional[str] = None) -> Iterator[tuple]:
+    """逐条产出 (行号, 记录, 解析错误)；CSV 空字段视为未提供，行号按数据行计（表头为第 1 行）"""
+    if fmt == 'csv':
+        for line_no, record in enumerate(csv.DictReader(stream), 2):
+            record = {k.strip(): (v.strip() or None) for k, v in record.items() if k and v is not None}
+            record['op'] = record.get('op') or default_op
+            yield line_no, record, None
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('record must be a JSON object')
+        except ValueError as e:
+            yield line_no, None, f'invalid JSON: {e}'
+            continue
+        if record.get('op') is not None and not isinstance(record['op'], str):
+            yield line_no, None, 'op must be a string'
+            continue
+        record['op'] = record.get('op') or default_op
+        yield line_no, record, None
+
+
+# ==================== 操作 ====================
+
+class _Stores:
+    """一个批次事务内的存储视图；用户 id -> 邮箱索引按需构建一次"""
+
+    def __init__(self, data: Dict[str, Dict]):
+        self.data = data
+        self._emails = None
+
+    def __getitem__(self, name: str) -> Dict:
+        return self.data[name]
+
+    def user_email(self, user: Any) -> str:
+        """邮箱或数字 id -> users 文件中的键"""
+        users = self.data['users']
+        if isinstance(user, bool):
+            raise ValueError('user must be an email or numeric id')
+        if isinstance(user, int) or str(user).isdigit():
+            if self._emails is None:
+                self._emails = {info.get('id'): email for email, info in users.items()}
+            email = self._emails.get(int(user))
+        else:
+            email = str(user).lower()
+        if email not in users:
+            raise ValueError(f'user {user} not found')
+        return email
+
+    def user_id(self, user: Any) -> int:
+        return self.data['users'][self.user_email(user)]['id']
+
+
+def _require(record: Dict, *fields: str):
+    missing = [f for f in fields if not record.get(f)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+
+def _bounded_int(record: Dict, field: str, default: int, maximum: int) -> int:
+    """可选的正整数字段，取值须在 1..maximum"""
+    value = record.get(field)
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        raise ValueError(f'{field} must be an integer')
+    try:
+        number = int(value)
+    except OverflowError:
+        raise ValueError(f'{field} out of range')
+    if not 1 <= number <= maximum:
+        raise ValueError(f'{field} must be between 1 and {maximum}')
+    return number
+
+
+def _module(record: Dict) -> str:
+    module = str(record['module']).lower()
+    if module not in MODULE_CONFIG:
+        raise ValueError(f'unknown module {module}')
+    return module
+
+
+def _create_code(stores: _Stores, record: Dict) -> str:
+    _require(record, 'code', 'module')
+    codes = stores['codes']
+    code = str(record['code']).upper()
+    if code in codes:
+        raise ValueError('code already exists')
+    codes[code] = {
+        'module': _module(record),
+        'max_uses': _bounded_int(record, 'max_uses', 1, MAX_CODE_USES),
+        'current_uses': 0,
+        'is_active': True,
+        'created_at': datetime.utcnow().isoformat(),
+        'expires_at': record.get('expires_at')
+    }
+    return 'ok'
+
+
+def _set_code_active(active: bool):
+    def apply(stores: _Stores, record: Dict) -> str:
+        _require(record, 'code')
+        info = stores['codes'].get(str(record['code']).upper())
+        if info is None:
+            raise ValueError('code not found')
+        if info.get('is_active', True) == active:
+            return 'unchanged'
+        info['is_active'] = active
+        return 'ok'
+    return apply
+
+
+def _grant_access(stores: _Stores, record: Dict) -> str:
+    """新增模块权限；已有该模块时把到期时间延长到两者中较晚的一个"""
+    _require(record, 'user', 'module')
+    module = _module(record)
+    entries = stores['access'].setdefault(str(stores.user_id(record['user'])), [])
+    expires_at = (datetime.utcnow() + timedelta(days=_bounded_int(record, 'days', 30, MAX_ACCESS_DAYS))).isoformat()
+    for entry in entries:
+        if entry['module'] == module:
+            if entry.get('expires_at') is None or entry['expires_at'] >= expires_at:
+                return 'unchanged'
+            entry['expires_at'] = expires_at
+            return 'ok'
+    entries.append({
+        'module': module,
+        'sponsor_code': str(record.get('code') or 'ADMIN').upper(),
+        'activated_at': datetime.utcnow().isoformat(),
+        'expires_at': expires_at
+    })
+    return 'ok'
+
+
+def _revoke_access(stores: _Stores, record: Dict) -> str:
+    _require(record, 'user')
+    module = _module(record) if record.get('module') else None
+    key = str(stores.user_id(record['user']))
+    entries = stores['access'].get(key, [])
+    kept = [e for e in entries if module is not None and e['module'] != module]
+    if len(kept) == len(entries):
+        return 'unchanged'
+    stores['access'][key] = kept
+    return 'ok'
+
+
+def _set_user_active(active: bool):
+    def apply(stores: _Stores, record: Dict) -> str:
+        _require(record, 'user')
+        info = stores['users'][stores.user_email(record['user'])]
+        if info.get('is_active', True) == active:
+            return 'unchanged'
+        info['is_active'] = active
+        return 'ok'
+    return apply
+
+
+# op -> (写入的存储, 只读的存储, 处理函数, 结果中的主键字段)
+OPERATIONS = {
+    'create_code': (('codes',), (), _create_code, 'code'),
+    'revoke_code': (('codes',), (), _set_code_active(False), 'code'),
+    'activate_code': (('codes',), (), _set_code_active(True), 'code'),
+    'grant_access': (('access',), ('users',), _grant_access, 'user'),
+    'revoke_access': (('access',), ('users',), _revoke_access, 'user'),
+    'deactivate_user': (('users',), (), _set_user_active(False), 'user'),
+    'activate_user': (('users',), (), _set_user_active(True), 'user'),
+}
+
+
+def _apply_batch(batch: List[tuple]) -> List[Dict[str, Any]]:
+    """在一个事务内应用一批记录；单条失败只影响该条结果"""
+    ops = {record['op'] for _, record, _ in batch if record and record.get('op') in OPERATIONS}
+    writes = {name for op in ops for name in OPERATIONS[op][0]}
+    names = sorted(writes | {name for op in ops for name in OPERATIONS[op][1]})
+    readonly = [STORE_FILES[n] for n in names if n not in writes]
+
+    results = []
+    with json_store.transaction(*(STORE_FILES[n] for n in names), readonly=readonly) as data:
+        stores = _Stores(dict(zip(names, data)))
+        for line_no, record, error in batch:
+            op = record.get('op') if record else None
+            result = {'line': line_no, 'op': op, 'key': None, 'status': 'error'}
+            if error is None and op not in OPERATIONS:
+                error = f'unknown op {op}' if op else 'missing op'
+            if error is None:
+                handler, key_field = OPERATIONS[op][2:]
+                result['key'] = record.get(key_field)
+                try:
+                    result['status'] = handler(stores, record)
+                except (ValueError, TypeError, OverflowError) as e:
+                    error = str(e)
+            if error is not None:
+                result['error'] = error
+            results.append(result)
+    return results
+
+
+def apply_records(records: Iterable[tuple], batch_size: int = BULK_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """分批应用 read_records 产出的记录，每批提交后逐条产出结果"""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, max(1, batch_size)))
+        if not batch:
+            return
+        yield from _apply_batch(batch)
+
+
+def apply_stream(stream: TextIO, fmt: str, default_op: Optional[str] = None,
+                 batch_size: int = BULK_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    return apply_records(read_records(stream, fmt, default_op), batch_size)
+
+
+# ==================== 导出 ====================
+
+EXPORT_KINDS = ('codes', 'users', 'access', 'stats')
+
+
+def _is_expired(expires_at: Optional[str], now: str) -> bool:
+    return bool(expires_at) and expires_at.replace('Z', '') < now
+
+
+def export_rows(kind: str) -> Iterator[Dict[str, Any]]:
+    """逐行产出导出数据；用户导出不含密码哈希"""
+    now = datetime.utcnow().isoformat()
+    if kind == 'codes':
+        for code, info in json_store.get_all_sponsor_codes().items():
+            yield {'code': code, **{k: info.get(k) for k in
+                                    ('module', 'max_uses', 'current_uses', 'is_active', 'created_at', 'expires_at')}}
+    elif kind == 'users':
+        for email, info in json_store.get_all_users().items():
+            yield {'id': info.get('id'), 'email': email, 'created_at': info.get('created_at'),
+                   'trial_expires_at': info.get('trial_expires_at'), 'is_active': info.get('is_active', True)}
+    elif kind == 'access':
+        for user_id, entries in json_store.get_all_user_access().items():
+            for entry in entries:
+                yield {'user_id': int(user_id), **entry, 'expired': _is_expired(entry.get('expires_at'), now)}
+    elif kind == 'stats':
+        # 各模块兑换统计
+        stats = {m: {'module': m, 'codes': 0, 'active_codes': 0, 'used_codes': 0, 'redemptions': 0,
+                     'active_entitlements': 0, 'expired_entitlements': 0} for m in MODULE_CONFIG}
+        for info in json_store.get_all_sponsor_codes().values():
+            row = stats.get(info.get('module'))
+            if row is None:
+                continue
+            row['codes'] += 1
+            row['active_codes'] += bool(info.get('is_active', True))
+            row['used_codes'] += info.get('current_uses', 0) > 0
+            row['redemptions'] += info.get('current_uses', 0)
+        for entries in json_store.get_all_user_access().values():
+            for entry in entries:
+                row = stats.get(entry.get('module'))
+                if row is not None:
+                    row['expired_entitlements' if _is_expired(entry.get('expires_at'), now)
+                        else 'active_entitlements'] += 1
+        yield from stats.values()
+    else:
+        raise ValueError(f'unknown export kind {kind}')
+
+
+# ==================== 输出 ====================
+
+def iter_output(rows: Iterable[Dict[str, Any]], fmt: str) -> Iterator[str]:
+    """把结果行编码为 JSONL 或 CSV 文本块（CSV 表头取首行字段）"""
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            fields = list(row) + (['error'] if 'status' in row and 'error' not in row else [])
+            writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream bulk admin operations against the JSON store')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('apply', help='Apply operations from a CSV / JSONL file (- for stdin)')
+    p.add_argument('input')
+    p.add_argument('--format', choices=FORMATS, help='Input format (default: from file extension)')
+    p.add_argument('--op', choices=sorted(OPERATIONS), help='Operation for records without an op field')
+    p.add_argument('--output', default='-', help='Results file (default: stdout)')
+    p.add_argument('--output-format', choices=FORMATS, default='jsonl')
+    p.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+    p = commands.add_parser('export', help='Export store contents or redemption stats')
+    p.add_argument('kind', choices=EXPORT_KINDS)
+    p.add_argument('--format', choices=FORMATS, default='jsonl')
+    p.add_argument('--output', default='-')
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        if args.command == 'export':
+            out.writelines(iter_output(export_rows(args.kind), args.format))
+            return 0
+
+        fmt = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+        source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+        counts: Dict[str, int] = {}
+
+        def counted(results):
+            for result in results:
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+                yield result
+        try:
+            out.writelines(iter_output(counted(apply_stream(source, fmt, args.op, args.batch_size)),
+                                       args.output_format))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        print(' '.join(f'{k}={v}' for k, v in sorted(counts.items())) or 'no records', file=sys.stderr)
+        return 1 if counts.get('error') else 0
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+指标状态切换告警
+数据更新时把新指标与库中上一版本逐个比较（只比较 25 行状态，不回溯历史），
+状态文本或颜色变化即记为一条 alert_events 事件，与指标表在同一事务内提交。
+服务器通过 apply_pending_deltas 更新指标，检测在替换指标表之前进行；提交后在后台线程投递。
+
+投递给 webhook 订阅者：
+  - 合并：每个订阅者一次只发一个请求，携带其游标之后的全部事件；
+    同一指标的多次切换合并为一条净变化（首个 from -> 最后的 to），来回切换抵消后不发送
+  - 分批：单个请求最多 ALERT_BATCH_SIZE 条
+  - 并发上限：ALERT_MAX_CONCURRENCY 个订阅者同时投递
+  - 重试：单次投递内按带抖动的指数退避重试 ALERT_MAX_RETRIES 次；仍失败则保留游标，
+    按连续失败次数推迟下次投递（最长 ALERT_BACKOFF_MAX_SECONDS）
+
+用法:
+  python alerts.py subscribe http://127.0.0.1:8901/hook --metrics curve,vix --secret s3cret
+  python alerts.py list
+  python alerts.py events --limit 20
+  python alerts.py dispatch               # 投递积压事件（数据更新后会自动调用）
+  python alerts.py unsubscribe 3
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import random
+import hashlib
+import argparse
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union, Any
+import requests
+
+# 添加当前目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import (ALERT_MAX_CONCURRENCY, ALERT_MAX_RETRIES, ALERT_BATCH_SIZE, ALERT_TIMEOUT,
+                    ALERT_BACKOFF_MAX_SECONDS, logger)
+from models import init_db, Session, Metric, AlertEvent, AlertSubscriber
+from telemetry import ALERT_DELIVERIES
+
+SIGNATURE_HEADER = 'X-Alert-Signature'
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+# ==================== 检测 ====================
+
+def detect_transitions(session, metrics_buffer: List[Union[Metric, Dict[str, Any]]]) -> List[AlertEvent]:
+    """
+    与库中现有状态比较，返回状态发生切换的事件（尚未加入会话）；首次出现的指标不产生事件
+    metrics_buffer 可以是 Metric 对象（update_metrics）或指标行字典（delta 中的 metrics），须在替换指标表之前调用
+    """
+    previous = {row.id: (row.status_text, row.status_color)
+                for row in session.query(Metric.id, Metric.status_text, Metric.status_color)}
+    events = []
+    for m in metrics_buffer:
+        row = m if isinstance(m, dict) else {field: getattr(m, field) for field in
+                                             ('id', 'status_text', 'status_color', 'value', 'history_json')}
+        before = previous.get(row['id'])
+        if before is None or before == (row['status_text'], row['status_color']):
+            continue
+        history = json.loads(row['history_json']) if row.get('history_json') else []
+        events.append(AlertEvent(
+            metric_id=row['id'],
+            from_status=before[0], from_color=before[1],
+            to_status=row['status_text'], to_color=row['status_color'],
+            value=float(row['value']) if row.get('value') is not None else None,
+            data_date=history[-1]['date'] if history else None,
+        ))
+    return events
+
+
+def record_transitions(session, metrics_buffer: List[Union[Metric, Dict[str, Any]]]) -> int:
+    """检测并写入状态切换事件，由调用方随指标更新一起提交"""
+    events = detect_transitions(session, metrics_buffer)
+    session.add_all(events)
+    for e in events:
+        logger.info(f"Status transition {e.metric_id}: {e.from_status} -> {e.to_status}")
+    return len(events)
+
+
+# ==================== 投递 ====================
+
+def _event_dict(e: AlertEvent) -> Dict[str, Any]:
+    return {
+        'id': e.id,
+        'metric': e.metric_id,
+        'from': {'status': e.from_status, 'color': e.from_color},
+        'to': {'status': e.to_status, 'color': e.to_color},
+        'value': e.value,
+        'dataDate': e.data_date,
+        'createdAt': e.created_at.isoformat() if e.created_at else None
+    }
+
+
+def coalesce(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """同一指标的多次切换合并为净变化；状态回到起点的指标被丢弃"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for e in events:
+        current = merged.get(e['metric'])
+        if current is None:
+            merged[e['metric']] = dict(e, eventIds=[e['id']])
+        else:
+            current.update(to=e['to'], value=e['value'], dataDate=e['dataDate'],
+                           createdAt=e['createdAt'], id=e['id'])
+            current['eventIds'].append(e['id'])
+    return [e for e in merged.values() if e['from'] != e['to']]
+
+
+def sign(secret: str, body: bytes) -> str:
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def _post(http: requests.Session, url: str, body: bytes, secret: Optional[str]):
+    """POST 一个批次，可重试错误按退避重试，最终失败时抛出异常"""
+    headers = {'Content-Type': 'application/json'}
+    if secret:
+        headers[SIGNATURE_HEADER] = sign(secret, body)
+    for attempt in range(ALERT_MAX_RETRIES + 1):
+        try:
+            response = http.post(url, data=body, headers=headers, timeout=ALERT_TIMEOUT)
+            if response.status_code < 400:
+                return
+            error = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+            if response.status_code not in RETRYABLE_STATUS:
+                raise error
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt < ALERT_MAX_RETRIES:
+            ALERT_DELIVERIES.labels('retry').inc()
+            time.sleep(random.uniform(0, min(8.0, 0.5 * (2 ** attempt))))
+    raise error
+
+
+def deliver(sub: Dict[str, Any], events: List[Dict[str, Any]], http: requests.Session) -> Dict[str, Any]:
+    """
+    投递单个订阅者的积压事件，返回 {'cursor', 'sent', 'error'}
+    每批成功后游标前进到该批最大事件 id；失败时停在已成功的位置
+    """
+    wanted = set(sub['metrics'].split(',')) if sub['metrics'] else None
+    pending = [e for e in events if e['id'] > sub['cursor']]
+    cursor, sent = sub['cursor'], 0
+    for i in range(0, len(pending), ALERT_BATCH_SIZE):
+        batch = pending[i:i + ALERT_BATCH_SIZE]
+        items = coalesce([e for e in batch if wanted is None or e['metric'] in wanted])
+        if items:
+            body = json.dumps({'subscriber': sub['id'], 'count': len(items), 'events': items},
+                              ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            try:
+                _post(http, sub['url'], body, sub['secret'])
+            except Exception as e:
+                ALERT_DELIVERIES.labels('failed').inc()
+                return {'cursor': cursor, 'sent': sent, 'error': str(e)[:500]}
+            ALERT_DELIVERIES.labels('delivered').inc()
+            sent += len(items)
+        cursor = batch[-1]['id']
+    return {'cursor': cursor, 'sent': sent, 'error': None}
+
+
+def dispatch_pending(max_workers: int = ALERT_MAX_CONCURRENCY) -> Dict[str, int]:
+    """向所有到期的订阅者投递积压事件，返回投递统计"""
+    session = Session()
+    try:
+        now = datetime.datetime.utcnow()
+        head = session.query(AlertEvent.id).order_by(AlertEvent.id.desc()).limit(1).scalar() or 0
+        subscribers = [s for s in session.query(AlertSubscriber).filter(AlertSubscriber.is_active == 1)
+                       if s.cursor < head and (s.next_attempt_at is None or s.next_attempt_at <= now)]
+        if not subscribers:
+            return {'subscribers': 0, 'events': 0, 'failed': 0}
+
+        # 一次读出所有订阅者尚未收到的事件，按订阅者在内存中过滤
+        low = min(s.cursor for s in subscribers)
+        events = [_event_dict(e) for e in
+                  session.query(AlertEvent).filter(AlertEvent.id > low).order_by(AlertEvent.id)]
+        jobs = [{'id': s.id, 'url': s.url, 'metrics': s.metrics, 'secret': s.secret, 'cursor': s.cursor}
+                for s in subscribers]
+
+        http = requests.Session()
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            results = list(pool.map(lambda job: deliver(job, events, http), jobs))
+
+        sent = failed = 0
+        for sub, result in zip(subscribers, results):
+            sub.cursor = result['cursor']
+            sent += result['sent']
+            if result['error']:
+                failed += 1
+                sub.failures = (sub.failures or 0) + 1
+                delay = min(ALERT_BACKOFF_MAX_SECONDS, 30 * (2 ** (sub.failures - 1)))
+                sub.next_attempt_at = now + datetime.timedelta(seconds=delay)
+                sub.last_error = result['error']
+                logger.warning(f"Alert delivery to subscriber {sub.id} failed ({result['error']}), "
+                               f"next attempt in {delay}s")
+            else:
+                sub.failures = 0
+                sub.next_attempt_at = None
+                sub.last_error = None
+        session.commit()
+        logger.info(f"Dispatched {sent} alert events to {len(subscribers) - failed}/{len(subscribers)} subscribers")
+        return {'subscribers': len(subscribers), 'events': sent, 'failed': failed}
+    finally:
+        session.close()
+
+
+_dispatch_lock = threading.Lock()
+_dispatch_again = threading.Event()
+
+
+def dispatch_in_background() -> Optional[threading.Thread]:
+    """
+    在后台线程投递积压事件，数据更新与 /api/refresh 不等待重试退避
+    已有投递在进行时只标记再投递一轮，返回 None；线程为非守护线程，命令行进程退出前会等待投递完成
+    """
+    _dispatch_again.set()
+    if not _dispatch_lock.acquire(blocking=False):
+        return None
+
+    def run():
+        while True:
+            try:
+                while _dispatch_again.is_set():
+                    _dispatch_again.clear()
+                    try:
+                        dispatch_pending()
+                    except Exception as e:
+                        logger.error(f"Alert dispatch failed: {e}")
+            finally:
+                _dispatch_lock.release()
+            # 释放锁前后到达的请求由本线程接着处理
+            if not _dispatch_again.is_set() or not _dispatch_lock.acquire(blocking=False):
+                return
+
+    thread = threading.Thread(target=run, name='alert-dispatch')
+    thread.start()
+    return thread
+
+
+# ==================== 订阅管理 ====================
+
+def add_subscriber(url: str, metrics: Optional[List[str]] = None, secret: Optional[str] = None) -> AlertSubscriber:
+    """新增订阅者；游标从当前最新事件开始，不补发历史事件"""
+    session = Session()
+    try:
+        head = session.query(AlertEvent.id).order_by(AlertEvent.id.desc()).limit(1).scalar() or 0
+        sub = AlertSubscriber(url=url, metrics=','.join(metrics) if metrics else None, secret=secret, cursor=head)
+        session.add(sub)
+        session.commit()
+        session.refresh(sub)
+        session.expunge(sub)
+        return sub
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage status-transition alert subscribers')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('subscribe', help='Register a webhook URL')
+    p.add_argument('url')
+    p.add_argument('--metrics', help='Comma separated metric ids (default: all)')
+    p.add_argument('--secret', help='Sign requests with HMAC-SHA256 using this secret')
+    p = commands.add_parser('unsubscribe', help='Deactivate a subscriber')
+    p.add_argument('id', type=int)
+    commands.add_parser('list', help='List subscribers')
+    p = commands.add_parser('events', help='Show recent transition events')
+    p.add_argument('--limit', type=int, default=20)
+    commands.add_parser('dispatch', help='Deliver pending events now')
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == 'subscribe':
+        sub = add_subscriber(args.url, args.metrics.split(',') if args.metrics else None, args.secret)
+        print(f"Subscriber {sub.id} -> {sub.url} (from event {sub.cursor})")
+    elif args.command == 'dispatch':
+        print(dispatch_pending())
+    else:
+        session = Session()
+        try:
+            if args.command == 'unsubscribe':
+                sub = session.get(AlertSubscriber, args.id)
+                if sub is None:
+                    sys.exit(f'Subscriber {args.id} not found')
+                sub.is_active = 0
+                session.commit()
+                print(f"Subscriber {args.id} deactivated")
+            elif args.command == 'list':
+                for s in session.query(AlertSubscriber).order_by(AlertSubscriber.id):
+                    state = 'active' if s.is_active else 'inactive'
+                    print(f"{s.id:>4}  {state:<8} cursor={s.cursor:<6} failures={s.failures or 0:<3} "
+                          f"metrics={s.metrics or '*'}  {s.url}" + (f"  last_error={s.last_error}" if s.last_error else ''))
+            elif args.command == 'events':
+                for e in session.query(AlertEvent).order_by(AlertEvent.id.desc()).limit(args.limit):
+                    print(f"{e.id:>6}  {e.created_at:%Y-%m-%d %H:%M}  {e.metric_id:<16} "
+                          f"{e.from_status} -> {e.to_status}  ({e.value})")
+        finally:
+            session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
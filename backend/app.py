@@ -1,22 +1,36 @@
 import sys
 import argparse
-import datetime
-import json
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from config import ORDER_MAP, META_INFO, MODULE_CONFIG
-from models import init_db, Session, Metric
+from config import MODULE_CONFIG, MODULE_METRICS
+from models import init_db, Session
 from data_fetcher import update_metrics, logger
 from routes.routes_auth import auth_bp, sponsor_bp
-from auth import require_auth, check_module_access
-from flask import g
+from routes.routes_analytics import analytics_bp
+from routes.routes_stream import stream_bp
+from routes.routes_admin import admin_bp
+from routes.routes_status import status_bp
+from auth import check_module_access
+import json_store
+from history_codec import negotiate_format, history_response
+from snapshot import current_snapshot, snapshot_response, build_dashboard_items, publish_snapshot
+from weather import module_weather, section_name
+from fred_cache import ResponseCache
+import telemetry
+import profiling
 
 app = Flask(__name__)
 CORS(app)
+telemetry.init_app(app)
+profiling.init_app(app)
 
 # 注册认证路由
 app.register_blueprint(auth_bp)
 app.register_blueprint(sponsor_bp)
+app.register_blueprint(analytics_bp)
+app.register_blueprint(stream_bp)
+app.register_blueprint(admin_bp)
+app.register_blueprint(status_bp)
 
 @app.route('/api/dashboard', methods=['GET'])
 def get_dashboard():
@@ -28,71 +42,66 @@ def get_dashboard():
     # 如果有认证头，验证权限
     if auth_header:
         from auth import decode_token
-        from models import User
         
         try:
             token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
             payload = decode_token(token)
             
             if payload:
-                session = Session()
-                user = session.query(User).filter_by(id=payload['user_id']).first()
+                user = json_store.get_user_by_id(payload['user_id'])
                 
-                if user and user.is_active:
+                if user and user.get('is_active', True):
                     # 检查模块访问权限
-                    access_info = check_module_access(user, module, session)
+                    access_info = check_module_access(user, module)
                     
                     if not access_info['allowed']:
-                        session.close()
                         return jsonify({
                             'error': '访问受限',
                             'reason': 'expired',
                             'message': f'您的{MODULE_CONFIG.get(module, {}).get("name", "该模块")}试用期已结束，请输入赞助码继续使用。',
                             'sponsor_link': MODULE_CONFIG.get(module, {}).get('sponsor_link', '')
                         }), 403
-                
-                session.close()
         except Exception as e:
             logger.error(f"Auth check error: {e}")
     
     # 获取数据（无论是否认证都返回数据，让前端处理权限）
+    # 优先从共享快照直接输出预编码的响应体
+    fmt = negotiate_format(request)
+    snap = current_snapshot()
+    if snap is not None:
+        response = snapshot_response(snap, fmt, request)
+        if response is not None:
+            return response
+
+    # 尚未生成快照时回退到数据库
     session = Session()
-    metrics = session.query(Metric).all()
-    
-    result = []
-    for mid in ORDER_MAP:
-        m = next((x for x in metrics if x.id == mid), None)
-        if m:
-            try:
-                history = json.loads(m.history_json) if m.history_json else []
-            except:
-                history = []
-            
-            meta = META_INFO.get(mid, {'formula': '未知', 'range': '未知', 'freq': '未知', 'update': '未知'})
-            
-            # 获取最新数据日期（从历史记录中）
-            data_date = history[-1]['date'] if history else None
+    try:
+        result = build_dashboard_items(session)
+    finally:
+        session.close()
+    # 支持 ?format=compact / Accept 协商紧凑列式格式
+    return history_response(result, fmt)
 
-            result.append({
-                "id": m.id,
-                "name": m.name,
-                "ticker": m.ticker,
-                "value": m.value,
-                "secondaryValue": m.secondary_value,
-                "unit": m.unit,
-                "description": m.description,
-                "statusText": m.status_text,
-                "statusColor": m.status_color,
-                "history": history,
-                "formula": meta['formula'],
-                "dataRange": meta['range'],
-                "dataDate": data_date,
-                "nextUpdateTime": meta['update'],
-                "updateFrequency": meta['freq']
-            })
-    
-    session.close()
-    return jsonify(result)
+@app.route('/api/weather', methods=['GET'])
+def get_weather():
+    """模块综合天气评分（含评分历史），随仪表盘快照预先计算"""
+    module = request.args.get('module', 'nasdaq')
+    if module not in MODULE_METRICS:
+        return jsonify({'error': '无效的模块'}), 400
+
+    snap = current_snapshot()
+    if snap is not None:
+        response = snapshot_response(snap, 'json', request, section=section_name(module))
+        if response is not None:
+            return response
+
+    # 快照缺失或不含评分时现场计算
+    session = Session()
+    try:
+        items = build_dashboard_items(session)
+    finally:
+        session.close()
+    return jsonify(module_weather(module, {item['id']: item for item in items}))
 
 @app.route('/api/refresh', methods=['POST'])
 def force_refresh():
@@ -103,15 +112,40 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Nasdaq Macro Weather Station Backend')
     parser.add_argument('--update', action='store_true', help='Update data from FRED and exit (for Cron jobs)')
     parser.add_argument('--skip-update', action='store_true', help='Skip initial data update check')
+    parser.add_argument('--profile', action='store_true',
+                        help='With --update: write a sampled flame-graph profile of the fetch run')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--asgi', action='store_true',
+                        help='Serve through the async ASGI entry point (uvicorn) instead of the Flask dev server')
+    parser.add_argument('--clear-fred-cache', nargs='*', metavar='SERIES_ID',
+                        help='Invalidate cached FRED responses (all series when none given)')
     args = parser.parse_args()
 
+    if args.clear_fred_cache is not None:
+        ResponseCache().invalidate(args.clear_fred_cache)
+        if not args.update:
+            sys.exit(0)
+
     init_db()
 
     if args.update:
         print("Running CLI Update Task...")
-        update_metrics()
+        if args.profile:
+            profiling.profile_call('update_metrics', update_metrics)
+        else:
+            update_metrics()
         print("Done.")
         sys.exit(0)
     
-    print("Starting Flask Server on port 5000...")
-    app.run(host='0.0.0.0', port=5000)
+    # 首次启动时由数据库生成快照，之后由数据更新负责发布
+    if current_snapshot() is None:
+        publish_snapshot()
+
+    if args.asgi:
+        import uvicorn
+        print(f"Starting ASGI Server on port {args.port}...")
+        uvicorn.run('asgi:app', host=args.host, port=args.port, log_level='warning')
+    else:
+        print(f"Starting Flask Server on port {args.port}...")
+        app.run(host=args.host, port=args.port)
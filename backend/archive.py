@@ -0,0 +1,136 @@
+"""
+观测序列列式归档
+每个指标一个 .npy 文件，内容为 shape=(2, n) 的 float64 数组：
+第 0 行为日期（距 1970-01-01 的天数），第 1 行为数值，两行各自连续存储。
+读取时通过内存映射直接访问，按日期二分查找切片，不做任何解析或复制。
+"""
+import os
+import threading
+import datetime
+from typing import Dict, List, Optional, Iterable
+import numpy as np
+import pandas as pd
+from config import ARCHIVE_DIR, logger
+from observation_store import load_series
+from telemetry import CACHE_REQUESTS
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+# 已映射文件缓存: metric_id -> (文件标识, ArchivedSeries)
+_maps: Dict[str, tuple] = {}
+_maps_lock = threading.Lock()
+_MAP_HITS = CACHE_REQUESTS.labels('archive_mmap', 'hit')
+_MAP_MISSES = CACHE_REQUESTS.labels('archive_mmap', 'miss')
+
+
+def _archive_path(metric_id: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f'{metric_id}.npy')
+
+
+def _to_day(value) -> float:
+    """日期 / 字符串 -> 距纪元的天数"""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    elif isinstance(value, datetime.datetime):
+        value = value.date()
+    return float((value - _EPOCH).days)
+
+
+class ArchivedSeries:
+    """内存映射的单指标序列，days / values 均为只读视图"""
+
+    def __init__(self, metric_id: str, data: np.ndarray):
+        self.metric_id = metric_id
+        self.days = data[0]
+        self.values = data[1]
+
+    def __len__(self):
+        return len(self.values)
+
+    def slice(self, start=None, end=None) -> 'ArchivedSeries':
+        """按日期闭区间 [start, end] 切片，返回视图"""
+        lo = int(np.searchsorted(self.days, _to_day(start), side='left')) if start else 0
+        hi = int(np.searchsorted(self.days, _to_day(end), side='right')) if end else len(self.days)
+        view = ArchivedSeries.__new__(ArchivedSeries)
+        view.metric_id = self.metric_id
+        view.days = self.days[lo:hi]
+        view.values = self.values[lo:hi]
+        return view
+
+    def dates(self) -> np.ndarray:
+        """日期列转为 datetime64[D]（仅此处产生一次转换）"""
+        return self.days.astype('int64').astype('datetime64[D]')
+
+    def to_series(self) -> pd.Series:
+        return pd.Series(self.values, index=pd.DatetimeIndex(self.dates()), name=self.metric_id, copy=False)
+
+
+def write_series(metric_id: str, s: pd.Series):
+    """将完整序列写入归档（先写临时文件再原子替换）"""
+    s = s.dropna().sort_index()
+    days = (pd.to_datetime(s.index).values.astype('datetime64[D]').astype('int64')).astype(np.float64)
+    data = np.vstack([days, s.to_numpy(dtype=np.float64)])
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = _archive_path(metric_id)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, data)
+    os.replace(tmp, path)
+
+
+def refresh_archive(metric_ids: Iterable[str]) -> int:
+    """从观测表重建指定指标的归档文件，返回重建数量"""
+    count = 0
+    for metric_id in sorted(set(metric_ids)):
+        s = load_series(metric_id)
+        if s.empty:
+            continue
+        write_series(metric_id, s)
+        count += 1
+    if count:
+        logger.info(f"Archived {count} series to {ARCHIVE_DIR}")
+    return count
+
+
+def open_series(metric_id: str) -> Optional[ArchivedSeries]:
+    """映射指定指标的归档；文件被替换后自动重新映射"""
+    path = _archive_path(metric_id)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    ident = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _maps.get(metric_id)
+    if cached and cached[0] == ident:
+        _MAP_HITS.inc()
+        return cached[1]
+    _MAP_MISSES.inc()
+
+    with _maps_lock:
+        cached = _maps.get(metric_id)
+        if cached and cached[0] == ident:
+            return cached[1]
+        series = ArchivedSeries(metric_id, np.load(path, mmap_mode='r'))
+        _maps[metric_id] = (ident, series)
+        return series
+
+
+def load_archived(metric_ids: List[str], start=None, end=None) -> Dict[str, pd.Series]:
+    """
+    读取多个指标的序列，优先走内存映射归档
+    尚未归档的指标回退到观测表查询
+    """
+    result = {}
+    for metric_id in metric_ids:
+        archived = open_series(metric_id)
+        if archived is not None:
+            s = archived.slice(start, end).to_series()
+        else:
+            s = load_series(metric_id, start=start)
+            if end:
+                s = s[:end]
+        if not s.empty:
+            result[metric_id] = s
+    return result
@@ -0,0 +1,240 @@
+"""
+ASGI 服务入口
+在事件循环上完成连接管理与请求体 / 响应体收发，Flask 视图（bcrypt、pandas 等阻塞计算）
+放到线程池执行。慢客户端与空闲长连接只占用协程，不再各自占住一个线程，
+单进程即可承载大量并发连接；路由与行为与 WSGI 模式完全一致。
+请求体先完整读入内存，大小受 ASGI_MAX_BODY_MB 限制，超出时返回 413。
+
+启动:
+  python app.py --asgi --port 5000
+  uvicorn asgi:app --app-dir backend --port 5000
+"""
+import io
+import sys
+import json
+import asyncio
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from config import ASGI_THREADS, ASGI_MAX_BODY_MB, STREAM_QUEUE_SIZE, logger
+from app import app as flask_app
+from stream import BROADCASTER, RESPONSE_HEADERS, hello_event, valid_module
+
+_END = object()
+
+
+def _next_chunk(iterator):
+    """取下一个非空响应块，迭代结束时返回 _END"""
+    for chunk in iterator:
+        if chunk:
+            return chunk
+    return _END
+
+
+def build_environ(scope, body: bytes) -> dict:
+    """ASGI HTTP scope + 完整请求体 -> WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1')
+        value = raw_value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+            continue
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """
+    把 WSGI 应用挂到事件循环上的 ASGI 应用
+    routes 中注册的原生协程处理器（如推送流）直接在事件循环上运行，其余请求交给 WSGI 应用
+    """
+
+    def __init__(self, wsgi_app, threads: int = ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-worker')
+        self.routes = {}
+
+    def route(self, path: str):
+        """注册原生 ASGI 处理器: async def handler(scope, receive, send)"""
+        def decorator(handler):
+            self.routes[path] = handler
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            handler = self.routes.get(scope['path'])
+            if handler is not None:
+                await handler(scope, receive, send)
+            else:
+                await self._call_wsgi(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def run_blocking(self, func, *args):
+        """在线程池中执行阻塞调用"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.run_blocking(_startup)
+                except Exception as e:
+                    logger.error(f"ASGI startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _call_wsgi(self, scope, receive, send):
+        # 请求体在事件循环上读完，慢速上传不占用线程；超过上限时不再继续读取
+        limit = ASGI_MAX_BODY_MB * 1024 * 1024
+        declared = dict(scope.get('headers', [])).get(b'content-length', b'0')
+        if declared.isdigit() and int(declared) > limit:
+            await _send_too_large(send)
+            return
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > limit:
+                await _send_too_large(send)
+                return
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        environ = build_environ(scope, b''.join(chunks))
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+            return lambda data: None
+
+        def run():
+            result = self.wsgi_app(environ, start_response)
+            iterator = iter(result)
+            # WSGI 允许在产出第一个响应块时才调用 start_response
+            return result, iterator, _next_chunk(iterator)
+
+        try:
+            result, iterator, chunk = await self.run_blocking(run)
+        except Exception as e:
+            logger.error(f"ASGI request failed: {e}")
+            await send({'type': 'http.response.start', 'status': 500,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+            await send({'type': 'http.response.body', 'body': b'Internal Server Error'})
+            return
+
+        try:
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': started['headers']})
+            # 响应体逐块写出；慢客户端只阻塞本协程
+            while chunk is not _END:
+                await send({'type': 'http.response.body', 'body': bytes(chunk), 'more_body': True})
+                chunk = await self.run_blocking(_next_chunk, iterator)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await self.run_blocking(result.close)
+
+
+async def _send_too_large(send):
+    await send({'type': 'http.response.start', 'status': 413,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'connection', b'close')]})
+    await send({'type': 'http.response.body', 'body': f'Request body exceeds {ASGI_MAX_BODY_MB} MB'.encode('utf-8')})
+
+
+def _startup():
+    """初始化数据库表，首次启动时生成仪表盘快照"""
+    from models import init_db
+    from snapshot import current_snapshot, publish_snapshot
+    init_db()
+    if current_snapshot() is None:
+        publish_snapshot()
+
+
+app = AsgiApp(flask_app.wsgi_app)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+@app.route('/api/stream')
+async def stream(scope, receive, send):
+    """SSE 推送的原生实现：每个连接只占用一个协程与一个有界队列"""
+    module = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('module', [None])[0] or None
+    cors = [(b'access-control-allow-origin', b'*')]
+    if not valid_module(module):
+        body = json.dumps({'error': '无效的模块'}, ensure_ascii=False).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': 400,
+                    'headers': [(b'content-type', b'application/json')] + cors})
+        await send({'type': 'http.response.body', 'body': body})
+        return
+
+    loop = asyncio.get_running_loop()
+    pending = asyncio.Queue()
+
+    def deliver(data: bytes) -> bool:
+        # 由广播线程调用；积压超过上限时以 None 通知协程结束连接
+        if pending.qsize() >= STREAM_QUEUE_SIZE:
+            loop.call_soon_threadsafe(pending.put_nowait, None)
+            return False
+        loop.call_soon_threadsafe(pending.put_nowait, data)
+        return True
+
+    unsubscribe = BROADCASTER.subscribe(module, deliver)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        headers = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in RESPONSE_HEADERS.items()]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers + cors})
+        await send({'type': 'http.response.body', 'body': await app.run_blocking(hello_event), 'more_body': True})
+        while True:
+            next_event = asyncio.ensure_future(pending.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                next_event.cancel()
+                return
+            data = next_event.result()
+            if data is None:
+                break
+            await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        unsubscribe()
+        disconnected.cancel()
@@ -7,17 +7,20 @@ import datetime
 from functools import wraps
 from flask import request, jsonify, g
 from config import JWT_SECRET, JWT_EXPIRATION_HOURS
+from telemetry import BCRYPT_SECONDS
 import json_store
 
 
 def hash_password(password: str) -> str:
     """使用bcrypt加密密码"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with BCRYPT_SECONDS.labels('hash').time():
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 
 def check_password(password: str, password_hash: str) -> bool:
     """验证密码"""
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    with BCRYPT_SECONDS.labels('check').time():
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
 
 
 def generate_token(user_id: int, email: str) -> str:
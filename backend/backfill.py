@@ -0,0 +1,199 @@
+"""
+历史数据回填
+按日期分段并行拉取所有 FRED 序列的完整历史，写入 raw_observations 表，
+每个分段一个批量写入事务并记录检查点，中断后重新运行会跳过已完成的分段。
+回填完成后用完整历史重新计算派生指标，补齐观测表、滚动统计与归档。
+
+用法:
+  python backfill.py                      # 全部序列，默认 4 个并发
+  python backfill.py --series DGS10 GDP --workers 8
+  python backfill.py --restart            # 清空检查点重新回填
+  python backfill.py --skip-derive        # 只回填原始序列
+"""
+import os
+import sys
+import time
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Tuple
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# 添加当前目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import FRED_SERIES_FREQ, BACKFILL_START, BACKFILL_CHUNK_YEARS, logger
+from models import init_db, engine, Session, RawObservation, BackfillChunk, MetricStats
+from data_providers import DataProvider, HttpFredProvider, get_provider
+
+Chunk = Tuple[str, datetime.date, datetime.date]
+
+
+def plan_chunks(series_ids: List[str], start: str, end: datetime.date) -> List[Chunk]:
+    """按序列频率把 [start, end] 切成若干闭区间分段"""
+    first = datetime.date.fromisoformat(start)
+    chunks = []
+    for series_id in series_ids:
+        years = BACKFILL_CHUNK_YEARS.get(FRED_SERIES_FREQ.get(series_id, '每日'), 5)
+        chunk_start = first
+        while chunk_start <= end:
+            # DateOffset 把 2 月 29 日顺延到目标年份的 2 月 28 日（date.replace 会抛 ValueError）
+            next_start = (pd.Timestamp(chunk_start) + pd.DateOffset(years=years)).date()
+            chunk_end = min(end, next_start - datetime.timedelta(days=1))
+            chunks.append((series_id, chunk_start, chunk_end))
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+    return chunks
+
+
+def completed_chunks(session) -> set:
+    """已完成分段的 (series_id, start, end)"""
+    return {(c.series_id, c.start, c.end) for c in session.query(BackfillChunk).all()}
+
+
+def fetch_chunk(provider: DataProvider, chunk: Chunk) -> List[dict]:
+    """拉取单个分段，返回待写入的行"""
+    series_id, start, end = chunk
+    s = provider.get_series(series_id, observation_start=start.isoformat(), observation_end=end.isoformat())
+    s = s.dropna()
+    return [
+        {'series_id': series_id, 'date': d, 'value': v}
+        for d, v in zip(pd.to_datetime(s.index).date, s.to_numpy(dtype=float).tolist())
+    ]
+
+
+def write_chunk(session, chunk: Chunk, rows: List[dict]):
+    """在一个事务中批量写入分段数据并记录检查点"""
+    series_id, start, end = chunk
+    if rows:
+        stmt = sqlite_insert(RawObservation.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['series_id', 'date'],
+            set_={'value': stmt.excluded.value}
+        )
+        session.execute(stmt, rows)
+    session.merge(BackfillChunk(series_id=series_id, start=start, end=end, rows=len(rows),
+                                completed_at=datetime.datetime.utcnow()))
+    session.commit()
+
+
+def run_backfill(provider: DataProvider, series_ids: List[str], start: str = BACKFILL_START,
+                 workers: int = 4) -> dict:
+    """
+    并行拉取、单线程写入（SQLite 只允许一个写者）
+    返回统计 {'chunks', 'skipped', 'failed', 'rows', 'seconds', 'rows_per_sec'}
+    """
+    session = Session()
+    try:
+        chunks = plan_chunks(series_ids, start, datetime.date.today())
+        done = completed_chunks(session)
+        pending = [c for c in chunks if c not in done]
+        logger.info(f"Backfill: {len(chunks)} chunks planned, {len(chunks) - len(pending)} already done, "
+                    f"{len(pending)} to fetch with {workers} workers")
+
+        total_rows = 0
+        failed = 0
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(fetch_chunk, provider, chunk): chunk for chunk in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                chunk = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Backfill chunk {chunk[0]} {chunk[1]}~{chunk[2]} failed: {e}")
+                    continue
+                write_chunk(session, chunk, rows)
+                total_rows += len(rows)
+                elapsed = time.perf_counter() - began
+                logger.info(f"[{i}/{len(pending)}] {chunk[0]} {chunk[1]}~{chunk[2]}: {len(rows)} rows "
+                            f"({total_rows / elapsed:.0f} rows/s)")
+
+        elapsed = time.perf_counter() - began
+        return {
+            'chunks': len(pending),
+            'skipped': len(chunks) - len(pending),
+            'failed': failed,
+            'rows': total_rows,
+            'seconds': round(elapsed, 2),
+            'rows_per_sec': round(total_rows / elapsed, 1) if elapsed > 0 else 0.0
+        }
+    finally:
+        session.close()
+
+
+class BackfilledProvider(DataProvider):
+    """
+    从 raw_observations 表读取回填后的完整历史
+    忽略 observation_start，使 update_metrics 的派生序列覆盖全部历史
+    """
+    name = 'backfilled'
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        sql = "SELECT date, value FROM raw_observations WHERE series_id = :series_id"
+        params = {'series_id': series_id}
+        if observation_end:
+            sql += " AND date <= :end"
+            params['end'] = observation_end
+        sql += " ORDER BY date"
+        with engine.connect() as conn:
+            df = pd.read_sql_query(text(sql), conn, params=params)
+        return pd.Series(df['value'].to_numpy(), index=pd.to_datetime(df['date']), name=series_id)
+
+
+def derive_metrics(publish: bool = False) -> bool:
+    """用回填的完整历史重新计算派生指标；滚动统计状态从头重建"""
+    from data_fetcher import update_metrics
+
+    session = Session()
+    try:
+        session.query(MetricStats).delete()
+        session.commit()
+    finally:
+        session.close()
+    return update_metrics(publish=publish, provider=BackfilledProvider())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill complete FRED history into the local store')
+    parser.add_argument('--series', nargs='+', help='Series ids to backfill (default: all used series)')
+    parser.add_argument('--start', default=BACKFILL_START, help='Earliest observation date (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent fetches')
+    parser.add_argument('--provider', help='Data provider name (default: DATA_PROVIDER)')
+    parser.add_argument('--restart', action='store_true', help='Discard checkpoints and refetch everything')
+    parser.add_argument('--skip-derive', action='store_true', help='Only backfill raw series')
+    parser.add_argument('--publish', action='store_true', help='Publish the derived changes as a delta')
+    args = parser.parse_args()
+
+    init_db()
+    series_ids = args.series or list(FRED_SERIES_FREQ)
+
+    if args.restart:
+        session = Session()
+        session.query(BackfillChunk).filter(BackfillChunk.series_id.in_(series_ids)).delete(synchronize_session=False)
+        session.commit()
+        session.close()
+
+    provider = get_provider(args.provider)
+    if isinstance(provider, HttpFredProvider):
+        provider.cache = None  # 历史分段只拉取一次，不写入响应缓存
+
+    stats = run_backfill(provider, series_ids, args.start, args.workers)
+    print(f"Backfilled {stats['rows']} rows in {stats['chunks']} chunks "
+          f"({stats['skipped']} skipped, {stats['failed']} failed) "
+          f"in {stats['seconds']}s: {stats['rows_per_sec']} rows/s")
+    if stats['failed']:
+        print("Some chunks failed; rerun to resume from the last checkpoint.")
+        return 1
+
+    if not args.skip_derive:
+        if not derive_metrics(args.publish):
+            return 1
+        print("Derived metrics rebuilt from full history.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
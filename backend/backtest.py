@@ -0,0 +1,156 @@
+"""
+状态信号回测
+用 status_rules.json 中的规则重放每个指标的历史观测，统计状态切换后
+nasdaq_index / sp500_index / gold_index 的远期收益、命中率与回撤。
+入场点为切换日加上该指标频率的公布滞后（BACKTEST_RELEASE_LAG_DAYS）之后的第一个目标观测点；
+早于目标序列起点或与入场点间隔超过 BACKTEST_MAX_ENTRY_GAP_DAYS 的切换不计入。
+全部计算基于 pandas / NumPy 向量化，结果按 (规则版本, 数据版本, 远期窗口) 缓存，最多保留 BACKTEST_CACHE_SIZE 条。
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any
+import numpy as np
+import pandas as pd
+from status_engine import get_engine
+from observation_store import get_data_version
+from archive import load_archived
+from telemetry import CACHE_REQUESTS
+from config import META_INFO, BACKTEST_CACHE_SIZE, BACKTEST_RELEASE_LAG_DAYS, BACKTEST_MAX_ENTRY_GAP_DAYS
+
+BACKTEST_TARGETS = ['nasdaq_index', 'sp500_index', 'gold_index']
+BACKTEST_HORIZONS = [5, 20, 60, 120]  # 目标指数的观测点数（约等于交易日）
+
+# 状态颜色对应的预期方向：success 看多，warning / danger 看空，neutral 不计入命中率
+EXPECTED_DIRECTION = {'success': 1, 'neutral': 0, 'warning': -1, 'danger': -1}
+
+_cache: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _forward_stats(prices: np.ndarray, horizon: int):
+    """
+    对目标序列每个位置 j 计算 h 期远期收益与期间最大回撤
+    返回 (returns, drawdowns)，不足 h 期的位置为 NaN
+    """
+    n = len(prices)
+    returns = np.full(n, np.nan)
+    drawdowns = np.full(n, np.nan)
+    if n <= horizon:
+        return returns, drawdowns
+
+    returns[:n - horizon] = prices[horizon:] / prices[:n - horizon] - 1
+    # 反转后做滚动最小值，即得到 [j, j+h] 窗口内的最低价
+    window_min = pd.Series(prices[::-1]).rolling(horizon + 1).min().to_numpy()[::-1]
+    drawdowns[:n - horizon] = window_min[:n - horizon] / prices[:n - horizon] - 1
+    return returns, drawdowns
+
+
+def _backtest_metric(rule, metric: pd.Series, targets: Dict[str, Dict[int, tuple]],
+                     target_dates: Dict[str, np.ndarray], horizons: List[int],
+                     release_lag_days: int = 0) -> Dict[str, Any]:
+    """单个指标对所有目标指数的回测；release_lag_days 为观测日期到数据公布的滞后"""
+    values = metric.to_numpy(dtype=float)
+    bands = rule.band_indices(values)
+
+    # 状态切换点：与前一个观测点的区间不同
+    switch = np.flatnonzero(bands[1:] != bands[:-1]) + 1
+    switch_bands = bands[switch]
+    # 数据公布后才可据此交易
+    available = metric.index.to_numpy()[switch] + np.timedelta64(release_lag_days, 'D')
+    max_gap = np.timedelta64(BACKTEST_MAX_ENTRY_GAP_DAYS, 'D')
+
+    result = {'observations': int(len(values)), 'transitions': int(len(switch)),
+              'releaseLagDays': release_lag_days, 'targets': {}}
+
+    for target_id, stats_by_h in targets.items():
+        # 公布日当天或之后的第一个目标观测点作为入场点
+        dates = target_dates[target_id]
+        entry = np.searchsorted(dates, available, side='left')
+        in_range = (entry < len(dates)) & (available >= dates[0])
+        in_range &= dates[np.minimum(entry, len(dates) - 1)] - available <= max_gap
+
+        states = []
+        for band in np.unique(switch_bands):
+            text, color = rule.labels[band]
+            mask = (switch_bands == band) & in_range
+            idx = entry[mask]
+            direction = EXPECTED_DIRECTION.get(color, 0)
+
+            horizon_stats = {}
+            for h in horizons:
+                rets, dds = stats_by_h[h]
+                r = rets[idx]
+                d = dds[idx]
+                valid = ~np.isnan(r)
+                r, d = r[valid], d[valid]
+                horizon_stats[str(h)] = {
+                    'samples': int(len(r)),
+                    'mean_return': float(r.mean()) if len(r) else None,
+                    'median_return': float(np.median(r)) if len(r) else None,
+                    'hit_rate': float((np.sign(r) == direction).mean()) if len(r) and direction else None,
+                    'avg_drawdown': float(d.mean()) if len(d) else None,
+                    'max_drawdown': float(d.min()) if len(d) else None,
+                }
+
+            states.append({
+                'statusText': text,
+                'statusColor': color,
+                'transitions': int(mask.sum()),
+                'horizons': horizon_stats
+            })
+        result['targets'][target_id] = states
+
+    return result
+
+
+def run_backtest(horizons: Optional[List[int]] = None) -> Dict[str, Any]:
+    """对所有有规则的指标运行回测（带缓存）"""
+    horizons = sorted(set(horizons or BACKTEST_HORIZONS))
+    engine = get_engine()
+    key = (engine.version, get_data_version(), tuple(horizons))
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        CACHE_REQUESTS.labels('backtest', 'hit').inc()
+        return cached
+    CACHE_REQUESTS.labels('backtest', 'miss').inc()
+
+    series = load_archived(list(set(engine.metric_ids()) | set(BACKTEST_TARGETS)))
+    target_dates = {}
+    targets = {}
+    for target_id in BACKTEST_TARGETS:
+        s = series.get(target_id)
+        if s is None or s.empty:
+            continue
+        prices = s.to_numpy(dtype=float)
+        target_dates[target_id] = s.index.to_numpy()
+        targets[target_id] = {h: _forward_stats(prices, h) for h in horizons}
+
+    metrics = {}
+    for metric_id in engine.metric_ids():
+        s = series.get(metric_id)
+        if s is None or len(s) < 2:
+            continue
+        lag = BACKTEST_RELEASE_LAG_DAYS.get(META_INFO.get(metric_id, {}).get('freq'), 0)
+        metrics[metric_id] = _backtest_metric(engine.get_rule(metric_id), s, targets, target_dates, horizons, lag)
+
+    result = {
+        'rule_version': engine.version,
+        'data_version': key[1],
+        'horizons': horizons,
+        'targets': list(targets.keys()),
+        'metrics': metrics
+    }
+
+    with _cache_lock:
+        # 规则或数据版本变化后旧结果失效
+        for stale in [k for k in _cache if k[:2] != key[:2]]:
+            del _cache[stale]
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > BACKTEST_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,73 @@
+"""
+series_to_history 基准测试
+对比逐点循环实现与向量化实现在 10 年日频序列上的耗时，并校验输出逐字节一致
+用法: python benchmarks/bench_series_to_history.py [--repeat 20]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_utils import series_to_history
+
+
+def legacy_series_to_history(s, tail_n=90):
+    """向量化之前的逐点实现，仅用于对照"""
+    hist = []
+    for d, v in s.tail(tail_n).items():
+        if pd.notna(v):
+            if isinstance(d, (pd.Timestamp, datetime.datetime, datetime.date)):
+                date_str = d.strftime('%Y-%m-%d')
+            else:
+                date_str = str(d)
+            hist.append({"date": date_str, "value": float(v)})
+    return hist
+
+
+def make_series(years: int = 10, nan_ratio: float = 0.03, seed: int = 42) -> pd.Series:
+    """生成带缺失值的日频随机游走序列"""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end='2026-01-01', periods=365 * years, freq='D')
+    values = 100 + rng.standard_normal(len(index)).cumsum()
+    values[rng.random(len(index)) < nan_ratio] = np.nan
+    return pd.Series(values, index=index)
+
+
+def best_of(fn, repeat: int) -> float:
+    """取多次运行的最短耗时（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='series_to_history benchmark')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+
+    s = make_series(args.years)
+    print(f"Series: {len(s)} daily points ({args.years}y), {int(s.isna().sum())} NaNs")
+
+    for tail_n in (90, len(s)):
+        legacy = json.dumps(legacy_series_to_history(s, tail_n))
+        current = json.dumps(series_to_history(s, tail_n))
+        assert legacy == current, f"Output mismatch for tail_n={tail_n}"
+
+        t_legacy = best_of(lambda: legacy_series_to_history(s, tail_n), args.repeat)
+        t_current = best_of(lambda: series_to_history(s, tail_n), args.repeat)
+        print(f"tail_n={tail_n:>6}: legacy {t_legacy * 1000:8.2f} ms | "
+              f"vectorized {t_current * 1000:8.2f} ms | speedup x{t_legacy / t_current:.1f} | output identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+WSGI / ASGI 服务模式对比
+对同一份离线数据分别以 Flask 开发服务器（WSGI）与 uvicorn（ASGI）启动本地实例，依次测量：
+  register  注册吞吐（bcrypt 计算密集）
+  steps     与 load_test.py 相同的混合流量阶梯
+  idle      保持 N 个发送了不完整请求头的慢连接时，仪表盘请求的延迟与服务进程的线程数 / 内存
+结果并排打印，并写入 results/servers-<时间>.json。
+
+  python benchmarks/compare_servers.py --rates 50,100,200 --idle 1000
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from load_test import LocalInstance, Population, run_step, parse_mix, RESULTS_DIR  # noqa: E402
+
+SERVERS = ['wsgi', 'asgi']
+
+
+def process_stats(pid: int) -> dict:
+    """读取 /proc 中的线程数与常驻内存（非 Linux 平台返回空）"""
+    stats = {}
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key == 'Threads':
+                    stats['threads'] = int(value)
+                elif key == 'VmRSS':
+                    stats['rss_mb'] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return stats
+
+
+def open_idle_connections(port: int, count: int):
+    """建立 count 个只发送了部分请求头的连接，模拟慢客户端"""
+    conns = []
+    for _ in range(count):
+        try:
+            s = socket.create_connection(('127.0.0.1', port), timeout=5)
+            s.sendall(b'GET /api/dashboard HTTP/1.1\r\nHost: 127.0.0.1\r\n')
+            conns.append(s)
+        except OSError:
+            break
+    return conns
+
+
+def bench_server(server: str, args, mix, rates) -> dict:
+    workdir = os.path.join(args.workdir, server)
+    os.makedirs(workdir, exist_ok=True)
+    instance = LocalInstance(workdir, args.port, args.codes, server)
+    print(f"\n### {server}: preparing instance in {workdir}")
+    instance.prepare()
+    instance.start()
+    result = {'server': server}
+    try:
+        population = Population(instance.sponsor_codes())
+        elapsed = population.register(instance.url, args.users, min(args.concurrency, 16))
+        result['register_per_s'] = round(args.users / elapsed, 1)
+        print(f"  register: {result['register_per_s']}/s")
+
+        result['steps'] = []
+        for i, rate in enumerate(rates):
+            step = run_step(instance.url, population, mix, rate, args.duration, args.concurrency, args.seed + i)
+            result['steps'].append({k: step[k] for k in ('target_rps', 'achieved_rps', 'p99_ms', 'error_rate', 'dropped')})
+            print(f"  {rate:>6.0f} rps: achieved {step['achieved_rps']:.1f}, p99 {step['p99_ms']:.1f} ms, "
+                  f"errors {step['error_rate'] * 100:.2f}%")
+
+        baseline = process_stats(instance.process.pid)
+        conns = open_idle_connections(args.port, args.idle)
+        time.sleep(1)
+        held = process_stats(instance.process.pid)
+        step = run_step(instance.url, population, {'dashboard': 1}, args.idle_rate, args.duration,
+                        args.concurrency, args.seed)
+        for s in conns:
+            s.close()
+        result['idle'] = {
+            'connections': len(conns),
+            'rate': args.idle_rate,
+            'achieved_rps': step['achieved_rps'],
+            'p50_ms': step['endpoints'].get('dashboard', {}).get('p50_ms'),
+            'p99_ms': step['p99_ms'],
+            'error_rate': step['error_rate'],
+            'threads_before': baseline.get('threads'),
+            'threads_held': held.get('threads'),
+            'rss_mb_before': baseline.get('rss_mb'),
+            'rss_mb_held': held.get('rss_mb')
+        }
+        print(f"  {len(conns)} idle connections: dashboard p99 {step['p99_ms']:.1f} ms, "
+              f"threads {baseline.get('threads')} -> {held.get('threads')}, "
+              f"rss {baseline.get('rss_mb')} -> {held.get('rss_mb')} MB")
+    finally:
+        instance.stop()
+    return result
+
+
+def print_comparison(results):
+    by_server = {r['server']: r for r in results}
+    wsgi, asgi = by_server['wsgi'], by_server['asgi']
+    print(f"\n{'':<28}{'wsgi':>14}{'asgi':>14}")
+    print(f"{'register /s':<28}{wsgi['register_per_s']:>14.1f}{asgi['register_per_s']:>14.1f}")
+    for a, b in zip(wsgi['steps'], asgi['steps']):
+        label = f"{a['target_rps']:.0f} rps achieved / p99"
+        print(f"{label:<28}{a['achieved_rps']:>7.1f}/{a['p99_ms']:<6.0f}{b['achieved_rps']:>7.1f}/{b['p99_ms']:<6.0f}")
+    for key, label in (('p99_ms', 'idle: dashboard p99 ms'), ('threads_held', 'idle: server threads'),
+                       ('rss_mb_held', 'idle: server rss MB'), ('error_rate', 'idle: error rate')):
+        print(f"{label:<28}{str(wsgi['idle'][key]):>14}{str(asgi['idle'][key]):>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Side-by-side benchmark of the WSGI and ASGI serving modes')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--workdir', default=os.path.join(BENCH_DIR, '.work', 'servers'))
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--codes', type=int, default=2000)
+    parser.add_argument('--mix', default='me=30,dashboard=45,check=20,redeem=5')
+    parser.add_argument('--rates', default='50,100,200', help='Comma separated target rates (req/s)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per step')
+    parser.add_argument('--concurrency', type=int, default=64, help='Client worker threads')
+    parser.add_argument('--idle', type=int, default=1000, help='Idle slow connections held during the idle test')
+    parser.add_argument('--idle-rate', type=float, default=50, help='Dashboard req/s during the idle test')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rates = [float(r) for r in args.rates.split(',')]
+    results = [bench_server(server, args, mix, rates) for server in SERVERS]
+    print_comparison(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"servers-{datetime.datetime.now().strftime('%Y-%m-%dT%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({'users': args.users, 'mix': mix, 'duration': args.duration,
+                   'concurrency': args.concurrency, 'results': results}, f, indent=2)
+    print(f"Results written to {out_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+基准测试合成数据
+在工作目录下生成与生产结构一致的数据：
+  data/users.json, data/sponsor_codes.json, data/user_access.json
+  fred/<SERIES_ID>.csv        离线数据源使用的 10 年日频（或对应频率）序列
+生成结果是确定性的（固定随机种子），同一规模下可重复对比。
+
+导入本模块前须已设置 DATA_DIR / DB_FILE 等环境变量（见 run_benchmarks.py）。
+"""
+import os
+import json
+import random
+import string
+import datetime
+import bcrypt
+
+# 规模预设：用户数, 赞助码数, 已激活模块的用户比例
+SCALES = {
+    'small': {'users': 10_000, 'codes': 100_000, 'activated': 0.1},
+    'medium': {'users': 100_000, 'codes': 1_000_000, 'activated': 0.1},
+    'large': {'users': 1_000_000, 'codes': 1_000_000, 'activated': 0.1},
+}
+
+BENCH_PASSWORD = 'bench-password'
+MODULES = ['nasdaq', 'sp500', 'gold']
+_PREFIX = {'nasdaq': 'NAS', 'sp500': 'SPX', 'gold': 'GLD'}
+SERIES_YEARS = 10
+
+
+def user_email(i: int) -> str:
+    return f'user{i:07d}@bench.local'
+
+
+def _code(rng: random.Random, module: str) -> str:
+    chars = string.ascii_uppercase + string.digits
+    return f"{_PREFIX[module]}-{''.join(rng.choice(chars) for _ in range(8))}"
+
+
+def _dump(path: str, data):
+    # 紧凑格式写入，大规模下比 indent=2 快得多；json_store 读取不受影响
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def build_json_store(data_dir: str, users: int, codes: int, activated: float, seed: int = 7):
+    """生成用户、赞助码与访问权限文件（所有用户共用同一个密码哈希）"""
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    now = datetime.datetime.utcnow()
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    # 半数用户仍在试用期内，其余已过期
+    user_map = {}
+    for i in range(1, users + 1):
+        created = now - datetime.timedelta(days=rng.randint(0, 60))
+        user_map[user_email(i)] = {
+            'id': i,
+            'password_hash': password_hash,
+            'created_at': created.isoformat(),
+            'trial_expires_at': (now + datetime.timedelta(days=3) if i % 2 else created + datetime.timedelta(days=7)).isoformat(),
+            'is_active': True
+        }
+    _dump(os.path.join(data_dir, 'users.json'), user_map)
+
+    code_map = {}
+    while len(code_map) < codes:
+        module = MODULES[len(code_map) % len(MODULES)]
+        code_map[_code(rng, module)] = {
+            'module': module, 'max_uses': 1, 'current_uses': 0, 'is_active': True,
+            'created_at': now.isoformat(), 'expires_at': None
+        }
+
+    # 部分用户已激活模块，消耗对应赞助码
+    access = {}
+    unused = iter(code_map.items())
+    for i in range(1, int(users * activated) + 1):
+        code, info = next(unused)
+        info['current_uses'] = 1
+        access[str(i)] = [{
+            'module': info['module'], 'sponsor_code': code,
+            'activated_at': now.isoformat(),
+            'expires_at': (now + datetime.timedelta(days=30)).isoformat()
+        }]
+    _dump(os.path.join(data_dir, 'sponsor_codes.json'), code_map)
+    _dump(os.path.join(data_dir, 'user_access.json'), access)
+
+
+def unused_codes(data_dir: str, module: str, limit: int):
+    """读取尚未使用的赞助码（供兑换基准测试）"""
+    with open(os.path.join(data_dir, 'sponsor_codes.json'), 'r', encoding='utf-8') as f:
+        codes = json.load(f)
+    result = [c for c, info in codes.items() if info['module'] == module and info['current_uses'] == 0]
+    return result[-limit:]
+
+
+def build_series(fred_dir: str, years: int = SERIES_YEARS):
+    """导出每个 FRED 序列最近 years 年的合成数据"""
+    from config import FRED_SERIES_FREQ
+    from data_providers import synthetic_series
+
+    os.makedirs(fred_dir, exist_ok=True)
+    start = (datetime.date.today() - datetime.timedelta(days=365 * years)).isoformat()
+    for series_id in FRED_SERIES_FREQ:
+        s = synthetic_series(series_id, start)
+        s.rename('value').rename_axis('date').to_csv(os.path.join(fred_dir, f'{series_id}.csv'), date_format='%Y-%m-%d')
+
+
+def build(workdir: str, scale: str):
+    """在 workdir 下生成全部基准数据；已有同规模数据时直接复用"""
+    marker = os.path.join(workdir, 'fixtures.json')
+    params = dict(SCALES[scale], scale=scale, series_years=SERIES_YEARS)
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                return
+    build_json_store(os.path.join(workdir, 'pristine'), params['users'], params['codes'], params['activated'])
+    build_series(os.path.join(workdir, 'fred'))
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
@@ -0,0 +1,405 @@
+"""
+负载测试
+先通过 /api/auth/register 创建一批合成用户，再按目标速率（开环调度）发送混合流量：
+  me        GET  /api/auth/me
+  dashboard GET  /api/dashboard?module=<模块>
+  check     GET  /api/sponsor/check/<模块>
+  redeem    POST /api/sponsor/redeem
+每个速率阶梯输出各端点的延迟分位、错误率与实际吞吐，并给出饱和点。
+延迟从计划发送时刻起算，服务端排队造成的等待也计入（避免协调遗漏）。
+
+默认在本地启动一个使用离线数据源（fixtures）的独立实例，不访问 FRED，也不改动 data/ 与数据库：
+  python benchmarks/load_test.py --rates 20,50,100,200 --duration 20
+  python benchmarks/load_test.py --url http://127.0.0.1:5000 --codes-file codes.txt   # 压测已有实例
+"""
+import os
+import sys
+import json
+import time
+import queue
+import random
+import signal
+import argparse
+import datetime
+import threading
+import subprocess
+from collections import defaultdict
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+MODULES = ['nasdaq', 'sp500', 'gold']
+DEFAULT_MIX = 'me=30,dashboard=45,check=20,redeem=5'
+PASSWORD = 'load-test-password'
+
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+
+# ==================== 本地实例 ====================
+
+class LocalInstance:
+    """在独立工作目录中启动后端（离线数据源 + 合成赞助码）"""
+
+    def __init__(self, workdir: str, port: int, codes: int, server: str = 'wsgi'):
+        self.workdir = workdir
+        self.port = port
+        self.codes = codes
+        self.server = server
+        self.url = f'http://127.0.0.1:{port}'
+        self.process = None
+        self.env = dict(os.environ, **{
+            'DATA_DIR': os.path.join(workdir, 'data'),
+            'DB_FILE': os.path.join(workdir, 'load.db'),
+            'DELTA_DIR': os.path.join(workdir, 'deltas'),
+            'ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+            'PROFILE_DIR': os.path.join(workdir, 'profiles'),
+            'SNAPSHOT_FILE': os.path.join(workdir, 'snapshot', 'dashboard.snap'),
+            'FRED_CACHE': '0',
+            'FRED_FIXTURE_DIR': os.path.join(workdir, 'fred'),
+            'DATA_PROVIDER': 'fixtures',
+            'JWT_SECRET': 'load-test-secret-0123456789abcdef0123',
+        })
+
+    def prepare(self):
+        import shutil
+        import fixtures
+
+        for name in ('data', 'deltas', 'archive', 'profiles', 'snapshot'):
+            shutil.rmtree(os.path.join(self.workdir, name), ignore_errors=True)
+        for suffix in ('', '-wal', '-shm'):
+            path = os.path.join(self.workdir, 'load.db' + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+        if not os.path.isdir(os.path.join(self.workdir, 'fred')):
+            fixtures.build_series(os.path.join(self.workdir, 'fred'))
+        fixtures.build_json_store(self.env['DATA_DIR'], users=0, codes=self.codes, activated=0)
+        subprocess.run([sys.executable, 'app.py', '--update'], cwd=BACKEND_DIR, env=self.env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def start(self):
+        log = open(os.path.join(self.workdir, 'server.log'), 'w')
+        cmd = [sys.executable, 'app.py', '--host', '127.0.0.1', '--port', str(self.port)]
+        if self.server == 'asgi':
+            cmd.append('--asgi')
+        self.process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                requests.get(f'{self.url}/api/sponsor/links', timeout=1)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Local instance did not start, see {log.name}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def sponsor_codes(self):
+        with open(os.path.join(self.env['DATA_DIR'], 'sponsor_codes.json'), 'r', encoding='utf-8') as f:
+            codes = json.load(f)
+        return [(code, info['module']) for code, info in codes.items()]
+
+
+# ==================== 流量 ====================
+
+class Population:
+    """已注册的合成用户与可用赞助码，兑换时为用户分配一个其未激活模块的赞助码"""
+
+    def __init__(self, codes):
+        self.users = []  # [(email, token)]
+        self.redeemed = defaultdict(set)
+        self.codes = {m: [c for c, mod in codes if mod == m] for m in MODULES}
+        self._lock = threading.Lock()
+
+    def register(self, base_url: str, count: int, concurrency: int):
+        run_id = datetime.datetime.now().strftime('%H%M%S')
+
+        def one(i):
+            email = f'load{run_id}-{i}@bench.local'
+            r = requests.post(f'{base_url}/api/auth/register', json={'email': email, 'password': PASSWORD}, timeout=30)
+            r.raise_for_status()
+            return email, r.json()['token']
+
+        from concurrent.futures import ThreadPoolExecutor
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            self.users = list(pool.map(one, range(count)))
+        return time.perf_counter() - started
+
+    def random_user(self, rng):
+        return rng.choice(self.users)
+
+    def take_redeem(self, rng):
+        """返回 (用户, 模块, 赞助码)；没有可用组合时返回 None"""
+        with self._lock:
+            for _ in range(10):
+                user = rng.choice(self.users)
+                candidates = [m for m in MODULES if m not in self.redeemed[user[0]] and self.codes[m]]
+                if candidates:
+                    module = rng.choice(candidates)
+                    self.redeemed[user[0]].add(module)
+                    return user, module, self.codes[module].pop()
+        return None
+
+
+def build_request(kind: str, population: Population, rng):
+    """返回 (method, path, json, headers)，无法构造时返回 None"""
+    if kind == 'redeem':
+        taken = population.take_redeem(rng)
+        if taken is None:
+            return None
+        (email, token), module, code = taken
+        return 'POST', '/api/sponsor/redeem', {'code': code, 'module': module}, {'Authorization': f'Bearer {token}'}
+
+    email, token = population.random_user(rng)
+    headers = {'Authorization': f'Bearer {token}'}
+    module = rng.choice(MODULES)
+    if kind == 'me':
+        return 'GET', '/api/auth/me', None, headers
+    if kind == 'dashboard':
+        return 'GET', f'/api/dashboard?module={module}', None, headers
+    if kind == 'check':
+        return 'GET', f'/api/sponsor/check/{module}', None, headers
+    raise ValueError(f"Unknown request kind: {kind}")
+
+
+class StepResult:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # kind -> 毫秒
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.skipped = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, latency_ms: float, status):
+        with self._lock:
+            self.latencies[kind].append(latency_ms)
+            self.statuses[kind][status] += 1
+            if status == 'exception' or status >= 500 or (status >= 400 and status not in (401, 403)):
+                self.errors[kind] += 1
+
+    def summary(self, duration: float) -> dict:
+        result = {}
+        for kind, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            n = len(values)
+            result[kind] = {
+                'count': n,
+                'errors': self.errors[kind],
+                'error_rate': round(self.errors[kind] / n, 4) if n else 0.0,
+                'rps': round(n / duration, 2),
+                'p50_ms': round(_pct(values, 0.50), 2),
+                'p90_ms': round(_pct(values, 0.90), 2),
+                'p99_ms': round(_pct(values, 0.99), 2),
+                'max_ms': round(values[-1], 2),
+                'statuses': {str(k): v for k, v in self.statuses[kind].items()}
+            }
+        return result
+
+
+def _pct(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))] if sorted_values else 0.0
+
+
+def run_step(base_url: str, population: Population, mix, rate: float, duration: float,
+             concurrency: int, seed: int) -> dict:
+    """以 rate 次/秒开环发送 duration 秒的混合请求"""
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    pending = queue.Queue()
+    result = StepResult()
+    local = threading.local()
+
+    def worker():
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            kind, scheduled, req = item
+            method, path, body, headers = req
+            try:
+                r = session.request(method, base_url + path, json=body, headers=headers, timeout=30)
+                status = r.status_code
+            except requests.RequestException:
+                status = 'exception'
+            result.record(kind, (time.perf_counter() - scheduled) * 1000, status)
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for w in workers:
+        w.start()
+
+    began = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        scheduled = began + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        kind = rng.choices(kinds, weights)[0]
+        req = build_request(kind, population, rng)
+        if req is None:
+            result.skipped += 1
+            continue
+        pending.put((kind, scheduled, req))
+
+    # 阶梯结束后最多再等待 duration 秒让积压请求完成，其余计为丢弃
+    drain_deadline = time.perf_counter() + duration
+    while not pending.empty() and time.perf_counter() < drain_deadline:
+        time.sleep(0.05)
+    while True:
+        try:
+            pending.get_nowait()
+            result.dropped += 1
+        except queue.Empty:
+            break
+    for _ in workers:
+        pending.put(None)
+    for w in workers:
+        w.join(timeout=30)
+
+    elapsed = time.perf_counter() - began
+    endpoints = result.summary(elapsed)
+    completed = sum(e['count'] for e in endpoints.values())
+    errors = sum(e['errors'] for e in endpoints.values())
+    all_latencies = sorted(v for values in result.latencies.values() for v in values)
+    return {
+        'target_rps': rate,
+        'achieved_rps': round(completed / elapsed, 2),
+        'completed': completed,
+        'errors': errors,
+        'error_rate': round(errors / completed, 4) if completed else 0.0,
+        'p99_ms': round(_pct(all_latencies, 0.99), 2),
+        'skipped': result.skipped,
+        'dropped': result.dropped,
+        'endpoints': endpoints
+    }
+
+
+def is_saturated(step: dict, slo_ms: float, max_error_rate: float) -> bool:
+    """吞吐跟不上目标、p99 超出 SLO 或错误率超限即视为饱和"""
+    return (step['achieved_rps'] < step['target_rps'] * 0.9
+            or step['p99_ms'] > slo_ms
+            or step['error_rate'] > max_error_rate
+            or step['dropped'] > 0)
+
+
+def print_step(step: dict, saturated: bool):
+    flag = '  SATURATED' if saturated else ''
+    print(f"\n== target {step['target_rps']:.0f} rps: achieved {step['achieved_rps']:.1f} rps, "
+          f"p99 {step['p99_ms']:.1f} ms, errors {step['error_rate'] * 100:.2f}%, "
+          f"dropped {step['dropped']}{flag}")
+    print(f"  {'endpoint':<11}{'count':>8}{'rps':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'err %':>8}")
+    for kind, e in step['endpoints'].items():
+        print(f"  {kind:<11}{e['count']:>8}{e['rps']:>9.1f}{e['p50_ms']:>10.1f}{e['p90_ms']:>10.1f}"
+              f"{e['p99_ms']:>10.1f}{e['max_ms']:>10.1f}{e['error_rate'] * 100:>8.2f}")
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(','):
+        kind, weight = part.split('=')
+        if kind not in ('me', 'dashboard', 'check', 'redeem'):
+            raise ValueError(f"Unknown request kind in mix: {kind}")
+        mix[kind] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test with a realistic traffic mix')
+    parser.add_argument('--url', help='Target an existing instance instead of starting a local one')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the local instance')
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi', help='Serving mode of the local instance')
+    parser.add_argument('--workdir', default=os.path.join(BENCH_DIR, '.work', 'load'))
+    parser.add_argument('--users', type=int, default=200, help='Synthetic users to register')
+    parser.add_argument('--codes', type=int, default=3000, help='Sponsor codes to generate (local instance)')
+    parser.add_argument('--codes-file', help='CODE,MODULE lines for redeem against an existing instance')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Request mix weights (default {DEFAULT_MIX})')
+    parser.add_argument('--rates', default='10,25,50,100', help='Comma separated target rates (req/s)')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per rate step')
+    parser.add_argument('--concurrency', type=int, default=64, help='Client worker threads')
+    parser.add_argument('--slo-ms', type=float, default=500, help='p99 latency above which a step counts as saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--continue-after-saturation', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rates = [float(r) for r in args.rates.split(',')]
+
+    instance = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        codes = []
+        if args.codes_file:
+            with open(args.codes_file, 'r', encoding='utf-8') as f:
+                codes = [tuple(line.strip().split(',')[:2]) for line in f if line.strip()]
+    else:
+        os.makedirs(args.workdir, exist_ok=True)
+        instance = LocalInstance(args.workdir, args.port, args.codes, args.server)
+        print(f"Preparing local instance in {args.workdir} (offline provider)...")
+        instance.prepare()
+        instance.start()
+        base_url = instance.url
+        codes = instance.sponsor_codes()
+
+    try:
+        population = Population(codes)
+        elapsed = population.register(base_url, args.users, min(args.concurrency, 16))
+        print(f"Registered {args.users} users in {elapsed:.1f}s ({args.users / elapsed:.1f}/s)")
+
+        steps = []
+        saturation = None
+        for i, rate in enumerate(rates):
+            step = run_step(base_url, population, mix, rate, args.duration, args.concurrency, args.seed + i)
+            saturated = is_saturated(step, args.slo_ms, args.max_error_rate)
+            step['saturated'] = saturated
+            steps.append(step)
+            print_step(step, saturated)
+            if saturated and saturation is None:
+                saturation = rate
+                if not args.continue_after_saturation:
+                    break
+    finally:
+        if instance:
+            instance.stop()
+
+    sustained = [s['target_rps'] for s in steps if not s['saturated']]
+    print()
+    print(f"Max sustained rate: {max(sustained):.0f} rps" if sustained else "No rate was sustained")
+    if saturation is not None:
+        print(f"Saturation at: {saturation:.0f} rps")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"load-{datetime.datetime.now().strftime('%Y-%m-%dT%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'target': base_url,
+            'server': None if args.url else args.server,
+            'users': args.users,
+            'mix': mix,
+            'duration': args.duration,
+            'concurrency': args.concurrency,
+            'slo_ms': args.slo_ms,
+            'max_sustained_rps': max(sustained) if sustained else None,
+            'saturation_rps': saturation,
+            'steps': steps
+        }, f, indent=2)
+    print(f"Results written to {out_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+后端热点路径基准测试套件
+在独立工作目录中生成合成数据（用户 / 赞助码 / 10 年序列），使用离线数据源，
+测量各热点路径的耗时分布，并与保存的基线对比输出报告。
+
+用法:
+  python benchmarks/run_benchmarks.py                        # small 规模，对比基线
+  python benchmarks/run_benchmarks.py --scale large          # 100 万用户 / 100 万赞助码
+  python benchmarks/run_benchmarks.py --save-baseline        # 将本次结果保存为基线
+  python benchmarks/run_benchmarks.py --only dashboard login --fail-on-regression
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import datetime
+import statistics
+import threading
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, 'baseline.json')
+
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+
+def configure_environment(workdir: str):
+    """在导入任何后端模块之前，把数据 / 数据库 / 派生目录都指向工作目录"""
+    run_dir = os.path.join(workdir, 'run')
+    os.environ.update({
+        'DATA_DIR': os.path.join(run_dir, 'data'),
+        'DB_FILE': os.path.join(run_dir, 'bench.db'),
+        'DELTA_DIR': os.path.join(run_dir, 'deltas'),
+        'ARCHIVE_DIR': os.path.join(run_dir, 'archive'),
+        'FRED_CACHE': '0',
+        'FRED_FIXTURE_DIR': os.path.join(workdir, 'fred'),
+        'DATA_PROVIDER': 'fixtures',
+        'PROFILE_DIR': os.path.join(run_dir, 'profiles'),
+        'SNAPSHOT_FILE': os.path.join(run_dir, 'snapshot', 'dashboard.snap'),
+        'PROFILE_SAMPLE_RATE': '0',
+        # 固定密钥使令牌跨进程有效；不短于 32 字节，否则 PyJWT 每次签发/校验都发出 InsecureKeyLengthWarning
+        'JWT_SECRET': 'bench-secret-0123456789abcdef0123456789',
+    })
+    return run_dir
+
+
+def reset_run_dir(workdir: str, run_dir: str):
+    """每次运行从原始数据复制，保证写入型基准互不影响"""
+    shutil.rmtree(run_dir, ignore_errors=True)
+    shutil.copytree(os.path.join(workdir, 'pristine'), os.path.join(run_dir, 'data'))
+
+
+# ==================== 计时 ====================
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """多次调用 fn，返回耗时分布（毫秒）"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    mean = statistics.fmean(timings)
+    return {
+        'n': repeat,
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'min_ms': round(timings[0], 4),
+        'mean_ms': round(mean, 4),
+        'ops_per_sec': round(1000 / mean, 2) if mean > 0 else None
+    }
+
+
+def measure_concurrent(make_call, threads: int, per_thread: int) -> dict:
+    """多线程并发调用，返回总吞吐与单次耗时分布"""
+    timings = []
+    lock = threading.Lock()
+
+    def worker():
+        call = make_call()
+        local = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            call()
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    began = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - began
+    timings.sort()
+    return {
+        'n': len(timings),
+        'threads': threads,
+        'median_ms': round(statistics.median(timings), 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'min_ms': round(timings[0], 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'ops_per_sec': round(len(timings) / wall, 2)
+    }
+
+
+# ==================== 基准项 ====================
+
+class Suite:
+    def __init__(self, workdir: str, run_dir: str, scale: str, quick: bool):
+        self.workdir = workdir
+        self.run_dir = run_dir
+        self.scale = scale
+        self.repeat = 5 if quick else 20
+
+    def setup(self):
+        from models import init_db
+        from data_fetcher import update_metrics
+        from data_providers import FixtureProvider
+        import app as app_module
+        from auth import generate_token
+        import fixtures
+
+        init_db()
+        update_metrics(provider=FixtureProvider(os.environ['FRED_FIXTURE_DIR']))
+        self.app = app_module.app
+        self.client = self.app.test_client()
+        # 用户 1 为试用期内用户，用于需认证的接口
+        self.email = fixtures.user_email(1)
+        self.token = generate_token(1, self.email)
+        self.auth = {'Authorization': f'Bearer {self.token}'}
+
+    def bench_dashboard(self):
+        def call():
+            r = self.client.get('/api/dashboard?module=nasdaq', headers=self.auth)
+            assert r.status_code == 200, r.status_code
+        return measure(call, self.repeat * 5)
+
+    def bench_dashboard_concurrent(self):
+        def make_call():
+            client = self.app.test_client()
+            return lambda: client.get('/api/dashboard?module=nasdaq', headers=self.auth)
+        return measure_concurrent(make_call, threads=8, per_thread=self.repeat * 2)
+
+    def bench_login(self):
+        import fixtures
+
+        def call():
+            r = self.client.post('/api/auth/login', json={'email': self.email, 'password': fixtures.BENCH_PASSWORD})
+            assert r.status_code == 200, r.status_code
+        return measure(call, self.repeat)
+
+    def bench_register(self):
+        counter = iter(range(10 ** 9))
+
+        def call():
+            r = self.client.post('/api/auth/register', json={
+                'email': f'new{next(counter)}@bench.local', 'password': 'bench-password'})
+            assert r.status_code == 201, r.status_code
+        return measure(call, self.repeat)
+
+    def bench_redeem(self):
+        import fixtures
+        from auth import generate_token
+
+        # 每次兑换使用一个未激活任何模块的用户和一个未使用的赞助码
+        scale = fixtures.SCALES[self.scale]
+        codes = iter(fixtures.unused_codes(os.environ['DATA_DIR'], 'gold', self.repeat + 1))
+        user_ids = iter(range(int(scale['users'] * scale['activated']) + 1, scale['users'] + 1))
+
+        def call():
+            user_id = next(user_ids)
+            headers = {'Authorization': f'Bearer {generate_token(user_id, fixtures.user_email(user_id))}'}
+            r = self.client.post('/api/sponsor/redeem', json={'code': next(codes), 'module': 'gold'}, headers=headers)
+            assert r.status_code == 200, (r.status_code, r.get_json())
+        return measure(call, self.repeat)
+
+    def bench_require_auth(self):
+        from auth import require_auth
+        protected = require_auth(lambda: 'ok')
+
+        def call():
+            with self.app.test_request_context('/', headers=self.auth):
+                assert protected() == 'ok'
+        return measure(call, self.repeat * 5)
+
+    def bench_update_metrics(self):
+        from data_fetcher import update_metrics
+        from data_providers import FixtureProvider
+
+        def call():
+            assert update_metrics(provider=FixtureProvider(os.environ['FRED_FIXTURE_DIR']))
+        return measure(call, max(3, self.repeat // 4))
+
+    def bench_series_to_history(self):
+        from app_utils import series_to_history
+        from data_providers import FixtureProvider
+        s = FixtureProvider(os.environ['FRED_FIXTURE_DIR']).get_series('SP500')
+        return measure(lambda: series_to_history(s, 90), self.repeat * 50)
+
+    def bench_series_to_history_full(self):
+        from app_utils import series_to_history
+        from data_providers import FixtureProvider
+        s = FixtureProvider(os.environ['FRED_FIXTURE_DIR']).get_series('SP500')
+        return measure(lambda: series_to_history(s, len(s)), self.repeat * 5)
+
+    def bench_calculate_status(self):
+        from app_utils import calculate_status
+        from status_engine import get_engine
+        metric_ids = get_engine().metric_ids()
+
+        def call():
+            for metric_id in metric_ids:
+                calculate_status(metric_id, 1.0, 0.01)
+        return measure(call, self.repeat * 50)
+
+
+BENCHMARKS = [
+    'dashboard', 'dashboard_concurrent', 'login', 'register', 'redeem', 'require_auth',
+    'update_metrics', 'series_to_history', 'series_to_history_full', 'calculate_status'
+]
+
+
+# ==================== 报告 ====================
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """按中位数对比，返回 [(名称, 基线, 当前, 变化比例, 是否退化)]"""
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            rows.append((name, None, result['median_ms'], None, False))
+            continue
+        change = (result['median_ms'] - base['median_ms']) / base['median_ms'] if base['median_ms'] else 0.0
+        rows.append((name, base['median_ms'], result['median_ms'], change, change > threshold))
+    return rows
+
+
+def print_report(current: dict, rows: list, baseline_meta: dict = None):
+    print()
+    print(f"Scale: {current['meta']['scale']}  Python {current['meta']['python']}  {current['meta']['platform']}")
+    if baseline_meta:
+        print(f"Baseline: {baseline_meta.get('timestamp')} ({baseline_meta.get('commit') or 'unknown commit'})")
+    print(f"{'benchmark':<26}{'median ms':>12}{'p95 ms':>12}{'ops/s':>12}{'baseline':>12}{'change':>10}")
+    for name, base, median, change, regressed in rows:
+        result = current['results'][name]
+        base_str = f'{base:.3f}' if base is not None else '-'
+        change_str = f'{change * 100:+.1f}%' if change is not None else 'new'
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<26}{median:>12.3f}{result['p95_ms']:>12.3f}{result['ops_per_sec'] or 0:>12.1f}"
+              f"{base_str:>12}{change_str:>10}{flag}")
+
+
+def git_commit() -> str:
+    try:
+        import subprocess
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backend hot-path benchmark suite')
+    parser.add_argument('--scale', choices=['small', 'medium', 'large'], default='small')
+    parser.add_argument('--workdir', help='Fixture / scratch directory (default: benchmarks/.work/<scale>)')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run a subset of benchmarks')
+    parser.add_argument('--quick', action='store_true', help='Fewer repetitions')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Median slowdown treated as regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit 1 when any benchmark regressed')
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or os.path.join(BENCH_DIR, '.work', args.scale))
+    run_dir = configure_environment(workdir)
+
+    import fixtures
+    started = time.perf_counter()
+    fixtures.build(workdir, args.scale)
+    print(f"Fixtures ready in {time.perf_counter() - started:.1f}s ({workdir})")
+    reset_run_dir(workdir, run_dir)
+
+    logging.getLogger('backend').setLevel(logging.WARNING)
+    suite = Suite(workdir, run_dir, args.scale, args.quick)
+    suite.setup()
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", flush=True)
+        results[name] = getattr(suite, f'bench_{name}')()
+
+    current = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'scale': args.scale,
+            'fixtures': fixtures.SCALES[args.scale],
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{current['meta']['timestamp'].replace(':', '')}-{args.scale}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('scale') != args.scale:
+            print(f"Baseline scale {baseline.get('meta', {}).get('scale')} differs from {args.scale}; not comparing")
+            baseline = {}
+
+    rows = compare(current, baseline, args.threshold)
+    print_report(current, rows, baseline.get('meta'))
+    print(f"\nResults written to {out_path}")
+
+    if args.save_baseline:
+        shutil.copyfile(out_path, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.fail_on_regression and any(r[4] for r in rows):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,18 @@ import secrets
 # Configuration
 FRED_API_KEY = '10493b350971713a5302f3f8ef7e4909'
 
+# 数据源: fred / http (FRED 兼容接口，可指向本地 stand-in) | fredapi | fixtures (本地 CSV/Parquet 目录)
+DATA_PROVIDER = os.getenv('DATA_PROVIDER', 'fred')
+FRED_API_BASE = os.getenv('FRED_API_BASE', 'https://api.stlouisfed.org/fred')
+
+# FRED 请求配额与容错（FRED 限制为每个 API Key 120 次/分钟）
+FRED_RATE_LIMIT_PER_MIN = int(os.getenv('FRED_RATE_LIMIT_PER_MIN', '120'))
+FRED_RATE_BURST = int(os.getenv('FRED_RATE_BURST', '10'))
+FRED_MAX_RETRIES = int(os.getenv('FRED_MAX_RETRIES', '4'))
+FRED_BREAKER_THRESHOLD = 5          # 连续失败多少次后熔断
+FRED_BREAKER_RESET_SECONDS = 60     # 熔断后多久放行试探请求
+FRED_FIXTURE_DIR = os.getenv('FRED_FIXTURE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'fred'))
+
 # JWT Configuration
 JWT_SECRET = os.getenv('JWT_SECRET', secrets.token_hex(32))
 JWT_EXPIRATION_HOURS = 24 * 7  # Token有效期7天
@@ -38,9 +50,100 @@ logger = logging.getLogger('backend')
 
 # Database
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_FILE = os.path.join(BACKEND_DIR, 'macro_weather_v3.db')
+DB_FILE = os.getenv('DB_FILE', os.path.join(BACKEND_DIR, 'macro_weather_v3.db'))
 DB_URI = f'sqlite:///{DB_FILE}?check_same_thread=False'
 
+# 增量数据包目录（manifest.json + objects/），替代每日提交整个数据库
+DELTA_DIR = os.getenv('DELTA_DIR', os.path.join(BACKEND_DIR, 'deltas'))
+
+# 观测序列列式归档目录（每个指标一个内存映射 .npy 文件）
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(BACKEND_DIR, 'archive'))
+
+# 仪表盘共享快照文件（各 worker 内存映射读取）
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', os.path.join(BACKEND_DIR, 'snapshot', 'dashboard.snap'))
+
+# FRED 响应磁盘缓存：有效期按序列发布频率（秒），目录超过上限时按最近使用淘汰
+FRED_CACHE_ENABLED = os.getenv('FRED_CACHE', '1') != '0'
+FRED_CACHE_DIR = os.getenv('FRED_CACHE_DIR', os.path.join(BACKEND_DIR, 'cache', 'fred'))
+FRED_CACHE_MAX_MB = int(os.getenv('FRED_CACHE_MAX_MB', '64'))
+FRED_CACHE_TTL = {
+    '每日': 4 * 3600,
+    '每周': 12 * 3600,
+    '每月': 24 * 3600,
+    '每季度': 3 * 24 * 3600
+}
+
+# 历史回填：起始日期与各频率的分段长度（年）
+BACKFILL_START = os.getenv('BACKFILL_START', '1950-01-01')
+BACKFILL_CHUNK_YEARS = {'每日': 5, '每周': 20, '每月': 100, '每季度': 100}
+
+# 请求剖析：签名密钥（未设置时禁用签名触发）、随机采样率、采样间隔与输出目录
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BACKEND_DIR, 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+
+# ASGI 模式下执行 Flask 视图（bcrypt、pandas 等阻塞计算）的线程数
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', '32'))
+# ASGI 模式下请求体在事件循环上完整读入内存后才交给 Flask，超过此上限返回 413
+# （/api/admin/bulk 的大批量导入在此模式下受该上限约束，更大的文件请分段提交或使用 WSGI 模式）
+ASGI_MAX_BODY_MB = int(os.getenv('ASGI_MAX_BODY_MB', '32'))
+
+# 更新推送（SSE）：快照版本轮询间隔、心跳间隔与每个连接的待发送事件上限
+STREAM_POLL_SECONDS = float(os.getenv('STREAM_POLL_SECONDS', '1'))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
+STREAM_QUEUE_SIZE = 16
+
+# 指标相关矩阵：预计算的标准窗口（交易日）、自定义窗口上限与进程内缓存条数
+CORRELATION_WINDOWS = [20, 60, 120, 250]
+CORRELATION_MAX_WINDOW = 2520
+CORRELATION_CACHE_SIZE = 32
+
+# 状态信号回测：自定义远期窗口的个数与长度上限、进程内缓存条数
+BACKTEST_MAX_HORIZONS = 8
+BACKTEST_MAX_HORIZON = 2520
+BACKTEST_CACHE_SIZE = 16
+# 回测入场点相对观测日期的后移天数：月度/季度数据以期初日期标记，实际在数周后才公布，
+# 按观测日期入场会产生前视偏差（巴菲特指标为日度市值与季度 GDP 之比，按日度处理）
+BACKTEST_RELEASE_LAG_DAYS = {'每日': 0, '每日/每季度': 0, '每周': 7, '每月': 45, '每季度': 160}
+# 入场点与可交易日期之间允许的最大间隔（天），超出则该次切换不计入（如目标指数尚无数据）
+BACKTEST_MAX_ENTRY_GAP_DAYS = 7
+
+# 历史查询自动选择分层时单次返回的点数上限
+HISTORY_MAX_POINTS = int(os.getenv('HISTORY_MAX_POINTS', '400'))
+
+# 模块综合天气评分的指标权重（未列出的指标权重为 1；指数走势只反映价格，权重减半）
+WEATHER_WEIGHTS = {
+    'nasdaq': {'nasdaq_index': 0.5, 'nasdaq100_index': 0.5},
+    'sp500': {'sp500_index': 0.5},
+    'gold': {'gold_index': 0.5, 'silver_index': 0.5}
+}
+
+# 数据获取台账：保留的运行记录数，以及按发布频率判定序列过期的最新观测日期最大间隔（天）
+FETCH_LEDGER_KEEP_RUNS = int(os.getenv('FETCH_LEDGER_KEEP_RUNS', '1000'))
+FRESHNESS_MAX_AGE_DAYS = {
+    '每日': 5,      # 周末与节假日
+    '每周': 14,
+    '每月': 100,    # 观测日期为月初，CPI / INDPRO 在次月中旬公布，下次公布前已约 75 天
+    '每季度': 280   # 观测日期为季初：GDP 下次初值公布前约 210 天，Z.1 季初数据一直沿用到约 250 天后
+}
+
+# 管理接口令牌（请求头 X-Admin-Token，未设置时禁用 /api/admin）与批量操作每个事务的条数
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '50000'))
+
+# 状态切换告警投递：并发上限、单次投递内的重试次数、每个请求携带的事件上限、
+# 请求超时与连续失败后推迟下次投递的上限（秒）
+ALERT_MAX_CONCURRENCY = int(os.getenv('ALERT_MAX_CONCURRENCY', '8'))
+ALERT_MAX_RETRIES = int(os.getenv('ALERT_MAX_RETRIES', '3'))
+ALERT_BATCH_SIZE = int(os.getenv('ALERT_BATCH_SIZE', '100'))
+ALERT_TIMEOUT = float(os.getenv('ALERT_TIMEOUT', '10'))
+ALERT_BACKOFF_MAX_SECONDS = 3600
+
+# 指标状态阈值规则（数据驱动，修改后自动生效）
+STATUS_RULES_FILE = os.getenv('STATUS_RULES_FILE', os.path.join(BACKEND_DIR, 'status_rules.json'))
+
 # Dashboard Config
 ORDER_MAP = [
     'dgs10', 'fedfunds', 'tech_strength', 'vxn', 
@@ -55,6 +158,24 @@ ORDER_MAP = [
     'nasdaq_index', 'nasdaq100_index', 'sp500_index'
 ]
 
+# 各模块仪表盘展示的指标（与前端 App.tsx 的分区一致）
+MODULE_METRICS = {
+    'nasdaq': ['nasdaq_index', 'nasdaq100_index', 'dgs10', 'fedfunds', 'tech_strength', 'vxn',
+               'hyd', 'dxy', 'stress', 'curve', 'margin', 'buffett', 'cpi', 'indpro'],
+    'sp500': ['sp500_index', 'dgs10', 'fedfunds', 'unrate', 'vix',
+              'hyd', 'dxy', 'stress', 'curve', 'margin', 'buffett', 'cpi', 'indpro'],
+    'gold': ['gold_index', 'silver_index', 'real_yield', 'breakeven', 'fed_assets', 'nonfarm', 'gold_dxy', 'gold_unrate']
+}
+
+# 使用到的 FRED 序列及其发布频率（取值与 META_INFO 的 freq 一致）
+FRED_SERIES_FREQ = {
+    'DGS10': '每日', 'FEDFUNDS': '每月', 'NASDAQCOM': '每日', 'NASDAQ100': '每日', 'SP500': '每日',
+    'VXNCLS': '每日', 'VIXCLS': '每日', 'BAMLH0A0HYM2': '每日', 'DTWEXBGS': '每日', 'STLFSI4': '每周',
+    'T10Y2Y': '每日', 'BOGZ1FL663067003Q': '每季度', 'GDP': '每季度', 'CPIAUCSL': '每月', 'INDPRO': '每月',
+    'UNRATE': '每月', 'DFII10': '每日', 'T10YIE': '每日', 'WALCL': '每周', 'PAYEMS': '每月',
+    'NASDAQQGLDI': '每日', 'NASDAQQSLVO': '每日'
+}
+
 META_INFO = {
     'dgs10': {'formula': '直接读取', 'range': '过去90个交易日', 'freq': '每日', 'update': '美东时间每个交易日 18:00'},
     'fedfunds': {'formula': '直接读取', 'range': '过去90个交易日', 'freq': '每月', 'update': '每月初更新上月数据'},
@@ -0,0 +1,161 @@
+"""
+指标相关矩阵
+把 ORDER_MAP 中的全部指标按工作日对齐（低频序列向前填充），对截至最新日期的
+最近 window 个交易日计算皮尔逊相关矩阵，全部使用 NumPy 矩阵运算。
+
+- 标准窗口（CORRELATION_WINDOWS）在数据更新提交后预计算，写入 correlation_matrices 表
+- 其他窗口按需计算并缓存在进程内，数据版本变化后整体失效
+窗口内有缺失值或取值恒定的指标不参与计算，对应行列为 null。
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+import numpy as np
+import pandas as pd
+from config import ORDER_MAP, MODULE_METRICS, CORRELATION_WINDOWS, CORRELATION_CACHE_SIZE, logger
+from models import Session, CorrelationMatrix
+from observation_store import get_data_version
+from archive import load_archived
+from telemetry import CACHE_REQUESTS
+
+_HITS = CACHE_REQUESTS.labels('correlation', 'hit')
+_MISSES = CACHE_REQUESTS.labels('correlation', 'miss')
+
+# (data_version, window) -> 结果；对齐后的观测矩阵按数据版本只构建一次
+_cache: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+_frame: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _aligned_frame(data_version: int):
+    """(日期索引, 指标 id 列表, n×k 数值矩阵)：工作日对齐并向前填充"""
+    with _lock:
+        if _frame.get('version') == data_version:
+            return _frame['dates'], _frame['ids'], _frame['values']
+
+    series = load_archived(ORDER_MAP)
+    ids = [mid for mid in ORDER_MAP if mid in series]
+    if not ids:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0))
+    frame = pd.concat([series[mid].groupby(level=0).last() for mid in ids], axis=1, keys=ids).sort_index()
+    days = pd.bdate_range(frame.index.min(), frame.index.max())
+    frame = frame.reindex(frame.index.union(days)).ffill().reindex(days)
+    values = frame.to_numpy(dtype=np.float64)
+
+    with _lock:
+        _frame.update(version=data_version, dates=days, ids=ids, values=values)
+    return days, ids, values
+
+
+def correlation_matrix(values: np.ndarray) -> np.ndarray:
+    """n×k 观测 -> k×k 相关矩阵；含缺失值或方差为 0 的列对应行列为 NaN"""
+    k = values.shape[1]
+    valid = ~np.isnan(values).any(axis=0)
+    x = values[:, valid]
+    x = x - x.mean(axis=0)
+    std = np.sqrt((x * x).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = (x.T @ x) / np.outer(std, std)
+    corr[:, std == 0] = np.nan
+    corr[std == 0, :] = np.nan
+
+    result = np.full((k, k), np.nan)
+    idx = np.flatnonzero(valid)
+    result[np.ix_(idx, idx)] = np.clip(corr, -1.0, 1.0)
+    return result
+
+
+def compute(window: int, data_version: int) -> Dict[str, Any]:
+    """计算截至最新日期、最近 window 个交易日的相关矩阵"""
+    dates, ids, values = _aligned_frame(data_version)
+    tail = values[-window:]
+    matrix = correlation_matrix(tail) if len(tail) >= 2 else np.full((len(ids), len(ids)), np.nan)
+    return {
+        'window': window,
+        'data_version': data_version,
+        'as_of': dates[-1].date().isoformat() if len(dates) else None,
+        'observations': int(len(tail)),
+        'metrics': ids,
+        'matrix': [[None if np.isnan(v) else round(float(v), 4) for v in row] for row in matrix]
+    }
+
+
+def _remember(key: tuple, result: Dict[str, Any]):
+    with _lock:
+        # 数据版本变化后旧结果全部失效
+        for stale in [k for k in _cache if k[0] != key[0]]:
+            del _cache[stale]
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > CORRELATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _load_stored(window: int, data_version: int) -> Optional[Dict[str, Any]]:
+    session = Session()
+    try:
+        row = session.get(CorrelationMatrix, window)
+        if row is None or row.data_version != data_version:
+            return None
+        return {
+            'window': window,
+            'data_version': data_version,
+            'as_of': row.as_of.isoformat() if row.as_of else None,
+            'observations': row.observations,
+            'metrics': json.loads(row.metrics_json),
+            'matrix': json.loads(row.matrix_json)
+        }
+    finally:
+        session.close()
+
+
+def get_correlation(window: int) -> Dict[str, Any]:
+    """读取相关矩阵：进程内缓存 -> 预计算结果 -> 现场计算"""
+    data_version = get_data_version()
+    key = (data_version, window)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        _HITS.inc()
+        return cached
+    _MISSES.inc()
+
+    result = _load_stored(window, data_version) if window in CORRELATION_WINDOWS else None
+    if result is None:
+        result = compute(window, data_version)
+    _remember(key, result)
+    return result
+
+
+def select_module(result: Dict[str, Any], module: Optional[str]) -> Dict[str, Any]:
+    """按模块截取子矩阵，行列顺序与模块指标列表一致"""
+    if not module:
+        return result
+    index = {mid: i for i, mid in enumerate(result['metrics'])}
+    ids = [mid for mid in MODULE_METRICS[module] if mid in index]
+    rows = [index[mid] for mid in ids]
+    return dict(result, module=module, metrics=ids,
+                matrix=[[result['matrix'][i][j] for j in rows] for i in rows])
+
+
+def precompute_correlations(session) -> int:
+    """数据更新提交后预计算标准窗口并写入 correlation_matrices，返回写入数量"""
+    data_version = get_data_version()
+    count = 0
+    for window in CORRELATION_WINDOWS:
+        result = compute(window, data_version)
+        session.merge(CorrelationMatrix(
+            window=window, data_version=data_version,
+            as_of=pd.Timestamp(result['as_of']).date() if result['as_of'] else None,
+            observations=result['observations'],
+            metrics_json=json.dumps(result['metrics']),
+            matrix_json=json.dumps(result['matrix'], separators=(',', ':'))
+        ))
+        _remember((data_version, window), result)
+        count += 1
+    session.commit()
+    logger.info(f"Precomputed correlation matrices for windows {CORRELATION_WINDOWS} (data v{data_version})")
+    return count
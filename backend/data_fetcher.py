@@ -1,20 +1,34 @@
 import json
+import time
 import logging
 import datetime
 import pandas as pd
-from fredapi import Fred
-from config import FRED_API_KEY, logger
+from config import logger
+from data_providers import get_provider
 from models import Session, Metric
-from app_utils import calculate_status, series_to_history
+from app_utils import calculate_status, series_to_history, latest_pair
+from observation_store import save_observations
+from history_tiers import update_tiers
+from rolling_stats import update_rolling_stats
+from deltas import diff_metrics, publish_delta
+from archive import refresh_archive
+from metric_store import metric_rows, swap_metrics
+from snapshot import publish_snapshot
+from alerts import record_transitions, dispatch_in_background
+from correlation import precompute_correlations
+from fetch_ledger import FetchLedger
+from telemetry import FRED_FETCH_SECONDS, FRED_FETCH_ERRORS
 
 def get_fred_series(fred, series_id, years_back=2):
     """
     Fetch series using observation_start to ensure consistent history length.
     """
+    started = time.perf_counter()
     try:
         start_date = (datetime.datetime.now() - datetime.timedelta(days=365*years_back)).strftime('%Y-%m-%d')
         # FRED API calls generally ignore 'limit' if start_date is provided, which is what we want.
         series = fred.get_series(series_id, observation_start=start_date)
+        FRED_FETCH_SECONDS.labels(series_id).observe(time.perf_counter() - started)
         
         if series is None or series.empty:
             logger.warning(f"FRED returned empty data for {series_id}")
@@ -25,20 +39,40 @@ def get_fred_series(fred, series_id, years_back=2):
         series.index = pd.to_datetime(series.index)
         return series
     except Exception as e:
+        FRED_FETCH_ERRORS.labels(series_id).inc()
         logger.error(f"Error fetching FRED {series_id}: {e}")
         return pd.Series(dtype=float)
 
-def update_metrics():
+def update_metrics(publish=False, provider=None):
+    """
+    从 FRED 获取所有指标并写入数据库
+    publish=True 时额外发布本次变更的 delta 数据包（GitHub Actions 使用）
+    provider: 数据源，默认按 DATA_PROVIDER 配置创建（见 data_providers）
+    """
     logger.info("Starting FRED data update task...")
     
     try:
-        fred = Fred(api_key=FRED_API_KEY)
+        fred = provider or get_provider()
     except Exception as e:
-        logger.error(f"Failed to initialize FRED API: {e}")
+        logger.error(f"Failed to initialize data provider: {e}")
+        FetchLedger('unknown').save(False, f"provider: {e}")
         return
 
+    # 每次运行（无论成败）都写入获取台账
+    ledger = FetchLedger(getattr(fred, 'name', type(fred).__name__))
+    success = False
+    try:
+        success = _run_update(ledger.wrap(fred), publish, ledger)
+        return success
+    finally:
+        ledger.save(bool(success))
+
+
+def _run_update(fred, publish, ledger):
+    """获取全部序列、计算指标并提交，返回是否成功；发布的 delta 携带本次运行的台账记录"""
     session = Session()
     metrics_buffer = []
+    observations = {}  # metric_id -> 完整派生序列，写入观测表供长周期分析
 
     # --- 1. DGS10 ---
     s = get_fred_series(fred, 'DGS10')
@@ -46,6 +80,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('dgs10', val)
         hist = series_to_history(s, 90)
+        observations['dgs10'] = s
         metrics_buffer.append(Metric(
             id='dgs10', name='10年期美债收益率', ticker='FRED: DGS10', unit='%', value=val,
             description='全球无风险利率基准，直接影响股票贴现率和估值。收益率上升抬高企业融资成本，压缩成长股估值。当前周期4.0%-4.5%为中性区间，>4.5%明显压制估值。',
@@ -55,10 +90,10 @@ def update_metrics():
     # --- 2. FEDFUNDS ---
     s = get_fred_series(fred, 'FEDFUNDS')
     if not s.empty:
-        val = s.iloc[-1]
-        prev = s.iloc[-2] if len(s) > 1 else val
+        val, prev = latest_pair(s)
         stat, col = calculate_status('fedfunds', val, val - prev)
         hist = series_to_history(s, 90)
+        observations['fedfunds'] = s
         metrics_buffer.append(Metric(
             id='fedfunds', name='联邦基金利率', ticker='FRED: FEDFUNDS', unit='%', value=val,
             description='美联储政策利率，决定市场流动性。加息周期收紧流动性，压制高估值资产；降息周期释放流动性，利好成长股。关注美联储点阵图(Dot Plot)和FOMC声明。',
@@ -68,11 +103,11 @@ def update_metrics():
     # --- 3. NASDAQ Index (Trend Chart) ---
     s_nasdaq = get_fred_series(fred, 'NASDAQCOM')
     if not s_nasdaq.empty:
-        val = s_nasdaq.iloc[-1]
-        prev = s_nasdaq.iloc[-2] if len(s_nasdaq) > 1 else val
+        val, prev = latest_pair(s_nasdaq)
         change = (val - prev) / prev
         stat, col = calculate_status('nasdaq_index', val, change)
         hist = series_to_history(s_nasdaq, 90)
+        observations['nasdaq_index'] = s_nasdaq
         metrics_buffer.append(Metric(
             id='nasdaq_index', name='纳斯达克指数', ticker='FRED: NASDAQCOM', unit='点', 
             value=val, secondary_value=round(change*100, 2),
@@ -83,11 +118,11 @@ def update_metrics():
     # --- 3.5 NASDAQ 100 Index (Trend Chart) ---
     s_ndx = get_fred_series(fred, 'NASDAQ100')
     if not s_ndx.empty:
-        val = s_ndx.iloc[-1]
-        prev = s_ndx.iloc[-2] if len(s_ndx) > 1 else val
+        val, prev = latest_pair(s_ndx)
         change = (val - prev) / prev
         stat, col = calculate_status('nasdaq100_index', val, change)
         hist = series_to_history(s_ndx, 90)
+        observations['nasdaq100_index'] = s_ndx
         metrics_buffer.append(Metric(
             id='nasdaq100_index', name='纳斯达克100', ticker='FRED: NASDAQ100', unit='点', 
             value=val, secondary_value=round(change*100, 2),
@@ -98,11 +133,11 @@ def update_metrics():
     # --- 4. S&P 500 Index (Trend Chart) ---
     s_sp500 = get_fred_series(fred, 'SP500')
     if not s_sp500.empty:
-        val = s_sp500.iloc[-1]
-        prev = s_sp500.iloc[-2] if len(s_sp500) > 1 else val
+        val, prev = latest_pair(s_sp500)
         change = (val - prev) / prev
         stat, col = calculate_status('sp500_index', val, change)
         hist = series_to_history(s_sp500, 90)
+        observations['sp500_index'] = s_sp500
         metrics_buffer.append(Metric(
             id='sp500_index', name='标普500指数', ticker='FRED: SP500', unit='点', 
             value=val, secondary_value=round(change*100, 2),
@@ -116,11 +151,11 @@ def update_metrics():
         df = pd.DataFrame({'nasdaq': s_nasdaq, 'sp500': s_sp500}).dropna()
         if not df.empty:
             df['ratio'] = df['nasdaq'] / df['sp500']
-            val = df['ratio'].iloc[-1]
-            prev = df['ratio'].iloc[-2] if len(df) > 1 else val
+            val, prev = latest_pair(df['ratio'])
             change = (val - prev) / prev
             stat, col = calculate_status('tech_strength', val, change)
             hist = series_to_history(df['ratio'], 90)
+            observations['tech_strength'] = df['ratio']
             metrics_buffer.append(Metric(
                 id='tech_strength', name='科技相对强度', ticker='FRED: Nasdaq/SP500', unit='比率', 
                 value=val, secondary_value=round(change*100, 2),
@@ -141,6 +176,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('vxn', val)
         hist = series_to_history(s, 90)
+        observations['vxn'] = s
         metrics_buffer.append(Metric(
             id='vxn', name='纳指波动率', ticker=ticker_display, unit='', value=val,
             description='CBOE编制的纳斯达克100波动率指数。反映市场对未杨30天的预期波动。<15表示市场过于乐观；15-25为正常区间；>30表示恐慌踩踏，常为反向买入机会。',
@@ -153,6 +189,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('hyd', val)
         hist = series_to_history(s, 90)
+        observations['hyd'] = s
         metrics_buffer.append(Metric(
             id='hyd', name='高收益债利差', ticker='FRED: HY Spread', unit='%', value=val,
             description='高收益债券与国债的收益率差额，反映信用风险溢价。<3.5%表示信用市场健康；4%-5%为警戒区间；>5%表示信用收紧严重，企业融资困难。',
@@ -165,6 +202,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('dxy', val)
         hist = series_to_history(s, 90)
+        observations['dxy'] = s
         metrics_buffer.append(Metric(
             id='dxy', name='广义美元指数', ticker='FRED: Broad Dollar', unit='', value=val,
             description='美联储编制的贸易加权美元指数，覆盖主要贸易伙伴货币。美元走强会压缩跨国企业海外营收换算，影响EPS。基期2006年=100。',
@@ -177,6 +215,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('stress', val)
         hist = series_to_history(s, 90)
+        observations['stress'] = s
         metrics_buffer.append(Metric(
             id='stress', name='金融压力指数', ticker='FRED: STLFSI4', unit='', value=val,
             description='圣路易斯联储编制的金融市场压力综合指标，综合利率、汇率、信用等多维度数据。0为正常基准；>0表示金融环境趋紧；<0表示宽松。',
@@ -189,6 +228,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('curve', val)
         hist = series_to_history(s, 90)
+        observations['curve'] = s
         metrics_buffer.append(Metric(
             id='curve', name='收益率曲线利差', ticker='FRED: 10Y-2Y', unit='%', value=val,
             description='10年期与2年期美债收益率之差。负值(倒挂)是著名的衰退预警信号，历史上曾准确预测多次衰退。',
@@ -206,6 +246,7 @@ def update_metrics():
             val = s_yoy.iloc[-1]
             stat, col = calculate_status('margin', val)
             hist = series_to_history(s_yoy, 20)
+            observations['margin'] = s_yoy
             metrics_buffer.append(Metric(
                 id='margin', name='融资余额增速', ticker='FRED: Margin Debt', unit='YoY%', value=val,
                 description='证券保证金贷款的同比增速，反映市场杠杆水平。高增速(>30%)往往伴随市场过热；负增长可能预示市场调整。极端值常与市场顶部/底部关联。',
@@ -227,6 +268,7 @@ def update_metrics():
             val = ratio.iloc[-1]
             stat, col = calculate_status('buffett', val)
             hist = series_to_history(ratio, 90)
+            observations['buffett'] = ratio
             metrics_buffer.append(Metric(
                 id='buffett', name='市场估值指标', ticker='FRED: SP500/GDP', unit='', value=val,
                 description='基于SP500指数与GDP比值的趋势追踪指标（非真正巴菲特指数）。数值上升表示估值扩张，下降表示估值收缩。关注趋势变化而非绝对数值。',
@@ -242,6 +284,7 @@ def update_metrics():
             val = s_yoy.iloc[-1]
             stat, col = calculate_status('cpi', val)
             hist = series_to_history(s_yoy, 24)
+            observations['cpi'] = s_yoy
             metrics_buffer.append(Metric(
                 id='cpi', name='CPI 通胀率', ticker='FRED: CPI', unit='YoY%', value=val,
                 description='消费者物价指数同比增速，美联储货币政策的核心参考。美联储2%目标；>3%可能触发鹰派立场，压制估值；<2%可能触发鸽派立场。',
@@ -257,6 +300,7 @@ def update_metrics():
             val = s_yoy.iloc[-1]
             stat, col = calculate_status('indpro', val)
             hist = series_to_history(s_yoy, 24)
+            observations['indpro'] = s_yoy
             metrics_buffer.append(Metric(
                 id='indpro', name='工业生产指数', ticker='FRED: INDPRO', unit='YoY%', value=val,
                 description='衡量制造业、采矿业和公用事业的实际产出。同比负增长 (<0%) 通常标志着经济进入收缩期。',
@@ -269,6 +313,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('unrate', val)
         hist = series_to_history(s, 24)
+        observations['unrate'] = s
         metrics_buffer.append(Metric(
             id='unrate', name='失业率', ticker='FRED: UNRATE', unit='%', value=val,
             description='美国劳动力市场核心指标。历史上失业率快速上升(萝姆规则: 3个月均线比近12个月低点上南0.5%)时，衰退已经开始。<4%为充分就业。',
@@ -282,6 +327,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('vix', val)
         hist = series_to_history(s, 90)
+        observations['vix'] = s
         metrics_buffer.append(Metric(
             id='vix', name='标普500波动率', ticker='FRED: VIX', unit='', value=val,
             description='CBOE编制的标普500波动率指数，被称为“恐慌指数”。12-20为正常区间；<12表示市场过度自满；>30表示极度恐慌，历史上常为中长期买点。',
@@ -297,6 +343,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('real_yield', val)
         hist = series_to_history(s, 90)
+        observations['real_yield'] = s
         metrics_buffer.append(Metric(
             id='real_yield', name='10年期实际利率', ticker='FRED: DFII10', unit='%', value=val,
             description='10年期TIPS收益率，反映剰切除通胀后的真实回报。与黄金呈强负相关：实际利率>2%显著利空黄金（持有黄金的机会成本高）；<0%强利好黄金（负利率环境）。',
@@ -310,6 +357,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('breakeven', val)
         hist = series_to_history(s, 90)
+        observations['breakeven'] = s
         metrics_buffer.append(Metric(
             id='breakeven', name='10年期通胀预期', ticker='FRED: T10YIE', unit='%', value=val,
             description='10年期名义国债与TIPS的收益率差，反映市场对未杩10年平均通胀的预期。>2.5%表示通胀预期升温，利好黄金；<2%表示通缩预期，利空黄金。',
@@ -319,11 +367,12 @@ def update_metrics():
     # --- 19. Fed Total Assets (Balance Sheet) ---
     s = get_fred_series(fred, 'WALCL')
     if not s.empty:
-        val = s.iloc[-1] / 1e6  # Convert to Trillions
-        prev = s.iloc[-2] / 1e6 if len(s) > 1 else val
+        s = s / 1e6  # Convert to Trillions
+        val, prev = latest_pair(s)
         change = val - prev
         stat, col = calculate_status('fed_assets', val, change)
-        hist = [{"date": d.strftime('%Y-%m-%d'), "value": float(v/1e6)} for d, v in s.tail(90).items() if pd.notna(v)]
+        hist = series_to_history(s, 90)
+        observations['fed_assets'] = s
         metrics_buffer.append(Metric(
             id='fed_assets', name='美联储资产负债表', ticker='FRED: WALCL', unit='万亿$', value=val,
             secondary_value=round(change, 3),
@@ -340,6 +389,7 @@ def update_metrics():
             val = s_diff.iloc[-1]
             stat, col = calculate_status('nonfarm', val)
             hist = series_to_history(s_diff, 24)
+            observations['nonfarm'] = s_diff
             metrics_buffer.append(Metric(
                 id='nonfarm', name='非农就业变化', ticker='FRED: PAYEMS', unit='千人/月', value=val,
                 description='每月新增就业人数。>200千人=就业强劲（美联储偏鹰，利空黄金）；<100千人=就业放缓（降息预期升温，利好黄金）。',
@@ -354,6 +404,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('dxy', val)
         hist = series_to_history(s, 90)
+        observations['gold_dxy'] = s
         metrics_buffer.append(Metric(
             id='gold_dxy', name='美元指数', ticker='FRED: Broad Dollar', unit='', value=val,
             description='贸易加权美元指数。黄金以美元计价，两者约70-80%时间呈负相关。美元走强压制金价；美元走弱提振金价。但危机时期可能同涨(避险需求)。',
@@ -366,6 +417,7 @@ def update_metrics():
         val = s.iloc[-1]
         stat, col = calculate_status('unrate', val)
         hist = series_to_history(s, 24)
+        observations['gold_unrate'] = s
         metrics_buffer.append(Metric(
             id='gold_unrate', name='失业率', ticker='FRED: UNRATE', unit='%', value=val,
             description='经济衰退的重要确认信号。失业率趋势性上升意味着经济进入衰退，美联储将被迫降息，金价往往迎来重要上涨行情。参考萝姆规则判断衰退。',
@@ -377,11 +429,11 @@ def update_metrics():
     # --- 23. NASDAQ Gold Index (日度) ---
     s_gold_idx = get_fred_series(fred, 'NASDAQQGLDI')
     if not s_gold_idx.empty:
-        val = s_gold_idx.iloc[-1]
-        prev = s_gold_idx.iloc[-2] if len(s_gold_idx) > 1 else val
+        val, prev = latest_pair(s_gold_idx)
         change = (val - prev) / prev
         stat, col = calculate_status('gold_index', val, change)
         hist = series_to_history(s_gold_idx, 90)
+        observations['gold_index'] = s_gold_idx
         metrics_buffer.append(Metric(
             id='gold_index', name='黄金趋势指数', ticker='NASDAQ Gold Index', unit='点', 
             value=val, secondary_value=round(change*100, 2),
@@ -392,11 +444,11 @@ def update_metrics():
     # --- 24. NASDAQ Silver Index (日度) ---
     s_silver_idx = get_fred_series(fred, 'NASDAQQSLVO')
     if not s_silver_idx.empty:
-        val = s_silver_idx.iloc[-1]
-        prev = s_silver_idx.iloc[-2] if len(s_silver_idx) > 1 else val
+        val, prev = latest_pair(s_silver_idx)
         change = (val - prev) / prev
         stat, col = calculate_status('silver_index', val, change)
         hist = series_to_history(s_silver_idx, 90)
+        observations['silver_index'] = s_silver_idx
         metrics_buffer.append(Metric(
             id='silver_index', name='白银趋势指数', ticker='NASDAQ Silver Index', unit='点', 
             value=val, secondary_value=round(change*100, 2),
@@ -407,10 +459,43 @@ def update_metrics():
     # Save to DB
     try:
         if metrics_buffer:
+            # 先写观测表：滚动统计据变更行识别历史修订并从观测表重建
+            changed_observations = save_observations(session, observations)
+            stats = update_rolling_stats(session, observations, changed_observations)
             for m in metrics_buffer:
-                session.merge(m)
+                if stats.get(m.id):
+                    m.stats_json = json.dumps(stats[m.id])
+            changed_metrics = diff_metrics(session, metrics_buffer)
+            update_tiers(session, changed_observations)
+            # 状态切换事件与指标更新同一事务提交
+            record_transitions(session, metrics_buffer)
+            # 指标表经 staging 表原子替换，读者不会看到部分更新
+            swap_metrics(session, metric_rows(metrics_buffer))
             session.commit()
             logger.info(f"Updated {len(metrics_buffer)} metrics successfully.")
+            # 提交后的派生数据刷新失败只记录日志，不影响 delta 发布（publish_snapshot 自行记录失败）
+            try:
+                refresh_archive(row['metric_id'] for row in changed_observations)
+            except Exception as e:
+                logger.error(f"Archive refresh failed: {e}")
+            publish_snapshot(session)
+            try:
+                precompute_correlations(session)
+            except Exception as e:
+                logger.error(f"Correlation precompute failed: {e}")
+                session.rollback()
+            # 后台投递新事件及此前失败的积压事件
+            dispatch_in_background()
+
+            if publish:
+                # 发布增量数据包，服务器据此同步，无需拉取整个数据库
+                try:
+                    publish_delta(session, changed_observations, changed_metrics, ledger.to_record(True))
+                    session.commit()
+                except Exception as e:
+                    logger.error(f"Delta publish failed: {e}")
+                    session.rollback()
+                    return False
             return True
         else:
             logger.warning("No metrics fetched. Check internet connection or API Key.")
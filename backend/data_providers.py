@@ -0,0 +1,172 @@
+"""
+数据源提供者
+update_metrics 通过统一的 get_series(series_id, observation_start, observation_end) 接口取数，
+可在以下实现之间切换（环境变量 DATA_PROVIDER）：
+  fred / http - FRED series/observations 接口（FRED_API_BASE，默认在线 FRED，可指向本地 stand-in）
+  fredapi     - fredapi 库（无连接复用与限流，仅作兼容保留）
+  fixtures    - 本地 CSV / Parquet 目录
+"""
+import os
+import zlib
+import datetime
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+import pandas as pd
+from fred_client import get_client
+from fred_cache import get_cache, normalize_start
+from config import FRED_API_KEY, DATA_PROVIDER, FRED_FIXTURE_DIR, FRED_API_BASE, FRED_SERIES_FREQ
+
+# 频率 -> pandas 日期频率，用于生成合成数据
+_FREQ_CODES = {'每日': 'B', '每周': 'W-FRI', '每月': 'MS', '每季度': 'QS'}
+
+# 合成数据的大致量级 (基准值, 单步波动)
+_SYNTHETIC_LEVELS = {
+    'DGS10': (4.2, 0.05), 'FEDFUNDS': (4.5, 0.1), 'NASDAQCOM': (18000, 180), 'NASDAQ100': (20000, 200),
+    'SP500': (5500, 40), 'VXNCLS': (22, 1.2), 'VIXCLS': (18, 1.0), 'BAMLH0A0HYM2': (3.5, 0.05),
+    'DTWEXBGS': (120, 0.3), 'STLFSI4': (-0.5, 0.1), 'T10Y2Y': (0.3, 0.03), 'BOGZ1FL663067003Q': (800000, 15000),
+    'GDP': (28000, 150), 'CPIAUCSL': (310, 0.6), 'INDPRO': (103, 0.4), 'UNRATE': (4.1, 0.1),
+    'DFII10': (1.8, 0.04), 'T10YIE': (2.3, 0.02), 'WALCL': (7000000, 20000), 'PAYEMS': (158000, 150),
+    'NASDAQQGLDI': (3000, 25), 'NASDAQQSLVO': (1400, 20),
+}
+
+
+class DataProvider(ABC):
+    """数据源接口：与 fredapi.Fred.get_series 保持相同的调用方式"""
+    name = 'base'
+
+    @abstractmethod
+    def get_series(self, series_id: str, observation_start: Optional[str] = None,
+                   observation_end: Optional[str] = None) -> pd.Series:
+        """返回以日期为索引的观测序列"""
+
+
+class FredApiProvider(DataProvider):
+    """在线 FRED（fredapi）"""
+    name = 'fredapi'
+
+    def __init__(self, api_key: str = FRED_API_KEY):
+        from fredapi import Fred
+        self._fred = Fred(api_key=api_key)
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        return self._fred.get_series(series_id, observation_start=observation_start,
+                                     observation_end=observation_end)
+
+
+class FixtureProvider(DataProvider):
+    """
+    本地目录数据源：<dir>/<SERIES_ID>.csv 或 .parquet，列为 date, value
+    缺失值可写作空或 '.'（与 FRED 一致）
+    """
+    name = 'fixtures'
+
+    def __init__(self, directory: str = FRED_FIXTURE_DIR):
+        self.directory = directory
+        self._cache = {}
+
+    def _load(self, series_id: str) -> pd.Series:
+        if series_id in self._cache:
+            return self._cache[series_id]
+
+        csv_path = os.path.join(self.directory, f'{series_id}.csv')
+        parquet_path = os.path.join(self.directory, f'{series_id}.parquet')
+        if os.path.exists(csv_path):
+            df = pd.read_csv(csv_path, na_values=['.'])
+        elif os.path.exists(parquet_path):
+            df = pd.read_parquet(parquet_path)
+        else:
+            raise FileNotFoundError(f"No fixture for {series_id} in {self.directory}")
+
+        s = pd.Series(pd.to_numeric(df['value'], errors='coerce').to_numpy(),
+                      index=pd.to_datetime(df['date']), name=series_id).sort_index()
+        self._cache[series_id] = s
+        return s
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        s = self._load(series_id)
+        if observation_start:
+            s = s[observation_start:]
+        if observation_end:
+            s = s[:observation_end]
+        return s.copy()
+
+
+class HttpFredProvider(DataProvider):
+    """
+    FRED REST 接口数据源（/series/observations），默认指向在线 FRED，
+    也可指向本地 stand-in；请求经由共享的限流 / 重试 / 熔断客户端，响应写入磁盘缓存
+    """
+    name = 'http'
+
+    def __init__(self, base_url: str = FRED_API_BASE, api_key: str = FRED_API_KEY, use_cache: bool = True):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.client = get_client(self.base_url)
+        self.cache = get_cache() if use_cache else None
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        params = {'series_id': series_id, 'api_key': self.api_key, 'file_type': 'json'}
+        # 请求区间的起点按年对齐，缓存键不随当天日期变化；多取的部分在本地截掉
+        if observation_start:
+            params['observation_start'] = normalize_start(observation_start)
+        if observation_end:
+            params['observation_end'] = observation_end
+
+        payload = self.cache.get(series_id, params) if self.cache else None
+        if payload is None:
+            payload = self.client.get_json(f'{self.base_url}/series/observations', params)
+            if self.cache:
+                self.cache.put(series_id, params, payload)
+        s = parse_observations(payload, series_id)
+        if observation_start:
+            s = s[s.index >= pd.Timestamp(observation_start)]
+        return s
+
+
+def parse_observations(payload: dict, series_id: str) -> pd.Series:
+    """解析 FRED series/observations JSON 为 pandas Series"""
+    observations = payload.get('observations', [])
+    if not observations:
+        return pd.Series(dtype=float, name=series_id)
+    df = pd.DataFrame(observations, columns=['date', 'value'])
+    return pd.Series(pd.to_numeric(df['value'], errors='coerce').to_numpy(),
+                     index=pd.to_datetime(df['date']), name=series_id)
+
+
+def synthetic_series(series_id: str, start: str = '1990-01-01', end: Optional[str] = None) -> pd.Series:
+    """
+    生成确定性的合成序列（同一 series_id 结果恒定），频率取自 FRED_SERIES_FREQ
+    供本地 stand-in 与基准测试在无网络时使用
+    """
+    s = _synthetic_full(series_id, end or datetime.date.today().isoformat())
+    return s[start:].copy()
+
+
+@lru_cache(maxsize=64)
+def _synthetic_full(series_id: str, end: str) -> pd.Series:
+    """在固定起点上生成完整序列，保证不同查询区间得到的数据一致"""
+    freq = _FREQ_CODES.get(FRED_SERIES_FREQ.get(series_id, '每日'), 'B')
+    index = pd.date_range('1990-01-01', end, freq=freq)
+    level, step = _SYNTHETIC_LEVELS.get(series_id, (100.0, 1.0))
+    rng = np.random.default_rng(zlib.crc32(series_id.encode('utf-8')))
+    # 围绕基准值的均值回复随机游走
+    values = np.empty(len(index))
+    current = level
+    for i, shock in enumerate((rng.standard_normal(len(index)) * step).tolist()):
+        current += shock + (level - current) * 0.01
+        values[i] = current
+    return pd.Series(values, index=index, name=series_id)
+
+
+def get_provider(name: Optional[str] = None) -> DataProvider:
+    """按名称（默认取 DATA_PROVIDER 配置）创建数据源"""
+    name = (name or DATA_PROVIDER).lower()
+    if name in ('fred', 'http'):
+        return HttpFredProvider()
+    if name == 'fredapi':
+        return FredApiProvider()
+    if name == 'fixtures':
+        return FixtureProvider()
+    raise ValueError(f"Unknown data provider: {name}")
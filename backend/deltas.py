@@ -0,0 +1,232 @@
+"""
+增量数据包（delta）发布与应用
+每次获取数据后，把新增/变化的观测值和指标摘要写成一个内容寻址的压缩包
+deltas/objects/<sha256>.json.gz，并在 deltas/manifest.json 中追加一个版本。
+服务器拉取仓库后按顺序应用本地版本之后的所有 delta，无需同步整个 SQLite 文件。
+应用时把 delta 中的观测值推入本地滚动统计状态（metric_stats），
+使 CI 上的统计窗口随已发布数据持续累积，而不局限于单次获取的区间；
+delta 携带的获取台账记录（fetch_run）同时写入本地 fetch_runs / series_freshness。
+"""
+import os
+import gzip
+import json
+import hashlib
+import datetime
+from typing import Dict, List, Optional, Any
+import pandas as pd
+from config import DELTA_DIR, logger
+from models import Metric, StoreMeta
+from observation_store import upsert_observation_rows, bump_data_version
+from archive import refresh_archive
+from history_tiers import update_tiers
+from rolling_stats import update_rolling_stats
+from metric_store import swap_metrics
+from snapshot import publish_snapshot
+from correlation import precompute_correlations
+from alerts import record_transitions, dispatch_in_background
+from fetch_ledger import write_run
+
+MANIFEST_FILE = os.path.join(DELTA_DIR, 'manifest.json')
+OBJECTS_DIR = os.path.join(DELTA_DIR, 'objects')
+DELTA_VERSION_KEY = 'delta_version'
+DELTA_FORMAT = 1
+
+# 参与比较与同步的指标字段（last_updated 单独携带，不作为变化依据）
+METRIC_FIELDS = [
+    'id', 'name', 'ticker', 'value', 'secondary_value', 'unit', 'description',
+    'status_text', 'status_color', 'history_json', 'stats_json'
+]
+
+
+# ==================== 版本与清单 ====================
+
+def load_manifest() -> Dict[str, Any]:
+    """读取清单，不存在时返回空清单"""
+    if not os.path.exists(MANIFEST_FILE):
+        return {'format': DELTA_FORMAT, 'head': 0, 'versions': []}
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: Dict[str, Any]):
+    os.makedirs(DELTA_DIR, exist_ok=True)
+    tmp = MANIFEST_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def get_local_version(session) -> int:
+    """本地数据库已应用到的 delta 版本"""
+    meta = session.get(StoreMeta, DELTA_VERSION_KEY)
+    return int(meta.value) if meta else 0
+
+
+def _set_local_version(session, version: int):
+    session.merge(StoreMeta(key=DELTA_VERSION_KEY, value=str(version)))
+
+
+# ==================== 变更收集 ====================
+
+def metric_to_row(m: Metric) -> Dict[str, Any]:
+    """Metric -> 可序列化字典"""
+    row = {field: getattr(m, field) for field in METRIC_FIELDS}
+    row['value'] = float(row['value']) if row['value'] is not None else None
+    if row['secondary_value'] is not None:
+        row['secondary_value'] = float(row['secondary_value'])
+    return row
+
+
+def diff_metrics(session, metrics_buffer: List[Metric]) -> List[Dict[str, Any]]:
+    """与库中现有行比较，返回内容发生变化的指标摘要"""
+    existing = {m.id: metric_to_row(m) for m in session.query(Metric).all()}
+    changed = []
+    for m in metrics_buffer:
+        row = metric_to_row(m)
+        if existing.get(m.id) != row:
+            changed.append(row)
+    return changed
+
+
+# ==================== 发布 ====================
+
+def publish_delta(session, observation_rows: List[Dict], metric_rows: List[Dict],
+                  fetch_run: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """
+    将本次变更写成新的 delta 版本，返回版本号；无变更时返回 None
+    fetch_run: 本次获取的台账记录（FetchLedger.to_record），服务器应用时写入本地台账
+    调用方需在数据库事务提交后调用，并负责提交本地版本号
+    """
+    if not observation_rows and not metric_rows:
+        logger.info("No data changes, skip delta publish")
+        return None
+
+    manifest = load_manifest()
+    local_version = get_local_version(session)
+    if local_version != manifest['head']:
+        # 本地库落后于清单时发布会产生分叉
+        raise RuntimeError(f"Local store at delta v{local_version}, manifest head is v{manifest['head']}; apply deltas first")
+
+    version = manifest['head'] + 1
+    observations: Dict[str, List] = {}
+    for row in observation_rows:
+        observations.setdefault(row['metric_id'], []).append([row['date'].isoformat(), row['value']])
+
+    payload = {
+        'format': DELTA_FORMAT,
+        'version': version,
+        'parent': manifest['head'],
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'observations': observations,
+        'metrics': metric_rows
+    }
+    if fetch_run is not None:
+        payload['fetch_run'] = fetch_run
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    blob = gzip.compress(body, mtime=0)  # 固定 mtime 保证内容寻址稳定
+    digest = hashlib.sha256(blob).hexdigest()
+
+    os.makedirs(OBJECTS_DIR, exist_ok=True)
+    object_path = os.path.join(OBJECTS_DIR, f'{digest}.json.gz')
+    if not os.path.exists(object_path):
+        with open(object_path + '.tmp', 'wb') as f:
+            f.write(blob)
+        os.replace(object_path + '.tmp', object_path)
+
+    manifest['versions'].append({
+        'version': version,
+        'parent': manifest['head'],
+        'object': digest,
+        'size': len(blob),
+        'observations': len(observation_rows),
+        'metrics': len(metric_rows),
+        'created_at': payload['created_at']
+    })
+    manifest['head'] = version
+    _save_manifest(manifest)
+    _set_local_version(session, version)
+
+    logger.info(f"Published delta v{version}: {len(observation_rows)} observations, "
+                f"{len(metric_rows)} metrics, {len(blob)} bytes")
+    return version
+
+
+# ==================== 应用 ====================
+
+def _read_object(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """读取并校验 delta 对象"""
+    path = os.path.join(OBJECTS_DIR, f"{entry['object']}.json.gz")
+    with open(path, 'rb') as f:
+        blob = f.read()
+    if hashlib.sha256(blob).hexdigest() != entry['object']:
+        raise ValueError(f"Delta v{entry['version']} checksum mismatch")
+    return json.loads(gzip.decompress(blob).decode('utf-8'))
+
+
+def _apply_one(session, payload: Dict[str, Any], metric_updates: Dict[str, Dict]) -> List[Dict]:
+    """写入观测值并返回写入的行；指标行收集到 metric_updates，全部 delta 应用后一次替换"""
+    rows = [
+        {'metric_id': metric_id, 'date': datetime.date.fromisoformat(d), 'value': v}
+        for metric_id, points in payload.get('observations', {}).items()
+        for d, v in points
+    ]
+    if rows:
+        upsert_observation_rows(session, rows)
+
+    if payload.get('fetch_run'):
+        write_run(session, payload['fetch_run'])
+
+    updated_at = datetime.datetime.fromisoformat(payload['created_at'])
+    for row in payload.get('metrics', []):
+        metric_updates[row['id']] = dict(row, last_updated=updated_at)
+    return rows
+
+
+def _series_map(rows: List[Dict]) -> Dict[str, pd.Series]:
+    """观测行 -> metric_id -> 按日期排序的序列（同一日期取最后写入的值）"""
+    points: Dict[str, Dict] = {}
+    for row in rows:
+        points.setdefault(row['metric_id'], {})[row['date']] = row['value']
+    return {metric_id: pd.Series(p, dtype=float).sort_index() for metric_id, p in points.items()}
+
+
+def apply_pending_deltas(session) -> int:
+    """按版本顺序应用本地尚未应用的 delta，返回应用数量"""
+    manifest = load_manifest()
+    local_version = get_local_version(session)
+    pending = [v for v in manifest['versions'] if v['version'] > local_version]
+
+    touched = set()
+    changed_rows: List[Dict] = []
+    metric_updates: Dict[str, Dict] = {}
+    for entry in pending:
+        payload = _read_object(entry)
+        if payload['parent'] != local_version:
+            raise ValueError(f"Delta v{entry['version']} expects parent v{payload['parent']}, local is v{local_version}")
+        changed_rows.extend(_apply_one(session, payload, metric_updates))
+        touched.update(payload.get('observations', {}).keys())
+        local_version = entry['version']
+        _set_local_version(session, local_version)
+
+    if pending:
+        if metric_updates:
+            # 状态切换与替换前的指标表比较，随本次应用一起提交
+            record_transitions(session, list(metric_updates.values()))
+            swap_metrics(session, list(metric_updates.values()))
+        update_tiers(session, changed_rows)
+        update_rolling_stats(session, _series_map(changed_rows), changed_rows)
+        bump_data_version(session)
+        session.commit()
+        try:
+            refresh_archive(touched)
+        except Exception as e:
+            logger.error(f"Archive refresh failed: {e}")
+        publish_snapshot(session)
+        try:
+            precompute_correlations(session)
+        except Exception as e:
+            logger.error(f"Correlation precompute failed: {e}")
+            session.rollback()
+        dispatch_in_background()
+        logger.info(f"Applied {len(pending)} deltas, local store now at v{local_version}")
+    return len(pending)
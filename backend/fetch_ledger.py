@@ -0,0 +1,223 @@
+"""
+数据获取台账
+update_metrics 的每次运行写入 fetch_runs（总耗时、成败）与 fetch_series_results
+（每个序列的请求次数、耗时、返回行数、最新观测日期、错误类型），
+并更新 series_freshness 中每个序列的最新状态与连续失败次数。
+CI 上的运行记录随发布的 delta 携带（fetch_run），服务器应用 delta 时写入本地台账。
+新鲜度按 FRED_SERIES_FREQ 的发布频率判断：最新观测日期距今超过 FRESHNESS_MAX_AGE_DAYS 即视为过期。
+"""
+import time
+import datetime
+import threading
+from typing import Dict, List, Optional, Any
+import pandas as pd
+from config import FRED_SERIES_FREQ, FRESHNESS_MAX_AGE_DAYS, FETCH_LEDGER_KEEP_RUNS, logger
+from models import Session, FetchRun, FetchSeriesResult, SeriesFreshness
+from data_providers import DataProvider
+
+
+class FetchLedger:
+    """收集一次运行中各序列的获取结果，运行结束后一次写入"""
+
+    def __init__(self, provider_name: str):
+        self.provider_name = provider_name
+        self.started_at = datetime.datetime.utcnow()
+        self._started = time.perf_counter()
+        self.series: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, provider: DataProvider) -> 'RecordingProvider':
+        return RecordingProvider(provider, self)
+
+    def record(self, series_id: str, seconds: float, s: Optional[pd.Series] = None,
+               error: Optional[BaseException] = None):
+        rows, last_date = 0, None
+        if s is not None:
+            s = s.dropna()
+            rows = len(s)
+            if rows:
+                last_date = pd.Timestamp(s.index.max()).date()
+        with self._lock:
+            entry = self.series.setdefault(series_id, {'calls': 0, 'latency_ms': 0.0, 'rows': 0,
+                                                       'last_date': None, 'error_class': None})
+            entry['calls'] += 1
+            entry['latency_ms'] += seconds * 1000
+            entry['rows'] = max(entry['rows'], rows)
+            if last_date and (entry['last_date'] is None or last_date > entry['last_date']):
+                entry['last_date'] = last_date
+            if error is not None:
+                entry['error_class'] = type(error).__name__
+            elif rows == 0 and entry['error_class'] is None:
+                entry['error_class'] = 'EmptySeries'
+
+    def to_record(self, success: bool, error: Optional[str] = None) -> Dict[str, Any]:
+        """本次运行的可序列化记录（随 delta 发布，服务器应用时写入本地台账）"""
+        return {
+            'provider': self.provider_name,
+            'started_at': self.started_at.isoformat(),
+            'wall_seconds': round(time.perf_counter() - self._started, 3),
+            'success': bool(success),
+            'error': error,
+            'series': {sid: dict(e, latency_ms=round(e['latency_ms'], 1),
+                                 last_date=e['last_date'].isoformat() if e['last_date'] else None)
+                       for sid, e in self.series.items()}
+        }
+
+    def save(self, success: bool, error: Optional[str] = None) -> Optional[int]:
+        """写入本次运行并更新各序列新鲜度；写入失败只记录日志"""
+        session = Session()
+        try:
+            run_id = write_run(session, self.to_record(success, error))
+            session.commit()
+            return run_id
+        except Exception as e:
+            logger.error(f"Failed to write fetch ledger: {e}")
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+
+def write_run(session, record: Dict[str, Any]) -> int:
+    """
+    写入一条运行记录（FetchLedger.to_record 的格式）并更新各序列新鲜度，由调用方提交
+    本地运行与 delta 中携带的 CI 运行记录都经此写入
+    """
+    started_at = datetime.datetime.fromisoformat(record['started_at'])
+    series = {sid: dict(e, last_date=datetime.date.fromisoformat(e['last_date']) if e['last_date'] else None)
+              for sid, e in record['series'].items()}
+    failed = [sid for sid, e in series.items() if e['error_class']]
+
+    run = FetchRun(provider=record['provider'], started_at=started_at, wall_seconds=record['wall_seconds'],
+                   series_count=len(series), failed_count=len(failed),
+                   success=1 if record['success'] else 0, error=record.get('error'))
+    session.add(run)
+    session.flush()
+
+    session.add_all(FetchSeriesResult(run_id=run.id, series_id=sid, calls=e['calls'],
+                                      latency_ms=e['latency_ms'], rows=e['rows'],
+                                      last_date=e['last_date'], error_class=e['error_class'])
+                    for sid, e in series.items())
+
+    existing = {f.series_id: f for f in session.query(SeriesFreshness)}
+    for sid, e in series.items():
+        fresh = existing.get(sid) or SeriesFreshness(series_id=sid, consecutive_failures=0)
+        fresh.last_run_id = run.id
+        fresh.latency_ms = e['latency_ms']
+        if e['error_class']:
+            fresh.consecutive_failures = (fresh.consecutive_failures or 0) + 1
+            fresh.last_error_class = e['error_class']
+        else:
+            fresh.consecutive_failures = 0
+            fresh.last_success_at = started_at
+            fresh.last_date = max(filter(None, [fresh.last_date, e['last_date']]))
+        session.merge(fresh)
+
+    # 只保留最近 FETCH_LEDGER_KEEP_RUNS 次运行
+    cutoff = run.id - FETCH_LEDGER_KEEP_RUNS
+    if cutoff > 0:
+        session.query(FetchSeriesResult).filter(FetchSeriesResult.run_id <= cutoff).delete()
+        session.query(FetchRun).filter(FetchRun.id <= cutoff).delete()
+    logger.info(f"Fetch run {run.id} ({record['provider']}): {len(series)} series, {len(failed)} failed, "
+                f"{record['wall_seconds']:.1f}s" + (f" (failed: {', '.join(sorted(failed))})" if failed else ''))
+    return run.id
+
+
+class RecordingProvider(DataProvider):
+    """包装数据源，记录每次 get_series 的耗时、行数与异常（异常照常抛出）"""
+
+    def __init__(self, inner: DataProvider, ledger: FetchLedger):
+        self.inner = inner
+        self.ledger = ledger
+        self.name = getattr(inner, 'name', type(inner).__name__)
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        started = time.perf_counter()
+        try:
+            s = self.inner.get_series(series_id, observation_start=observation_start,
+                                      observation_end=observation_end)
+        except Exception as e:
+            self.ledger.record(series_id, time.perf_counter() - started, error=e)
+            raise
+        self.ledger.record(series_id, time.perf_counter() - started, s)
+        return s
+
+
+# ==================== 查询 ====================
+
+def _run_dict(run: FetchRun) -> Dict[str, Any]:
+    return {
+        'id': run.id,
+        'provider': run.provider,
+        'startedAt': run.started_at.isoformat() if run.started_at else None,
+        'wallSeconds': run.wall_seconds,
+        'seriesCount': run.series_count,
+        'failedCount': run.failed_count,
+        'success': bool(run.success),
+        'error': run.error
+    }
+
+
+def freshness_report(today: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    各序列新鲜度：status 为 fresh / stale（最新观测过旧）/ failing（最近一次获取失败）/ missing（从未获取成功）
+    """
+    today = today or datetime.datetime.utcnow().date()
+    session = Session()
+    try:
+        rows = {f.series_id: f for f in session.query(SeriesFreshness)}
+        last_run = session.query(FetchRun).order_by(FetchRun.id.desc()).first()
+
+        series = []
+        for sid, freq in FRED_SERIES_FREQ.items():
+            f = rows.get(sid)
+            max_age = FRESHNESS_MAX_AGE_DAYS.get(freq)
+            age = (today - f.last_date).days if f and f.last_date else None
+            if f is None or f.last_date is None:
+                status = 'missing'
+            elif f.consecutive_failures:
+                status = 'failing'
+            elif max_age is not None and age > max_age:
+                status = 'stale'
+            else:
+                status = 'fresh'
+            series.append({
+                'id': sid,
+                'frequency': freq,
+                'status': status,
+                'lastObservation': f.last_date.isoformat() if f and f.last_date else None,
+                'ageDays': age,
+                'maxAgeDays': max_age,
+                'lastSuccessAt': f.last_success_at.isoformat() if f and f.last_success_at else None,
+                'consecutiveFailures': f.consecutive_failures if f else 0,
+                'lastErrorClass': f.last_error_class if f and f.consecutive_failures else None,
+                'latencyMs': f.latency_ms if f else None
+            })
+        return {
+            'asOf': today.isoformat(),
+            'lastRun': _run_dict(last_run) if last_run else None,
+            'stale': [s['id'] for s in series if s['status'] != 'fresh'],
+            'series': series
+        }
+    finally:
+        session.close()
+
+
+def recent_runs(limit: int = 20, series_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """最近的运行记录（新的在前）；指定 series_id 时附带该序列在每次运行中的结果"""
+    session = Session()
+    try:
+        runs = session.query(FetchRun).order_by(FetchRun.id.desc()).limit(limit).all()
+        result = [_run_dict(r) for r in runs]
+        if series_id and runs:
+            details = {r.run_id: r for r in session.query(FetchSeriesResult).filter(
+                FetchSeriesResult.series_id == series_id, FetchSeriesResult.run_id >= runs[-1].id)}
+            for item in result:
+                d = details.get(item['id'])
+                item['series'] = None if d is None else {
+                    'id': series_id, 'calls': d.calls, 'latencyMs': d.latency_ms, 'rows': d.rows,
+                    'lastDate': d.last_date.isoformat() if d.last_date else None, 'errorClass': d.error_class
+                }
+        return result
+    finally:
+        session.close()
@@ -0,0 +1,161 @@
+"""
+FRED 响应磁盘缓存
+以 series_id + 查询参数为键缓存 series/observations 的原始 JSON 响应。
+起始日期由调用方按当天推算，逐日变化；请求前先用 normalize_start 对齐到所在年的 1 月 1 日，
+使缓存键全年稳定，再在本地按原始区间截取。
+有效期按序列发布频率（FRED_SERIES_FREQ，取值与 META_INFO 的 freq 一致）决定，
+缓存目录总大小超过上限时按最近使用时间（文件 mtime）淘汰。
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional, Any
+from config import (FRED_CACHE_DIR, FRED_CACHE_MAX_MB, FRED_CACHE_TTL, FRED_CACHE_ENABLED,
+                    FRED_SERIES_FREQ, logger)
+from telemetry import CACHE_REQUESTS
+
+_HITS = CACHE_REQUESTS.labels('fred_response', 'hit')
+_MISSES = CACHE_REQUESTS.labels('fred_response', 'miss')
+
+# 不参与缓存键的参数
+_IGNORED_PARAMS = {'api_key', 'file_type'}
+
+
+def normalize_start(observation_start: Optional[str]) -> Optional[str]:
+    """起始日期对齐到所在年的 1 月 1 日（'2024-06-17' -> '2024-01-01'）"""
+    if not observation_start:
+        return observation_start
+    return f'{str(observation_start)[:4]}-01-01'
+
+
+class ResponseCache:
+    """线程安全的 FRED 响应缓存，文件名为 <series_id>-<参数摘要>.json"""
+
+    def __init__(self, directory: str = FRED_CACHE_DIR, max_bytes: int = FRED_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 目录总大小的估计值（首次写入时扫描一次，之后按写入量累加），超过上限时才扫描淘汰
+        self._approx_bytes: Optional[int] = None
+
+    def _path(self, series_id: str, params: Dict[str, Any]) -> str:
+        key = {k: str(v) for k, v in params.items() if k not in _IGNORED_PARAMS and k != 'series_id'}
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f'{series_id}-{digest}.json')
+
+    @staticmethod
+    def ttl_for(series_id: str) -> float:
+        """按发布频率取有效期（秒），未知频率按每日处理"""
+        return FRED_CACHE_TTL.get(FRED_SERIES_FREQ.get(series_id, '每日'), FRED_CACHE_TTL['每日'])
+
+    def get(self, series_id: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """命中且未过期时返回缓存的响应"""
+        path = self._path(series_id, params)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            _MISSES.inc()
+            return None
+
+        if time.time() - entry['fetched_at'] > self.ttl_for(series_id):
+            _MISSES.inc()
+            return None
+
+        # 更新 mtime 作为最近使用时间
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        _HITS.inc()
+        return entry['payload']
+
+    def put(self, series_id: str, params: Dict[str, Any], payload: Dict[str, Any]):
+        """写入响应（临时文件 + 原子替换），随后按大小上限淘汰"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(series_id, params)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        body = json.dumps({'series_id': series_id, 'fetched_at': time.time(), 'payload': payload},
+                          separators=(',', ':'))
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+        with self._lock:
+            # 覆盖写入时重复计入，估计值只会偏大，最多提前触发一次扫描
+            if self._approx_bytes is not None:
+                self._approx_bytes += len(body)
+            over = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """扫描目录，总大小超过上限时删除最久未使用的条目，并校正大小估计值"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            self._approx_bytes = total
+            if total <= self.max_bytes:
+                return
+            removed = 0
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._approx_bytes = total
+            logger.info(f"FRED cache evicted {removed} entries")
+
+    def invalidate(self, series_ids=None) -> int:
+        """删除指定序列（默认全部）的缓存，返回删除数量"""
+        if not os.path.isdir(self.directory):
+            return 0
+        prefixes = tuple(f'{s}-' for s in series_ids) if series_ids else None
+        removed = 0
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                if prefixes and not name.startswith(prefixes):
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+            self._approx_bytes = None
+        logger.info(f"FRED cache invalidated {removed} entries")
+        return removed
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """进程内累计命中 / 未命中次数"""
+        return {'hits': int(_HITS.value()), 'misses': int(_MISSES.value())}
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """进程内共享的缓存实例；FRED_CACHE=0 时禁用，返回 None"""
+    global _cache
+    if not FRED_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,202 @@
+"""
+FRED HTTP 客户端层
+所有对 FRED（或兼容接口）的请求共享：
+  - 令牌桶限流：按 FRED 配额（默认 120 次/分钟）发放令牌，遇到 429 自动降速，成功后逐步恢复
+  - 指数退避重试：429 / 5xx / 连接错误按带抖动的指数退避重试，优先遵循 Retry-After
+  - 按主机熔断：连续失败达到阈值后短时间内直接失败，避免在故障期间继续消耗配额
+  - 连接池：复用 requests.Session 的 keep-alive 连接
+"""
+import time
+import random
+import threading
+from typing import Dict, Optional, Any
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from config import (FRED_RATE_LIMIT_PER_MIN, FRED_RATE_BURST, FRED_MAX_RETRIES,
+                    FRED_BREAKER_THRESHOLD, FRED_BREAKER_RESET_SECONDS, logger)
+from telemetry import FRED_HTTP_RETRIES
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _series_suffix(params: Dict[str, Any]) -> str:
+    return f" (series {params['series_id']})" if params.get('series_id') else ''
+
+
+def _error_message(response: requests.Response) -> str:
+    """FRED 错误响应体中的 error_message"""
+    try:
+        message = response.json().get('error_message')
+    except ValueError:
+        return ''
+    return f": {message}" if message else ''
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+
+class TokenBucket:
+    """线程安全的自适应令牌桶"""
+
+    def __init__(self, rate_per_min: float, burst: int):
+        self.max_rate = rate_per_min / 60.0
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """取得一个令牌，必要时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_throttled(self):
+        """收到 429：速率减半并清空积攒的令牌"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            logger.warning(f"FRED throttled, rate lowered to {self.rate * 60:.0f}/min")
+
+    def on_success(self):
+        """请求成功：速率线性恢复到配额上限"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class CircuitBreaker:
+    """单主机熔断器：closed -> open -> half-open -> closed"""
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError(f"Circuit open for {host}")
+            # 冷却结束，放行试探请求（half-open）
+            self.opened_at = None
+            self.failures = self.threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self, host: str):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                logger.error(f"Circuit opened for {host} after {self.failures} consecutive failures")
+
+
+class FredClient:
+    """带限流、重试、熔断与连接池的共享 HTTP 客户端"""
+
+    def __init__(self, rate_per_min: float = FRED_RATE_LIMIT_PER_MIN, burst: int = FRED_RATE_BURST,
+                 max_retries: int = FRED_MAX_RETRIES, pool_size: int = 16, timeout: float = 30,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.limiter = TokenBucket(rate_per_min, burst)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        with self._breakers_lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(FRED_BREAKER_THRESHOLD, FRED_BREAKER_RESET_SECONDS)
+            return self._breakers[host]
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """带完全抖动的指数退避；服务端给出 Retry-After 时以其为下限"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET 并解析 JSON，可重试错误按退避策略重试"""
+        host = urlparse(url).netloc
+        breaker = self._breaker(host)
+
+        for attempt in range(self.max_retries + 1):
+            breaker.before_request(host)
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                breaker.record_failure(host)
+                # requests 的异常信息包含完整 URL（含 api_key），只保留主机与异常类型
+                error = type(e)(f"{type(e).__name__} from {host}{_series_suffix(params)}")
+                cause = type(e).__name__
+            else:
+                if response.status_code < 400:
+                    breaker.record_success()
+                    self.limiter.on_success()
+                    return response.json()
+                if response.status_code not in RETRYABLE_STATUS:
+                    # 4xx（如序列不存在）不重试，也不计入熔断；错误信息不带查询串（含 api_key）
+                    raise requests.HTTPError(f"{response.status_code} from {host}{_series_suffix(params)}"
+                                             f"{_error_message(response)}", response=response)
+                if response.status_code == 429:
+                    self.limiter.on_throttled()
+                else:
+                    breaker.record_failure(host)
+                retry_after = response.headers.get('Retry-After')
+                error = requests.HTTPError(f"{response.status_code} from {host}", response=response)
+                cause = str(response.status_code)
+
+            if attempt < self.max_retries:
+                FRED_HTTP_RETRIES.labels(cause).inc()
+                delay = self._backoff(attempt, retry_after)
+                logger.warning(f"Request to {host} failed ({error}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+
+        raise error
+
+
+_clients: Dict[str, FredClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str) -> FredClient:
+    """每个主机共享一个客户端（共享令牌桶、熔断器与连接池）"""
+    host = urlparse(base_url).netloc
+    with _clients_lock:
+        if host not in _clients:
+            _clients[host] = FredClient()
+        return _clients[host]
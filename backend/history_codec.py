@@ -0,0 +1,99 @@
+"""
+历史序列线路格式编解码
+默认格式为 [{"date": "YYYY-MM-DD", "value": float}, ...]；
+紧凑格式为列式布局：起始日期 + 逐点日期差分 + 固定精度数值数组。
+"""
+import json
+import datetime
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from flask import Response
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，未安装时仅提供紧凑 JSON
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+COMPACT_JSON_MIMETYPE = 'application/vnd.nws.compact+json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+HISTORY_PRECISION = 4  # 数值保留的小数位数
+
+
+def encode_history(history: List[Dict], precision: int = HISTORY_PRECISION) -> Dict[str, Any]:
+    """
+    将历史点列表编码为列式结构
+    返回: {'start': 'YYYY-MM-DD', 'deltas': [天数差分], 'values': [数值]}
+    deltas[0] 恒为 0，第 i 个点的日期 = start + sum(deltas[:i+1]) 天
+    """
+    if not history:
+        return {'start': None, 'deltas': [], 'values': []}
+
+    start = datetime.date.fromisoformat(history[0]['date'])
+    deltas = []
+    prev = start
+    for point in history:
+        current = datetime.date.fromisoformat(point['date'])
+        deltas.append((current - prev).days)
+        prev = current
+
+    return {
+        'start': start.isoformat(),
+        'deltas': deltas,
+        'values': [round(point['value'], precision) for point in history]
+    }
+
+
+def decode_history(columns: Dict[str, Any]) -> List[Dict]:
+    """将列式结构还原为历史点列表"""
+    if not columns.get('start'):
+        return []
+
+    current = datetime.date.fromisoformat(columns['start'])
+    history = []
+    for delta, value in zip(columns['deltas'], columns['values']):
+        current += datetime.timedelta(days=delta)
+        history.append({'date': current.isoformat(), 'value': value})
+    return history
+
+
+def compact_items(items: List[Dict], precision: int = HISTORY_PRECISION) -> List[Dict]:
+    """将仪表盘条目中的 history 字段替换为列式结构"""
+    return [{**item, 'history': encode_history(item.get('history') or [], precision)} for item in items]
+
+
+def negotiate_format(request) -> str:
+    """
+    根据请求选择响应格式: 'json' | 'compact' | 'msgpack'
+    ?format=compact / ?format=msgpack 优先，其次看 Accept 头
+    """
+    fmt = request.args.get('format', '').lower()
+    accept = request.headers.get('Accept', '')
+
+    if fmt == 'msgpack' or (not fmt and MSGPACK_MIMETYPE in accept):
+        # 未安装 msgpack 时降级为紧凑 JSON
+        return 'msgpack' if msgpack is not None else 'compact'
+    if fmt == 'compact' or (not fmt and COMPACT_JSON_MIMETYPE in accept):
+        return 'compact'
+    return 'json'
+
+
+def encode_body(items: Any, fmt: str, compact: Optional[Callable] = None) -> Tuple[bytes, str]:
+    """
+    按格式编码响应体，返回 (bytes, mimetype)
+    compact: 把 items 转换为紧凑结构的函数，默认按仪表盘条目列表处理
+    """
+    if fmt == 'json':
+        return json.dumps(items, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), JSON_MIMETYPE
+    payload = (compact or compact_items)(items)
+    if fmt == 'msgpack':
+        return msgpack.packb(payload, use_bin_type=True), MSGPACK_MIMETYPE
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), COMPACT_JSON_MIMETYPE
+
+
+def history_response(items: Any, fmt: str, compact: Optional[Callable] = None) -> Response:
+    """按协商好的格式输出包含历史序列的响应"""
+    body, mimetype = encode_body(items, fmt, compact)
+    response = Response(body, mimetype=mimetype)
+    # 同一 URL 按 Accept 返回不同格式，缓存层需区分
+    response.vary.add('Accept')
+    return response
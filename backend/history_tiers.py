@@ -0,0 +1,200 @@
+"""
+历史序列分层预聚合
+每个指标维护 D（日）/ W（周）/ M（月）三层，每个周期保存期末值、均值、最小值、最大值与点数，
+长周期图表直接读取预聚合结果，不再对原始观测逐请求重采样。
+
+增量更新：观测写入后，只重算变更日期所在周期及之后的周期（从观测表读取这一段重新聚合），
+数值修订同样得到正确结果；尚无分层数据的指标整段重建。
+查询时按时间跨度自动选择分层，使返回点数不超过 HISTORY_MAX_POINTS。
+
+用法:
+  python history_tiers.py rebuild              # 全部指标整段重建
+  python history_tiers.py rebuild dgs10 curve
+"""
+import os
+import sys
+import argparse
+import datetime
+from typing import Dict, List, Optional, Iterable, Any
+import pandas as pd
+from sqlalchemy import text, insert
+
+# 添加当前目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import HISTORY_MAX_POINTS, logger
+from models import init_db, engine, Session, HistoryTier
+
+# 分层 -> 每个周期的名义天数（用于估算点数）
+TIERS = {'D': 1, 'W': 7, 'M': 31}
+
+
+def period_starts(dates: pd.DatetimeIndex, tier: str) -> pd.DatetimeIndex:
+    """日期所在周期的起始日：当天 / 所在周的周一 / 所在月的 1 日"""
+    dates = pd.DatetimeIndex(dates).normalize()
+    if tier == 'W':
+        return dates - pd.to_timedelta(dates.weekday, unit='D')
+    if tier == 'M':
+        return dates.to_period('M').to_timestamp()
+    return dates
+
+
+def aggregate(s: pd.Series, tier: str) -> pd.DataFrame:
+    """按周期聚合，返回列 period / last_date / last / mean / min / max / count"""
+    s = s.dropna().sort_index()
+    if s.empty:
+        return pd.DataFrame(columns=['period', 'last_date', 'last', 'mean', 'min', 'max', 'count'])
+    frame = pd.DataFrame({'value': s.to_numpy(dtype=float), 'date': s.index},
+                         index=period_starts(s.index, tier))
+    grouped = frame.groupby(level=0)
+    result = grouped['value'].agg(['last', 'mean', 'min', 'max', 'count'])
+    result['last_date'] = grouped['date'].max()
+    return result.rename_axis('period').reset_index()
+
+
+def _load_observations(session, metric_id: str, start: Optional[datetime.date]) -> pd.Series:
+    sql = "SELECT date, value FROM observations WHERE metric_id = :metric_id"
+    params: Dict[str, Any] = {'metric_id': metric_id}
+    if start:
+        sql += " AND date >= :start"
+        params['start'] = start.isoformat()
+    rows = session.execute(text(sql + " ORDER BY date"), params).fetchall()
+    return pd.Series([r[1] for r in rows], index=pd.to_datetime([r[0] for r in rows]), dtype=float)
+
+
+def rebuild_metric(session, metric_id: str, since: Optional[datetime.date] = None) -> int:
+    """
+    重建 since 所在周期及之后的全部分层行（since 为空时整段重建），返回写入行数
+    起点取 since 所在月的月初再对齐到周一，保证三层被重算的周期都完整覆盖
+    """
+    start = None
+    if since is not None:
+        month = period_starts(pd.DatetimeIndex([since]), 'M')
+        start = period_starts(month, 'W')[0].date()
+
+    s = _load_observations(session, metric_id, start)
+    delete = "DELETE FROM history_tiers WHERE metric_id = :metric_id"
+    params: Dict[str, Any] = {'metric_id': metric_id}
+    if start:
+        delete += " AND period >= :start"
+        params['start'] = start.isoformat()
+    session.execute(text(delete), params)
+
+    rows = []
+    for tier in TIERS:
+        frame = aggregate(s, tier)
+        if start:
+            # 起点之前的残缺周期（如上月末几天组成的月桶）保留库中原值
+            frame = frame[frame['period'] >= pd.Timestamp(start)]
+        rows.extend({
+            'metric_id': metric_id, 'tier': tier,
+            'period': r.period.date(), 'last_date': r.last_date.date(),
+            'last': float(r.last), 'mean': float(r.mean), 'min': float(r.min), 'max': float(r.max),
+            'count': int(r.count)
+        } for r in frame.itertuples(index=False))
+    if rows:
+        session.execute(insert(HistoryTier.__table__), rows)
+    return len(rows)
+
+
+def update_tiers(session, changed_rows: Iterable[Dict]) -> int:
+    """
+    观测写入后增量更新分层（由调用方与观测一起提交）
+    changed_rows: [{'metric_id', 'date', 'value'}]，只用到指标与最早变更日期
+    """
+    earliest: Dict[str, datetime.date] = {}
+    for row in changed_rows:
+        d = row['date']
+        if isinstance(d, str):
+            d = datetime.date.fromisoformat(d)
+        if row['metric_id'] not in earliest or d < earliest[row['metric_id']]:
+            earliest[row['metric_id']] = d
+    if not earliest:
+        return 0
+
+    built = {r[0] for r in session.execute(text("SELECT DISTINCT metric_id FROM history_tiers"))}
+    written = 0
+    for metric_id, since in earliest.items():
+        written += rebuild_metric(session, metric_id, since if metric_id in built else None)
+    logger.info(f"Updated history tiers for {len(earliest)} metrics ({written} rows)")
+    return written
+
+
+def rebuild_tiers(session, metric_ids: Optional[List[str]] = None) -> int:
+    """整段重建指定指标（默认观测表中的全部指标）的分层"""
+    if not metric_ids:
+        metric_ids = [r[0] for r in session.execute(text("SELECT DISTINCT metric_id FROM observations"))]
+    return sum(rebuild_metric(session, metric_id) for metric_id in metric_ids)
+
+
+# ==================== 查询 ====================
+
+def _bounds(metric_id: str) -> Optional[tuple]:
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT MIN(period), MAX(last_date) FROM history_tiers "
+                                "WHERE metric_id = :metric_id AND tier = 'D'"), {'metric_id': metric_id}).fetchone()
+    if not row or row[0] is None:
+        return None
+    return datetime.date.fromisoformat(str(row[0])), datetime.date.fromisoformat(str(row[1]))
+
+
+def choose_tier(start: datetime.date, end: datetime.date, max_points: int = HISTORY_MAX_POINTS) -> str:
+    """点数不超过 max_points 的最细分层；跨度超出月度层容量时仍返回 M"""
+    span = (end - start).days + 1
+    for tier, days in TIERS.items():
+        if span / days <= max_points:
+            return tier
+    return 'M'
+
+
+def query_history(metric_id: str, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                  tier: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    读取预聚合历史，tier 为空时按跨度自动选择；指标尚无分层数据时返回 None
+    history 每个点: {'date': 周期内最后观测日, 'value': 期末值, 'mean', 'min', 'max'}
+    """
+    bounds = _bounds(metric_id)
+    if bounds is None:
+        return None
+    start = max(start or bounds[0], bounds[0])
+    end = min(end or bounds[1], bounds[1])
+    tier = tier or choose_tier(start, end)
+
+    # 周期按起始日过滤：首个周期可能早于 start，保证覆盖 start 当天
+    first = period_starts(pd.DatetimeIndex([start]), tier)[0].date()
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT last_date, last, mean, min, max FROM history_tiers "
+            "WHERE metric_id = :metric_id AND tier = :tier AND period >= :first AND period <= :end "
+            "ORDER BY period"
+        ), {'metric_id': metric_id, 'tier': tier, 'first': first.isoformat(), 'end': end.isoformat()}).fetchall()
+
+    return {
+        'metric': metric_id,
+        'tier': tier,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'history': [{'date': str(r[0]), 'value': r[1], 'mean': r[2], 'min': r[3], 'max': r[4]} for r in rows]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain pre-aggregated history tiers')
+    commands = parser.add_subparsers(dest='command', required=True)
+    p = commands.add_parser('rebuild', help='Rebuild tiers from the observations table')
+    p.add_argument('metrics', nargs='*', help='Metric ids (default: all)')
+    args = parser.parse_args()
+
+    init_db()
+    session = Session()
+    try:
+        written = rebuild_tiers(session, args.metrics)
+        session.commit()
+        print(f"Wrote {written} tier rows")
+    finally:
+        session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
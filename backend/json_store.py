@@ -4,19 +4,39 @@ JSON 数据存储模块
 """
 import os
 import json
+import time
 import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 from config import TRIAL_DAYS
+from telemetry import JSON_STORE_LOCK_WAIT_SECONDS, JSON_STORE_IO_SECONDS
 
-# 数据目录
-DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# 数据目录（可通过环境变量 DATA_DIR 指向其他目录，如基准测试数据）
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
 USERS_FILE = os.path.join(DATA_DIR, 'users.json')
 SPONSOR_CODES_FILE = os.path.join(DATA_DIR, 'sponsor_codes.json')
 USER_ACCESS_FILE = os.path.join(DATA_DIR, 'user_access.json')
 
+
+class _TimedLock:
+    """记录等待时间的线程锁"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._lock.acquire()
+        JSON_STORE_LOCK_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
 # 线程锁，防止并发写入问题
-_lock = threading.Lock()
+_lock = _TimedLock()
 
 
 def ensure_data_dir():
@@ -30,17 +50,36 @@ def _load_json(filepath: str) -> Dict:
     if not os.path.exists(filepath):
         return {}
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with JSON_STORE_IO_SECONDS.labels('load', os.path.basename(filepath)).time():
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
     except (json.JSONDecodeError, IOError):
         return {}
 
 
 def _save_json(filepath: str, data: Dict):
-    """保存 JSON 文件"""
+    """保存 JSON 文件（先写临时文件再原子替换，并发读者不会读到写了一半的文件）"""
     ensure_data_dir()
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    with JSON_STORE_IO_SECONDS.labels('save', os.path.basename(filepath)).time():
+        tmp = f'{filepath}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, filepath)
+
+
+@contextmanager
+def transaction(*filepaths: str, readonly: Iterable[str] = ()):
+    """
+    批量事务：持锁期间每个文件只读写一次
+        with transaction(SPONSOR_CODES_FILE, USER_ACCESS_FILE) as (codes, access): ...
+    块正常结束时写回 readonly 以外的文件，块内抛出异常时不写回
+    """
+    with _lock:
+        data = [_load_json(path) for path in filepaths]
+        yield data
+        for path, content in zip(filepaths, data):
+            if path not in readonly:
+                _save_json(path, content)
 
 
 # ==================== 用户管理 ====================
@@ -0,0 +1,48 @@
+"""
+指标表发布
+每次更新先在 metrics_staging 中构建完整的新指标表（已有行 + 本次结果，一次批量写入），
+再在同一事务内通过表重命名原子替换 metrics。配合 WAL 模式，API 读取始终看到
+完整的旧表或完整的新表，不会读到部分更新，也不会被写入阻塞。
+"""
+import datetime
+from typing import Dict, List, Any
+from sqlalchemy import MetaData, text
+from models import Metric
+
+STAGING_TABLE = 'metrics_staging'
+RETIRED_TABLE = 'metrics_retired'
+
+_COLUMNS = [col.name for col in Metric.__table__.columns]
+
+
+def metric_rows(metrics: List[Metric]) -> List[Dict[str, Any]]:
+    """Metric 对象 -> 写入 staging 表的行"""
+    now = datetime.datetime.utcnow()
+    rows = []
+    for m in metrics:
+        row = {col: getattr(m, col) for col in _COLUMNS}
+        if row['last_updated'] is None:
+            row['last_updated'] = now
+        rows.append(row)
+    return rows
+
+
+def swap_metrics(session, rows: List[Dict[str, Any]]):
+    """
+    以 rows 覆盖同 id 的指标，其余指标保持不变，原子替换 metrics 表
+    在调用方的事务内执行，随 session.commit() 一并生效
+    """
+    conn = session.connection()
+    columns = ', '.join(_COLUMNS)
+
+    conn.execute(text(f'DROP TABLE IF EXISTS {STAGING_TABLE}'))
+    Metric.__table__.to_metadata(MetaData(), name=STAGING_TABLE).create(conn)
+    conn.execute(text(f'INSERT INTO {STAGING_TABLE} ({columns}) SELECT {columns} FROM {Metric.__tablename__}'))
+    if rows:
+        placeholders = ', '.join(f':{col}' for col in _COLUMNS)
+        conn.execute(text(f'INSERT OR REPLACE INTO {STAGING_TABLE} ({columns}) VALUES ({placeholders})'),
+                     [{col: row.get(col) for col in _COLUMNS} for row in rows])
+
+    conn.execute(text(f'ALTER TABLE {Metric.__tablename__} RENAME TO {RETIRED_TABLE}'))
+    conn.execute(text(f'ALTER TABLE {STAGING_TABLE} RENAME TO {Metric.__tablename__}'))
+    conn.execute(text(f'DROP TABLE {RETIRED_TABLE}'))
@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Text
+from sqlalchemy import create_engine, event, inspect, text, Column, String, Float, Integer, DateTime, Date, Text
 from sqlalchemy.orm import declarative_base, sessionmaker
 from config import DB_URI
 
@@ -8,6 +8,24 @@ engine = create_engine(DB_URI, echo=False)
 Session = sessionmaker(bind=engine)
 
 
+@event.listens_for(engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    """
+    WAL 模式：写入期间读者读取提交前的快照，互不阻塞
+    关闭 pysqlite 的隐式事务管理，改由下方 begin 事件显式 BEGIN，使 DDL（表重命名）也处于事务内
+    """
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+@event.listens_for(engine, 'begin')
+def _on_begin(conn):
+    conn.exec_driver_sql('BEGIN')
+
+
 class Metric(Base):
     """FRED 宏观指标数据 - 使用 SQLite 存储"""
     __tablename__ = 'metrics'
@@ -21,10 +39,159 @@ class Metric(Base):
     status_text = Column(String)
     status_color = Column(String)
     history_json = Column(Text)
+    stats_json = Column(Text, nullable=True)  # 滚动统计摘要（z-score / 分位 / 极值）
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
 
 
+class Observation(Base):
+    """指标逐点观测值（派生后的完整序列），用于回测等长周期分析"""
+    __tablename__ = 'observations'
+    metric_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    value = Column(Float)
+
+
+class RawObservation(Base):
+    """FRED 原始序列观测值（历史回填写入）"""
+    __tablename__ = 'raw_observations'
+    series_id = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    value = Column(Float)
+
+
+class BackfillChunk(Base):
+    """历史回填的分段检查点，已完成的分段在续跑时跳过"""
+    __tablename__ = 'backfill_chunks'
+    series_id = Column(String, primary_key=True)
+    start = Column(Date, primary_key=True)
+    end = Column(Date)
+    rows = Column(Integer)
+    completed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class MetricStats(Base):
+    """指标滚动统计的流式状态"""
+    __tablename__ = 'metric_stats'
+    metric_id = Column(String, primary_key=True)
+    as_of = Column(Date)
+    state_json = Column(Text)
+    stats_json = Column(Text)
+
+
+class HistoryTier(Base):
+    """观测序列的预聚合分层（D 日 / W 周 / M 月），每个周期保存期末值、均值与极值"""
+    __tablename__ = 'history_tiers'
+    metric_id = Column(String, primary_key=True)
+    tier = Column(String, primary_key=True)
+    period = Column(Date, primary_key=True)  # 周期起始日（周一 / 月初）
+    last_date = Column(Date)                 # 周期内最后一个观测日
+    last = Column(Float)
+    mean = Column(Float)
+    min = Column(Float)
+    max = Column(Float)
+    count = Column(Integer)
+
+
+class CorrelationMatrix(Base):
+    """标准窗口的指标相关矩阵（数据更新时预计算）"""
+    __tablename__ = 'correlation_matrices'
+    window = Column(Integer, primary_key=True)
+    data_version = Column(Integer)
+    as_of = Column(Date)
+    observations = Column(Integer)
+    metrics_json = Column(Text)  # 矩阵行列对应的指标 id
+    matrix_json = Column(Text)
+    computed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class AlertEvent(Base):
+    """指标状态切换事件（数据更新时与上一版本比较产生）"""
+    __tablename__ = 'alert_events'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    metric_id = Column(String, index=True)
+    from_status = Column(String)
+    from_color = Column(String)
+    to_status = Column(String)
+    to_color = Column(String)
+    value = Column(Float, nullable=True)
+    data_date = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class AlertSubscriber(Base):
+    """告警 webhook 订阅者；cursor 为已成功投递的最大事件 id"""
+    __tablename__ = 'alert_subscribers'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    url = Column(String)
+    metrics = Column(String, nullable=True)  # 逗号分隔的指标 id，为空表示全部
+    secret = Column(String, nullable=True)   # 设置后请求附带 HMAC-SHA256 签名
+    cursor = Column(Integer, default=0)
+    failures = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+    is_active = Column(Integer, default=1)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class FetchRun(Base):
+    """一次数据更新运行的台账"""
+    __tablename__ = 'fetch_runs'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    provider = Column(String)
+    started_at = Column(DateTime)
+    wall_seconds = Column(Float)
+    series_count = Column(Integer)
+    failed_count = Column(Integer)   # 出错或返回空数据的序列数
+    success = Column(Integer)        # update_metrics 是否成功提交
+    error = Column(String, nullable=True)
+
+
+class FetchSeriesResult(Base):
+    """单次运行中每个 FRED 序列的获取结果（同一序列多次请求合并为一行）"""
+    __tablename__ = 'fetch_series_results'
+    run_id = Column(Integer, primary_key=True)
+    series_id = Column(String, primary_key=True)
+    calls = Column(Integer)
+    latency_ms = Column(Float)       # 各次请求耗时之和
+    rows = Column(Integer)
+    last_date = Column(Date, nullable=True)
+    error_class = Column(String, nullable=True)
+
+
+class SeriesFreshness(Base):
+    """每个序列的最新获取状态，每次运行结束后更新"""
+    __tablename__ = 'series_freshness'
+    series_id = Column(String, primary_key=True)
+    last_run_id = Column(Integer)
+    last_success_at = Column(DateTime, nullable=True)
+    last_date = Column(Date, nullable=True)   # 已获取到的最新观测日期
+    consecutive_failures = Column(Integer, default=0)
+    last_error_class = Column(String, nullable=True)
+    latency_ms = Column(Float, nullable=True)
+
+
+class StoreMeta(Base):
+    """存储元信息（键值对），如数据版本号"""
+    __tablename__ = 'store_meta'
+    key = Column(String, primary_key=True)
+    value = Column(String)
+
+
+def _add_missing_columns():
+    """为已存在的表补齐新增列（create_all 不会修改已有表结构）"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name not in existing:
+                col_type = col.type.compile(engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+
+
 def init_db():
-    """初始化数据库（仅 metrics 表）"""
+    """初始化数据库（metrics / observations / raw_observations / backfill_chunks / metric_stats / history_tiers / correlation_matrices / alert_* / fetch_* / series_freshness / store_meta 表）"""
     Base.metadata.create_all(engine)
-
+    _add_missing_columns()
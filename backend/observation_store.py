@@ -0,0 +1,106 @@
+"""
+指标观测序列存储
+update_metrics 写入每个指标的完整派生序列，回测 / 分析模块按需批量读取
+"""
+from typing import Dict, List, Optional
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import engine, Observation, StoreMeta
+
+DATA_VERSION_KEY = 'data_version'
+
+
+def save_observations(session, series_map: Dict[str, pd.Series]) -> List[Dict]:
+    """
+    批量写入观测值：仅插入新日期或数值变化的行，并递增数据版本
+    返回实际变更的行 [{'metric_id', 'date', 'value'}]
+    """
+    frames = []
+    for metric_id, s in series_map.items():
+        s = s.dropna()
+        if s.empty:
+            continue
+        frames.append(pd.DataFrame({
+            'metric_id': metric_id,
+            'date': pd.to_datetime(s.index).date,
+            'value': s.to_numpy(dtype=float)
+        }))
+    if not frames:
+        return []
+
+    incoming = pd.concat(frames, ignore_index=True).drop_duplicates(['metric_id', 'date'], keep='last')
+    existing = _load_existing(session, incoming)
+    merged = incoming.merge(existing, on=['metric_id', 'date'], how='left', suffixes=('', '_old'))
+    changed = merged[merged['value_old'].isna() | (merged['value'] != merged['value_old'])]
+    rows = changed[['metric_id', 'date', 'value']].to_dict('records')
+
+    if rows:
+        upsert_observation_rows(session, rows)
+        bump_data_version(session)
+    return rows
+
+
+def upsert_observation_rows(session, rows: List[Dict]):
+    """按 (metric_id, date) 批量覆盖写入"""
+    stmt = sqlite_insert(Observation.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['metric_id', 'date'],
+        set_={'value': stmt.excluded.value}
+    )
+    session.execute(stmt, rows)
+
+
+def _load_existing(session, incoming: pd.DataFrame) -> pd.DataFrame:
+    """读取与本次写入日期范围重叠的已有观测值"""
+    result = session.execute(
+        text("SELECT metric_id, date, value AS value_old FROM observations WHERE date >= :start"),
+        {'start': min(incoming['date']).isoformat()}
+    )
+    existing = pd.DataFrame(result.fetchall(), columns=['metric_id', 'date', 'value_old'])
+    existing['date'] = pd.to_datetime(existing['date']).dt.date
+    return existing
+
+
+def bump_data_version(session) -> int:
+    """递增数据版本号（任何观测数据变更后调用）"""
+    meta = session.get(StoreMeta, DATA_VERSION_KEY)
+    version = int(meta.value) + 1 if meta else 1
+    session.merge(StoreMeta(key=DATA_VERSION_KEY, value=str(version)))
+    return version
+
+
+def get_data_version() -> int:
+    """读取当前数据版本号"""
+    with engine.connect() as conn:
+        value = conn.execute(
+            text("SELECT value FROM store_meta WHERE key = :key"), {'key': DATA_VERSION_KEY}
+        ).scalar()
+    return int(value) if value else 0
+
+
+def load_series(metric_id: str, start: Optional[str] = None) -> pd.Series:
+    """读取单个指标的观测序列（按日期升序）"""
+    sql = "SELECT date, value FROM observations WHERE metric_id = :metric_id"
+    params = {'metric_id': metric_id}
+    if start:
+        sql += " AND date >= :start"
+        params['start'] = start
+    sql += " ORDER BY date"
+
+    with engine.connect() as conn:
+        df = pd.read_sql_query(text(sql), conn, params=params)
+    return pd.Series(df['value'].to_numpy(), index=pd.to_datetime(df['date']), name=metric_id)
+
+
+def load_all_series(metric_ids: Optional[List[str]] = None) -> Dict[str, pd.Series]:
+    """一次性读取多个指标的观测序列"""
+    with engine.connect() as conn:
+        df = pd.read_sql_query(text("SELECT metric_id, date, value FROM observations ORDER BY metric_id, date"), conn)
+
+    df['date'] = pd.to_datetime(df['date'])
+    result = {}
+    for metric_id, group in df.groupby('metric_id', sort=False):
+        if metric_ids is None or metric_id in metric_ids:
+            result[metric_id] = pd.Series(group['value'].to_numpy(), index=pd.DatetimeIndex(group['date']), name=metric_id)
+    return result
@@ -0,0 +1,169 @@
+"""
+按需请求性能剖析
+统计采样：后台线程按固定间隔读取目标线程的调用栈，累计为折叠栈
+（flamegraph.pl / speedscope 可直接读取的 "a;b;c 次数" 格式）。
+
+触发方式（二选一，默认均关闭）：
+  - 管理员签名请求头 X-Profile: <时间戳>:<HMAC-SHA256(PROFILE_SECRET, "方法 路径 时间戳")>
+  - 采样率 PROFILE_SAMPLE_RATE（0~1），随机剖析部分请求
+输出写入 PROFILE_DIR，超过 PROFILE_MAX_FILES 个文件时删除最旧的。
+
+生成签名请求头:
+  python profiling.py sign GET /api/dashboard
+"""
+import os
+import sys
+import hmac
+import time
+import random
+import hashlib
+import datetime
+import threading
+from collections import Counter
+from typing import Optional
+from config import PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SECRET, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, logger
+
+PROFILE_HEADER = 'X-Profile'
+SIGNATURE_MAX_AGE = 300  # 签名有效期（秒）
+
+
+class StackSampler:
+    """对单个线程（或全部线程）做统计采样，结果为折叠栈计数"""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILE_INTERVAL_MS / 1000.0):
+        self.thread_id = thread_id  # None 表示采样除自身外的所有线程
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self.stacks
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                targets = [frame] if frame is not None else []
+            else:
+                targets = [f for tid, f in frames.items() if tid != own_id]
+            for frame in targets:
+                self.stacks[_collapse(frame)] += 1
+            self.samples += 1
+
+    def write(self, label: str) -> str:
+        """写入折叠栈文件并轮转目录，返回文件名"""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        name = f'{stamp}-{_safe_label(label)}.collapsed'
+        path = os.path.join(PROFILE_DIR, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        _rotate()
+        return name
+
+
+def _collapse(frame) -> str:
+    """调用栈 -> 根在前的 "文件:函数;..." 字符串"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+def _safe_label(label: str) -> str:
+    return ''.join(c if c.isalnum() else '_' for c in label).strip('_')[:60] or 'root'
+
+
+def _rotate():
+    """保留最新的 PROFILE_MAX_FILES 个文件"""
+    names = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith('.collapsed'))
+    for name in names[:max(0, len(names) - PROFILE_MAX_FILES)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+# ==================== 请求签名 ====================
+
+def sign(method: str, path: str, timestamp: Optional[int] = None, secret: str = PROFILE_SECRET) -> str:
+    """生成 X-Profile 请求头的值"""
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    message = f'{method.upper()} {path} {timestamp}'.encode('utf-8')
+    digest = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+    return f'{timestamp}:{digest}'
+
+
+def verify(header: str, method: str, path: str) -> bool:
+    """校验签名与时效；未配置 PROFILE_SECRET 时一律拒绝"""
+    if not PROFILE_SECRET or not header or ':' not in header:
+        return False
+    timestamp, _ = header.split(':', 1)
+    try:
+        if abs(time.time() - int(timestamp)) > SIGNATURE_MAX_AGE:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(header, sign(method, path, int(timestamp)))
+
+
+# ==================== Flask 接入 ====================
+
+def init_app(app):
+    """注册剖析钩子：签名请求或按采样率命中的请求会被剖析"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        signed = verify(request.headers.get(PROFILE_HEADER, ''), request.method, request.path)
+        if signed or (PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+            g._profiler = StackSampler(threading.get_ident()).start()
+            g._profile_signed = signed
+
+    @app.after_request
+    def _stop_profile(response):
+        sampler = g.pop('_profiler', None)
+        if sampler is not None:
+            sampler.stop()
+            name = sampler.write(f'{request.method}_{request.path}')
+            logger.info(f"Profiled {request.method} {request.path}: {sampler.samples} samples "
+                        f"in {sampler.elapsed * 1000:.1f}ms -> {name}")
+            if g.pop('_profile_signed', False):
+                response.headers['X-Profile-Id'] = name
+        return response
+
+
+def profile_call(label: str, func, *args, **kwargs):
+    """剖析一次完整调用（所有线程），返回 func 的结果"""
+    sampler = StackSampler().start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+        name = sampler.write(label)
+        logger.info(f"Profiled {label}: {sampler.samples} samples in {sampler.elapsed:.1f}s -> "
+                    f"{os.path.join(PROFILE_DIR, name)}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == 'sign':
+        if not PROFILE_SECRET:
+            sys.exit('PROFILE_SECRET is not set')
+        print(f'{PROFILE_HEADER}: {sign(sys.argv[2], sys.argv[3])}')
+    else:
+        sys.exit('usage: python profiling.py sign METHOD PATH')
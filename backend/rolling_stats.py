@@ -0,0 +1,223 @@
+"""
+滚动统计与历史分位
+为每个指标流式维护 1y / 5y / 10y 时间窗口内的 z-score、分位排名和最小/最大值。
+每个新观测点只做增量更新（有序窗口二分插入 + Welford 均值/离差平方和 + 单调队列），
+状态（窗口内原始点与各窗口的聚合量）持久化在 metric_stats 表中，下次运行直接恢复，只推入新日期的数据。
+已处理日期之前的数值被修订（FRED 常见于非农、CPI、GDP 等）时，该指标的状态从观测表重建。
+"""
+import json
+import math
+import bisect
+import datetime
+from collections import deque
+from typing import Dict, Iterable, Optional, Any
+import pandas as pd
+from sqlalchemy import text
+from config import logger
+from models import MetricStats
+
+# 窗口名称 -> 天数
+STATS_WINDOWS = {'1y': 365, '5y': 365 * 5, '10y': 365 * 10}
+
+
+class TimeWindow:
+    """
+    按自然日长度滑动的窗口
+    均值/方差/极值为 O(1)（方差用 Welford 递推，避免 E[x²] - E[x]² 的相消误差）；
+    分位查询为 O(log n)，有序列表的插入/删除是二分定位加 O(n) 内存移动，窗口最多约 2500 点
+    """
+
+    def __init__(self, span_days: int):
+        self.span_days = span_days
+        self.entries = deque()   # (日序号, 数值)，按日期升序
+        self.sorted_values = []  # 窗口内数值的有序列表
+        self.mean = 0.0
+        self.m2 = 0.0            # 离差平方和 Σ(x - mean)²
+        self._min_q = deque()    # 单调递增队列 (日序号, 数值)
+        self._max_q = deque()    # 单调递减队列 (日序号, 数值)
+
+    def push(self, day: int, value: float):
+        self.entries.append((day, value))
+        bisect.insort(self.sorted_values, value)
+        delta = value - self.mean
+        self.mean += delta / len(self.entries)
+        self.m2 += delta * (value - self.mean)
+
+        while self._min_q and self._min_q[-1][1] >= value:
+            self._min_q.pop()
+        self._min_q.append((day, value))
+        while self._max_q and self._max_q[-1][1] <= value:
+            self._max_q.pop()
+        self._max_q.append((day, value))
+
+        self._evict(day - self.span_days)
+
+    def _evict(self, cutoff: int):
+        """移除日期早于等于 cutoff 的点"""
+        while self.entries and self.entries[0][0] <= cutoff:
+            _, old = self.entries.popleft()
+            del self.sorted_values[bisect.bisect_left(self.sorted_values, old)]
+            n = len(self.entries)
+            if n == 0:
+                self.mean = self.m2 = 0.0
+            else:
+                # Welford 逆向递推
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 = max(self.m2 - delta * (old - self.mean), 0.0)
+        while self._min_q and self._min_q[0][0] <= cutoff:
+            self._min_q.popleft()
+        while self._max_q and self._max_q[0][0] <= cutoff:
+            self._max_q.popleft()
+
+    def summary(self, value: float) -> Optional[Dict[str, Any]]:
+        """当前值相对窗口的统计"""
+        n = len(self.entries)
+        if n == 0:
+            return None
+
+        std = math.sqrt(self.m2 / n)
+        # 中位秩：相同数值取中间位置
+        lo = bisect.bisect_left(self.sorted_values, value)
+        hi = bisect.bisect_right(self.sorted_values, value)
+
+        return {
+            'zscore': round((value - self.mean) / std, 4) if std > 0 else 0.0,
+            'percentile': round((lo + hi) / 2 / n * 100, 2),
+            'min': self._min_q[0][1],
+            'max': self._max_q[0][1],
+            'count': n
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """聚合量与单调队列（窗口内原始点由最长窗口统一保存）"""
+        return {'count': len(self.entries), 'mean': self.mean, 'm2': self.m2,
+                'min_q': list(self._min_q), 'max_q': list(self._max_q)}
+
+    def restore(self, entries: list, state: Dict[str, Any]):
+        """由最长窗口的原始点（取末尾 count 个）与保存的聚合量恢复，不逐点重放"""
+        count = state['count']
+        self.entries = deque(tuple(e) for e in entries[len(entries) - count:]) if count else deque()
+        self.sorted_values = sorted(v for _, v in self.entries)
+        self.mean = state['mean']
+        self.m2 = state['m2']
+        self._min_q = deque(tuple(e) for e in state['min_q'])
+        self._max_q = deque(tuple(e) for e in state['max_q'])
+
+
+class MetricRollingStats:
+    """单个指标的多窗口滚动统计"""
+
+    def __init__(self):
+        self.windows = {name: TimeWindow(days) for name, days in STATS_WINDOWS.items()}
+        self.last_day: Optional[int] = None
+        self.last_value: Optional[float] = None
+
+    def push(self, day: int, value: float):
+        for window in self.windows.values():
+            window.push(day, value)
+        self.last_day = day
+        self.last_value = value
+
+    def push_series(self, s: pd.Series) -> int:
+        """推入日期晚于已处理位置的新观测点，返回推入数量"""
+        s = s.dropna()
+        days = [d.toordinal() for d in pd.to_datetime(s.index).date]
+        pushed = 0
+        for day, value in zip(days, s.to_numpy(dtype=float).tolist()):
+            if self.last_day is not None and day <= self.last_day:
+                continue
+            self.push(day, value)
+            pushed += 1
+        return pushed
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        if self.last_day is None:
+            return None
+        return {
+            'asOf': datetime.date.fromordinal(self.last_day).isoformat(),
+            'windows': {name: w.summary(self.last_value) for name, w in self.windows.items()}
+        }
+
+    def to_state(self) -> str:
+        """序列化为 JSON：最长窗口内的原始点 + 各窗口的聚合量"""
+        longest = max(self.windows.values(), key=lambda w: w.span_days)
+        return json.dumps({
+            'entries': list(longest.entries),
+            'windows': {name: w.to_state() for name, w in self.windows.items()}
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_state(cls, state_json: Optional[str]) -> 'MetricRollingStats':
+        stats = cls()
+        if not state_json:
+            return stats
+        state = json.loads(state_json)
+        entries = state.get('entries', [])
+        saved = state.get('windows')
+        if saved is None or set(saved) != set(stats.windows):
+            # 旧格式（只有原始点）或窗口配置变化：逐点重放一次
+            for day, value in entries:
+                stats.push(day, value)
+            return stats
+        for name, window in stats.windows.items():
+            window.restore(entries, saved[name])
+        if entries:
+            stats.last_day, stats.last_value = entries[-1]
+        return stats
+
+
+def _load_observations(session, metric_id: str, since_day: int) -> pd.Series:
+    """观测表中 since_day（日序号）之后的点"""
+    rows = session.execute(text(
+        "SELECT date, value FROM observations WHERE metric_id = :metric_id AND date > :since ORDER BY date"
+    ), {'metric_id': metric_id, 'since': datetime.date.fromordinal(since_day).isoformat()}).fetchall()
+    return pd.Series([r[1] for r in rows], index=pd.to_datetime([r[0] for r in rows]), dtype=float)
+
+
+def _revised_metrics(changed_rows: Iterable[Dict]) -> Dict[str, int]:
+    """变更行 -> metric_id -> 最早变更日期（日序号）"""
+    earliest: Dict[str, int] = {}
+    for row in changed_rows:
+        d = row['date']
+        day = (datetime.date.fromisoformat(d) if isinstance(d, str) else d).toordinal()
+        if row['metric_id'] not in earliest or day < earliest[row['metric_id']]:
+            earliest[row['metric_id']] = day
+    return earliest
+
+
+def update_rolling_stats(session, series_map: Dict[str, pd.Series],
+                         changed_rows: Iterable[Dict] = ()) -> Dict[str, Dict[str, Any]]:
+    """
+    将本次获取的序列增量推入各指标的滚动统计状态并持久化
+    changed_rows: 本次写入观测表的变更行（save_observations 的返回值，须已写入同一会话）；
+    其中日期不晚于已处理位置的行是对历史值的修订，该指标的状态改为从观测表重建最长窗口
+    返回 metric_id -> 最新统计摘要
+    """
+    revised = _revised_metrics(changed_rows)
+    longest = max(STATS_WINDOWS.values())
+    summaries = {}
+    for metric_id, s in series_map.items():
+        row = session.get(MetricStats, metric_id)
+        stats = MetricRollingStats.from_state(row.state_json if row else None)
+
+        if stats.last_day is not None and revised.get(metric_id, stats.last_day + 1) <= stats.last_day:
+            s = s.dropna()
+            end = max(stats.last_day, s.index.max().toordinal() if len(s) else stats.last_day)
+            stats = MetricRollingStats()
+            stats.push_series(_load_observations(session, metric_id, end - longest))
+            logger.info(f"Rebuilt rolling stats for {metric_id} after revisions since "
+                        f"{datetime.date.fromordinal(revised[metric_id])}")
+        elif stats.push_series(s) == 0 and row is not None:
+            summaries[metric_id] = json.loads(row.stats_json) if row.stats_json else None
+            continue
+
+        summary = stats.summary()
+        summaries[metric_id] = summary
+        session.merge(MetricStats(
+            metric_id=metric_id,
+            as_of=datetime.date.fromordinal(stats.last_day) if stats.last_day else None,
+            state_json=stats.to_state(),
+            stats_json=json.dumps(summary)
+        ))
+    return summaries
@@ -0,0 +1,70 @@
+"""
+管理路由 - 批量操作与导出
+请求头 X-Admin-Token 须与 ADMIN_TOKEN 一致；未配置 ADMIN_TOKEN 时接口禁用
+"""
+import io
+import hmac
+from functools import wraps
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import ADMIN_TOKEN, BULK_BATCH_SIZE, logger
+from admin_bulk import OPERATIONS, EXPORT_KINDS, FORMATS, apply_stream, export_rows, iter_output
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def require_admin(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'error': '管理接口未启用'}), 403
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return jsonify({'error': '管理令牌无效'}), 401
+        return f(*args, **kwargs)
+    return decorated
+
+
+def _format(default: str) -> str:
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt
+    return 'csv' if (request.mimetype or '') == 'text/csv' else default
+
+
+@admin_bp.route('/bulk', methods=['POST'])
+@require_admin
+def bulk():
+    """
+    批量操作：请求体为 CSV（Content-Type: text/csv）或 JSONL，?op= 为缺省操作
+    响应按批流式返回 JSONL 结果（?output=csv 返回 CSV）
+    WSGI 模式下请求体边读边处理；ASGI 模式下请求体先完整读入，大小受 ASGI_MAX_BODY_MB 限制
+    """
+    fmt = _format('jsonl')
+    output = request.args.get('output', 'jsonl')
+    op = request.args.get('op') or None
+    if fmt not in FORMATS or output not in FORMATS:
+        return jsonify({'error': f"format 须为 {' / '.join(FORMATS)}"}), 400
+    if op and op not in OPERATIONS:
+        return jsonify({'error': '无效的操作'}), 400
+    try:
+        batch_size = int(request.args.get('batch_size', BULK_BATCH_SIZE))
+    except ValueError:
+        return jsonify({'error': 'batch_size 参数无效'}), 400
+
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    logger.info(f"Admin bulk operation started ({fmt}, default op {op})")
+    results = apply_stream(stream, fmt, op, batch_size)
+    return Response(stream_with_context(iter_output(results, output)), mimetype=MIMETYPES[output])
+
+
+@admin_bp.route('/export/<kind>', methods=['GET'])
+@require_admin
+def export(kind):
+    """导出 codes / users / access / stats，?format=csv|jsonl"""
+    fmt = request.args.get('format', 'jsonl')
+    if kind not in EXPORT_KINDS:
+        return jsonify({'error': '无效的导出类型'}), 404
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format 须为 {' / '.join(FORMATS)}"}), 400
+    return Response(stream_with_context(iter_output(export_rows(kind), fmt)), mimetype=MIMETYPES[fmt])
@@ -0,0 +1,98 @@
+"""
+分析类路由 - 基于观测序列的长周期分析
+"""
+import datetime
+from flask import Blueprint, request, jsonify
+from config import ORDER_MAP, MODULE_METRICS, CORRELATION_MAX_WINDOW, BACKTEST_MAX_HORIZONS, BACKTEST_MAX_HORIZON
+from backtest import run_backtest, BACKTEST_TARGETS
+from correlation import get_correlation, select_module
+from history_tiers import TIERS, query_history
+from history_codec import negotiate_format, history_response, encode_history, HISTORY_PRECISION
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+
+@analytics_bp.route('/backtest', methods=['GET'])
+def get_backtest():
+    """状态信号回测：?metric=curve&target=nasdaq_index&horizons=20,60"""
+    metric = request.args.get('metric')
+    target = request.args.get('target')
+    horizons_arg = request.args.get('horizons', '')
+
+    try:
+        horizons = [int(h) for h in horizons_arg.split(',') if h.strip()] or None
+    except ValueError:
+        return jsonify({'error': 'horizons 参数无效'}), 400
+    if horizons and (len(set(horizons)) > BACKTEST_MAX_HORIZONS
+                     or any(h <= 0 or h > BACKTEST_MAX_HORIZON for h in horizons)):
+        return jsonify({'error': f'horizons 最多 {BACKTEST_MAX_HORIZONS} 个，取值 1-{BACKTEST_MAX_HORIZON}'}), 400
+
+    if target and target not in BACKTEST_TARGETS:
+        return jsonify({'error': '无效的目标指数'}), 400
+
+    result = run_backtest(horizons)
+    metrics = result['metrics']
+
+    if metric:
+        if metric not in metrics:
+            return jsonify({'error': '该指标暂无可回测的数据'}), 404
+        metrics = {metric: metrics[metric]}
+
+    if target:
+        metrics = {
+            mid: {**data, 'targets': {target: data['targets'].get(target, [])}}
+            for mid, data in metrics.items()
+        }
+
+    return jsonify({**result, 'metrics': metrics})
+
+
+@analytics_bp.route('/correlation', methods=['GET'])
+def get_correlation_matrix():
+    """指标相关矩阵：?window=60&module=gold（窗口单位为交易日）"""
+    try:
+        window = int(request.args.get('window', 60))
+    except ValueError:
+        return jsonify({'error': 'window 参数无效'}), 400
+    if window < 2 or window > CORRELATION_MAX_WINDOW:
+        return jsonify({'error': f'window 须在 2 到 {CORRELATION_MAX_WINDOW} 之间'}), 400
+
+    module = request.args.get('module') or None
+    if module and module not in MODULE_METRICS:
+        return jsonify({'error': '无效的模块'}), 400
+
+    return jsonify(select_module(get_correlation(window), module))
+
+
+def _compact_tiered(result):
+    """紧凑格式：期末值沿用列式历史编码，均值与极值作为并列数组"""
+    points = result['history']
+    columns = encode_history(points)
+    for key in ('mean', 'min', 'max'):
+        columns[key] = [round(p[key], HISTORY_PRECISION) for p in points]
+    return {**result, 'history': columns}
+
+
+@analytics_bp.route('/history', methods=['GET'])
+def get_history():
+    """预聚合历史：?metric=dgs10&start=2000-01-01&end=2024-12-31&tier=W（tier 缺省时按跨度自动选择）"""
+    metric = request.args.get('metric')
+    if metric not in ORDER_MAP:
+        return jsonify({'error': '无效的指标'}), 400
+
+    try:
+        start, end = (datetime.date.fromisoformat(request.args[k]) if request.args.get(k) else None
+                      for k in ('start', 'end'))
+    except ValueError:
+        return jsonify({'error': '日期格式应为 YYYY-MM-DD'}), 400
+    if start and end and start > end:
+        return jsonify({'error': 'start 不能晚于 end'}), 400
+
+    tier = request.args.get('tier', '').upper() or None
+    if tier and tier not in TIERS:
+        return jsonify({'error': f"tier 须为 {' / '.join(TIERS)}"}), 400
+
+    result = query_history(metric, start, end, tier)
+    if result is None:
+        return jsonify({'error': '该指标暂无历史数据'}), 404
+    return history_response(result, negotiate_format(request), compact=_compact_tiered)
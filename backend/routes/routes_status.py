@@ -0,0 +1,30 @@
+"""
+运行状态路由 - 数据获取台账与序列新鲜度
+"""
+from flask import Blueprint, request, jsonify
+from config import FRED_SERIES_FREQ
+from fetch_ledger import freshness_report, recent_runs
+
+status_bp = Blueprint('status', __name__, url_prefix='/api/status')
+
+
+@status_bp.route('/freshness', methods=['GET'])
+def get_freshness():
+    """各 FRED 序列的新鲜度：按发布频率标记过期、连续失败与从未获取成功的序列"""
+    return jsonify(freshness_report())
+
+
+@status_bp.route('/runs', methods=['GET'])
+def get_runs():
+    """最近的获取运行：?limit=20&series=DGS10（附带该序列每次运行的耗时、行数与错误）"""
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit 参数无效'}), 400
+    if limit < 1 or limit > 1000:
+        return jsonify({'error': 'limit 须在 1 到 1000 之间'}), 400
+
+    series_id = request.args.get('series') or None
+    if series_id and series_id not in FRED_SERIES_FREQ:
+        return jsonify({'error': '无效的序列'}), 400
+    return jsonify({'runs': recent_runs(limit, series_id)})
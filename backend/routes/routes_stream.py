@@ -0,0 +1,45 @@
+"""
+更新推送路由 - Server-Sent Events
+WSGI 模式下每个连接占用一个线程；大量长连接请使用 ASGI 模式（asgi.py 中的原生实现）
+"""
+import queue
+import threading
+from flask import Blueprint, Response, request, jsonify
+from config import STREAM_QUEUE_SIZE, STREAM_HEARTBEAT_SECONDS
+from stream import BROADCASTER, RESPONSE_HEADERS, hello_event, valid_module
+
+stream_bp = Blueprint('stream', __name__, url_prefix='/api')
+
+
+@stream_bp.route('/stream', methods=['GET'])
+def stream():
+    """订阅指标更新：?module=nasdaq|sp500|gold（缺省为全部指标）"""
+    module = request.args.get('module') or None
+    if not valid_module(module):
+        return jsonify({'error': '无效的模块'}), 400
+
+    pending = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    closed = threading.Event()
+
+    def deliver(data: bytes) -> bool:
+        try:
+            pending.put_nowait(data)
+            return True
+        except queue.Full:
+            closed.set()
+            return False
+
+    unsubscribe = BROADCASTER.subscribe(module, deliver)
+
+    def generate():
+        try:
+            yield hello_event()
+            while not closed.is_set():
+                try:
+                    yield pending.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    continue
+        finally:
+            unsubscribe()
+
+    return Response(generate(), headers=RESPONSE_HEADERS)
@@ -0,0 +1,121 @@
+"""
+本地告警 webhook 接收端（stand-in）
+接收 alerts.py 投递的批次并打印，用于离线验证合并、并发与重试行为。
+支持延迟与错误注入，--secret 时校验 X-Alert-Signature 签名。
+
+用法:
+  python scripts/alert_receiver.py --port 8901 --latency-ms 200 --error-rate 0.3
+  python alerts.py subscribe http://127.0.0.1:8901/hook
+  python alerts.py dispatch
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 添加 backend 目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import sign, SIGNATURE_HEADER
+
+
+class ReceiverState:
+    """注入配置与接收统计"""
+
+    def __init__(self, args):
+        self.latency = args.latency_ms / 1000.0
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.secret = args.secret
+        self.quiet = args.quiet
+        self.requests = 0
+        self.events = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: ReceiverState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            # 统计接口，便于脚本化检查
+            with state.lock:
+                self._reply(200, {'requests': state.requests, 'events': state.events,
+                                  'rejected': state.rejected, 'max_in_flight': state.max_in_flight})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with state.lock:
+                state.requests += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                if state.latency:
+                    time.sleep(state.latency)
+                if state.secret and self.headers.get(SIGNATURE_HEADER) != sign(state.secret, body):
+                    with state.lock:
+                        state.rejected += 1
+                    self._reply(401, {'error': 'bad signature'})
+                    return
+                if random.random() < state.error_rate:
+                    with state.lock:
+                        state.rejected += 1
+                    self._reply(state.error_status, {'error': 'injected'})
+                    return
+
+                payload = json.loads(body)
+                with state.lock:
+                    state.events += payload['count']
+                if not state.quiet:
+                    for e in payload['events']:
+                        print(f"[{self.path}] {e['metric']}: {e['from']['status']} -> {e['to']['status']} "
+                              f"({e['value']}, {e['dataDate']}, events {e['eventIds']})")
+                self._reply(200, {'received': payload['count']})
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local webhook receiver for alert delivery testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--secret', help='Verify request signatures with this secret')
+    parser.add_argument('--quiet', action='store_true', help='Only keep counters, do not print events')
+    args = parser.parse_args()
+
+    state = ReceiverState(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Alert receiver listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"requests={state.requests} events={state.events} rejected={state.rejected} "
+              f"max_in_flight={state.max_in_flight}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+应用增量数据包 - 服务器端同步脚本
+拉取仓库后运行，按顺序应用本地版本之后的所有 delta
+退出码: 0 = 已应用新数据, 2 = 无新数据, 1 = 失败
+"""
+import os
+import sys
+
+# 添加 backend 目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import logger
+from models import init_db, Session
+from deltas import apply_pending_deltas, get_local_version, load_manifest
+
+
+def main():
+    """主函数"""
+    init_db()
+    session = Session()
+    try:
+        before = get_local_version(session)
+        applied = apply_pending_deltas(session)
+        head = load_manifest()['head']
+        print(f"Local store v{before} -> v{get_local_version(session)} (manifest head v{head}), applied {applied}")
+        return 0 if applied else 2
+    except Exception as e:
+        logger.error(f"Failed to apply deltas: {e}")
+        session.rollback()
+        return 1
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+本地 FRED stand-in 服务
+模拟 FRED 的 /fred/series/observations 接口，用于离线复现与压测数据刷新流程。
+数据来源：--fixtures 目录（CSV/Parquet），缺失的序列使用确定性合成数据。
+支持可配置的延迟与错误注入。
+
+用法:
+  python scripts/fred_standin.py --port 8900 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+  DATA_PROVIDER=http FRED_API_BASE=http://127.0.0.1:8900/fred python app.py --update
+
+  # 导出合成数据为 fixtures 目录
+  python scripts/fred_standin.py --write-fixtures fixtures/fred
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# 添加 backend 目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import FRED_SERIES_FREQ
+from data_providers import FixtureProvider, synthetic_series
+
+
+class StandinState:
+    """服务配置与请求计数"""
+
+    def __init__(self, args):
+        self.fixtures = FixtureProvider(args.fixtures) if args.fixtures else None
+        self.latency = args.latency_ms / 1000.0
+        self.jitter = args.jitter_ms / 1000.0
+        self.error_rate = args.error_rate
+        self.error_statuses = [int(code) for code in args.error_status.split(',')]
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def load(self, series_id, start, end):
+        if self.fixtures is not None:
+            try:
+                return self.fixtures.get_series(series_id, start, end)
+            except FileNotFoundError:
+                pass
+        if series_id not in FRED_SERIES_FREQ:
+            return None
+        return synthetic_series(series_id, start or '1990-01-01', end)
+
+
+def make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass  # 压测时关闭逐请求日志
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            if url.path == '/stats':
+                return self._send_json(200, {'requests': state.requests, 'errors': state.errors})
+
+            with state.lock:
+                state.requests += 1
+
+            # 模拟网络与服务端处理延迟
+            delay = state.latency + random.uniform(0, state.jitter)
+            if delay > 0:
+                time.sleep(delay)
+
+            if url.path.rstrip('/') not in ('/fred/series/observations', '/series/observations'):
+                return self._send_json(404, {'error_code': 404, 'error_message': 'Not Found'})
+
+            # 错误注入
+            if state.error_rate and random.random() < state.error_rate:
+                with state.lock:
+                    state.errors += 1
+                status = random.choice(state.error_statuses)
+                return self._send_json(status, {'error_code': status, 'error_message': 'Injected error'})
+
+            series_id = params.get('series_id', '')
+            if not series_id:
+                return self._send_json(400, {'error_code': 400, 'error_message': 'Bad Request. Variable series_id is not set.'})
+
+            s = state.load(series_id, params.get('observation_start'), params.get('observation_end'))
+            if s is None:
+                return self._send_json(400, {'error_code': 400, 'error_message': 'Bad Request. The series does not exist.'})
+
+            observations = [
+                {'date': d.strftime('%Y-%m-%d'), 'value': '.' if v != v else repr(float(v))}
+                for d, v in s.items()
+            ]
+            self._send_json(200, {
+                'observation_start': params.get('observation_start', ''),
+                'observation_end': params.get('observation_end', ''),
+                'count': len(observations),
+                'observations': observations
+            })
+
+    return Handler
+
+
+def write_fixtures(directory: str):
+    """将合成数据导出为 FixtureProvider 可读的 CSV 目录"""
+    os.makedirs(directory, exist_ok=True)
+    for series_id in FRED_SERIES_FREQ:
+        s = synthetic_series(series_id)
+        s.rename('value').rename_axis('date').to_csv(os.path.join(directory, f'{series_id}.csv'), date_format='%Y-%m-%d')
+    print(f"Wrote {len(FRED_SERIES_FREQ)} fixtures to {directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local FRED stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--fixtures', help='Fixture directory (CSV/Parquet); synthetic data when omitted')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with an error')
+    parser.add_argument('--error-status', default='429,500,503', help='Comma separated error status codes')
+    parser.add_argument('--write-fixtures', metavar='DIR', help='Export synthetic series as CSV fixtures and exit')
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures(args.write_fixtures)
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StandinState(args)))
+    print(f"FRED stand-in listening on http://{args.host}:{args.port}/fred")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+仪表盘共享快照
+每次数据更新提交后，把完整的仪表盘响应（含历史序列）按各输出格式预先编码，
+一次性写入只读快照文件（临时文件 + 原子替换）。所有 worker 进程通过内存映射读取，
+共享同一份页缓存，不再各自持有并重建数据副本。
+
+文件布局（小端）:
+  头部   magic(8s) version(Q) created_at(d) data_version(Q) sections(I)
+  段表   每段 name(16s) offset(Q) length(Q)
+  数据   各格式的响应体（json / compact / msgpack）与各模块综合评分（weather_<module>，JSON）
+
+读者每次请求 stat 一次文件，标识（inode, mtime, size）变化时重新映射；
+旧映射由仍在使用它的请求持有，替换缓存引用无需加锁。
+"""
+import os
+import json
+import mmap
+import time
+import struct
+from typing import Dict, List, Any, Optional, Tuple
+from config import ORDER_MAP, META_INFO, SNAPSHOT_FILE, logger
+from models import Session, Metric, StoreMeta
+from history_codec import encode_body, msgpack
+from weather import build_weather, section_name
+from telemetry import CACHE_REQUESTS
+
+MAGIC = b'NWSSNAP1'
+_HEADER = struct.Struct('<8sQdQI')
+_SECTION = struct.Struct('<16sQQ')
+
+_MAP_HITS = CACHE_REQUESTS.labels('dashboard_snapshot', 'hit')
+_MAP_MISSES = CACHE_REQUESTS.labels('dashboard_snapshot', 'miss')
+
+
+def build_dashboard_items(session) -> List[Dict[str, Any]]:
+    """按 ORDER_MAP 顺序从指标表构建仪表盘条目"""
+    metrics = {m.id: m for m in session.query(Metric).all()}
+
+    result = []
+    for mid in ORDER_MAP:
+        m = metrics.get(mid)
+        if not m:
+            continue
+        try:
+            history = json.loads(m.history_json) if m.history_json else []
+        except ValueError:
+            history = []
+
+        meta = META_INFO.get(mid, {'formula': '未知', 'range': '未知', 'freq': '未知', 'update': '未知'})
+
+        # 获取最新数据日期（从历史记录中）
+        data_date = history[-1]['date'] if history else None
+        stats = json.loads(m.stats_json) if m.stats_json else None
+
+        result.append({
+            "id": m.id,
+            "name": m.name,
+            "ticker": m.ticker,
+            "value": m.value,
+            "secondaryValue": m.secondary_value,
+            "unit": m.unit,
+            "description": m.description,
+            "statusText": m.status_text,
+            "statusColor": m.status_color,
+            "history": history,
+            "stats": stats,
+            "formula": meta['formula'],
+            "dataRange": meta['range'],
+            "dataDate": data_date,
+            "nextUpdateTime": meta['update'],
+            "updateFrequency": meta['freq']
+        })
+    return result
+
+
+class Snapshot:
+    """一个已映射的快照版本；sections 中的 memoryview 直接指向映射内存"""
+
+    def __init__(self, mm: mmap.mmap):
+        magic, self.version, self.created_at, self.data_version, count = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError('not a dashboard snapshot file')
+        self._mm = mm
+        view = memoryview(mm)
+        self.sections: Dict[str, memoryview] = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(mm, _HEADER.size + i * _SECTION.size)
+            self.sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + length]
+
+    def body(self, fmt: str) -> Optional[memoryview]:
+        return self.sections.get(fmt)
+
+    @property
+    def etag(self) -> str:
+        # 快照文件删除后 version 从 1 重新计数，单独作为 ETag 会与旧缓存冲突；
+        # 加上写入时间（微秒）保证不同快照的 ETag 不同
+        return f'd{self.data_version}-{int(self.created_at * 1e6):x}'
+
+
+# 当前映射: (文件标识, Snapshot)
+_current: Optional[Tuple[tuple, Snapshot]] = None
+
+
+def current_snapshot(path: str = SNAPSHOT_FILE) -> Optional[Snapshot]:
+    """返回当前快照；文件被替换后自动重新映射，文件不存在或损坏时返回 None"""
+    global _current
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    ident = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _current
+    if cached and cached[0] == ident:
+        _MAP_HITS.inc()
+        return cached[1]
+    _MAP_MISSES.inc()
+
+    try:
+        with open(path, 'rb') as f:
+            snap = Snapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError, struct.error) as e:
+        logger.error(f"Dashboard snapshot unreadable: {e}")
+        return None
+    # 并发请求可能重复映射同一版本，结果相同，无需加锁
+    _current = (ident, snap)
+    return snap
+
+
+def _read_version(path: str) -> int:
+    try:
+        with open(path, 'rb') as f:
+            magic, version = _HEADER.unpack(f.read(_HEADER.size))[:2]
+        return version if magic == MAGIC else 0
+    except (OSError, struct.error):
+        return 0
+
+
+def write_snapshot(items: List[Dict[str, Any]], data_version: int = 0, path: str = SNAPSHOT_FILE,
+                   extra: Optional[Dict[str, bytes]] = None) -> int:
+    """编码所有格式并原子替换快照文件，extra 为附加的已编码段，返回新版本号"""
+    formats = ['json', 'compact'] + (['msgpack'] if msgpack is not None else [])
+    bodies = [(fmt, encode_body(items, fmt)[0]) for fmt in formats] + list((extra or {}).items())
+    version = _read_version(path) + 1
+
+    offset = _HEADER.size + _SECTION.size * len(bodies)
+    table = []
+    for fmt, body in bodies:
+        table.append(_SECTION.pack(fmt.encode('ascii'), offset, len(body)))
+        offset += len(body)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, version, time.time(), data_version, len(bodies)))
+        f.writelines(table)
+        f.writelines(body for _, body in bodies)
+    os.replace(tmp, path)
+    return version
+
+
+def _weather_sections(items: List[Dict[str, Any]]) -> Dict[str, bytes]:
+    """各模块综合评分段；计算失败时快照照常发布，只是不含评分"""
+    try:
+        weather = build_weather(items)
+    except Exception as e:
+        logger.error(f"Weather score computation failed: {e}")
+        return {}
+    return {section_name(module): encode_body(doc, 'json')[0] for module, doc in weather.items()}
+
+
+def publish_snapshot(session=None) -> Optional[int]:
+    """从指标表生成新快照；失败只记录日志，不影响数据更新本身"""
+    own_session = session is None
+    session = session or Session()
+    try:
+        items = build_dashboard_items(session)
+        meta = session.get(StoreMeta, 'data_version')
+        version = write_snapshot(items, int(meta.value) if meta else 0, extra=_weather_sections(items))
+        logger.info(f"Published dashboard snapshot v{version} ({len(items)} metrics)")
+        return version
+    except Exception as e:
+        logger.error(f"Dashboard snapshot publish failed: {e}")
+        return None
+    finally:
+        if own_session:
+            session.close()
+
+
+def snapshot_response(snap: Snapshot, fmt: str, request, section: Optional[str] = None):
+    """
+    从映射内存直接输出响应体；ETag 为快照版本，命中 If-None-Match 时返回 304
+    section 指定附加段（如 weather_nasdaq），其内容按 fmt 格式输出
+    """
+    from flask import Response
+    from history_codec import JSON_MIMETYPE, COMPACT_JSON_MIMETYPE, MSGPACK_MIMETYPE
+
+    name = section or fmt
+    body = snap.body(name)
+    if body is None:
+        return None
+    mimetypes = {'json': JSON_MIMETYPE, 'compact': COMPACT_JSON_MIMETYPE, 'msgpack': MSGPACK_MIMETYPE}
+    etag = f'{snap.etag}-{name}'
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        # WSGI 要求响应块为 bytes，此处从映射内存复制一次
+        response = Response(bytes(body), mimetype=mimetypes[fmt])
+    response.set_etag(etag)
+    response.headers['X-Snapshot-Version'] = str(snap.version)
+    response.vary.add('Accept')
+    return response
@@ -21,8 +21,17 @@ def main():
         from models import init_db
         init_db()
         
-        # 更新数据
-        success = update_metrics()
+        # 先应用已发布的 delta，使本地库与清单头部一致
+        from models import Session
+        from deltas import apply_pending_deltas
+        session = Session()
+        try:
+            apply_pending_deltas(session)
+        finally:
+            session.close()
+        
+        # 更新数据并发布本次 delta
+        success = update_metrics(publish=True)
         
         if success:
             logger.info("✓ Data fetch completed successfully")
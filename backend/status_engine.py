@@ -0,0 +1,146 @@
+"""
+指标状态规则引擎
+阈值规则以数据形式保存在 status_rules.json 中（每个指标一组有序区间），
+编译后按 metric_id 直接分派，并可对整段历史数组一次性向量化分类。
+"""
+import os
+import json
+import hashlib
+import operator
+import threading
+from typing import Dict, List, Tuple, Optional, Any
+import numpy as np
+from config import STATUS_RULES_FILE, logger
+
+UNKNOWN_STATUS = ("未知", "neutral")
+
+_OPS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+
+class CompiledRule:
+    """单个指标编译后的规则：按顺序匹配的区间 + 默认状态"""
+
+    def __init__(self, metric_id: str, spec: Dict[str, Any]):
+        self.metric_id = metric_id
+        self.field = spec.get('field', 'value')       # 'value' | 'change'
+        self.change_mode = spec.get('change', 'diff')  # 'diff' | 'pct'
+
+        bands = spec.get('bands', [])
+        for band in bands:
+            if band['op'] not in _OPS:
+                raise ValueError(f"{metric_id}: 不支持的比较符 {band['op']}")
+
+        self.ops = [_OPS[band['op']] for band in bands]
+        self.thresholds = np.array([float(band['threshold']) for band in bands])
+        default = spec.get('default', {'text': UNKNOWN_STATUS[0], 'color': UNKNOWN_STATUS[1]})
+        # labels[i] 对应第 i 个区间，最后一项为默认状态
+        self.labels: List[Tuple[str, str]] = [(band['text'], band['color']) for band in bands]
+        self.labels.append((default['text'], default['color']))
+        self._pairs = list(zip(self.ops, self.thresholds.tolist()))
+
+    def band_index(self, value, change=0) -> int:
+        """标量分类，返回命中的区间下标"""
+        x = change if self.field == 'change' else value
+        for i, (op, threshold) in enumerate(self._pairs):
+            if op(x, threshold):
+                return i
+        return len(self._pairs)
+
+    def changes(self, values: np.ndarray) -> np.ndarray:
+        """由数值序列计算逐点变化量，首点变化为 0（与单点序列的标量逻辑一致）"""
+        prev = np.concatenate((values[:1], values[:-1]))
+        if self.change_mode == 'pct':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return (values - prev) / prev
+        return values - prev
+
+    def band_indices(self, values, changes=None) -> np.ndarray:
+        """向量化分类整段历史，返回每个点命中的区间下标"""
+        values = np.asarray(values, dtype=float)
+        if self.field == 'change':
+            x = self.changes(values) if changes is None else np.asarray(changes, dtype=float)
+        else:
+            x = values
+        conditions = [op(x, threshold) for op, threshold in self._pairs]
+        return np.select(conditions, np.arange(len(conditions)), default=len(conditions))
+
+
+class StatusRuleEngine:
+    """规则引擎：metric_id -> CompiledRule 的 O(1) 分派"""
+
+    def __init__(self, rules_doc: Dict[str, Any]):
+        raw = rules_doc.get('rules', {})
+        canonical = json.dumps(rules_doc, sort_keys=True, ensure_ascii=False)
+        # 规则版本 = 内容哈希，供回测等结果缓存使用
+        self.version = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:12]
+        self._rules: Dict[str, CompiledRule] = {}
+
+        for metric_id, spec in raw.items():
+            if 'same_as' not in spec:
+                self._rules[metric_id] = CompiledRule(metric_id, spec)
+        for metric_id, spec in raw.items():
+            if 'same_as' in spec:
+                self._rules[metric_id] = self._rules[spec['same_as']]
+
+    def metric_ids(self) -> List[str]:
+        return list(self._rules.keys())
+
+    def get_rule(self, metric_id: str) -> Optional[CompiledRule]:
+        return self._rules.get(metric_id)
+
+    def classify(self, metric_id: str, value, change=0) -> Tuple[str, str]:
+        """单点分类，返回 (状态文本, 颜色)"""
+        rule = self._rules.get(metric_id)
+        if rule is None:
+            return UNKNOWN_STATUS
+        return rule.labels[rule.band_index(value, change)]
+
+    def classify_history(self, metric_id: str, values, changes=None) -> List[Tuple[str, str]]:
+        """整段历史分类，返回逐点 (状态文本, 颜色) 列表"""
+        rule = self._rules.get(metric_id)
+        if rule is None:
+            return [UNKNOWN_STATUS] * len(values)
+        return [rule.labels[i] for i in rule.band_indices(values, changes)]
+
+
+# ==================== 规则加载 ====================
+
+_engine: Optional[StatusRuleEngine] = None
+_engine_mtime: Optional[float] = None
+_engine_lock = threading.Lock()
+
+
+def load_rules(path: str = STATUS_RULES_FILE) -> StatusRuleEngine:
+    """从 JSON 文件加载并编译规则"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return StatusRuleEngine(json.load(f))
+
+
+def get_engine() -> StatusRuleEngine:
+    """获取当前规则引擎，规则文件被修改后自动重新编译"""
+    global _engine, _engine_mtime
+    try:
+        mtime = os.path.getmtime(STATUS_RULES_FILE)
+    except OSError:
+        mtime = None
+
+    if _engine is not None and mtime == _engine_mtime:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None or mtime != _engine_mtime:
+            try:
+                _engine = load_rules()
+                logger.info(f"Loaded status rules version {_engine.version}")
+            except (IOError, ValueError, KeyError) as e:
+                # 规则文件损坏时沿用上一版规则
+                logger.error(f"Failed to load status rules: {e}")
+                if _engine is None:
+                    _engine = StatusRuleEngine({})
+            _engine_mtime = mtime
+        return _engine
@@ -0,0 +1,166 @@
+"""
+指标更新推送（Server-Sent Events）
+每个进程只有一个广播线程：轮询共享快照的版本号（快照由数据更新提交后发布，跨进程可见），
+版本变化时与上一版本逐指标比较，每个模块只编码一次事件，再分发给该模块的全部订阅者。
+
+事件格式:
+  event: hello   连接建立时发送当前版本，客户端据此判断是否需要重新拉取
+  event: update  {"version", "dataVersion", "changed": [{id, value, secondaryValue, statusText, statusColor, dataDate}]}
+                 订阅单个模块时附带 "weather": {score, scenario}（模块综合评分）
+  注释行 ": ping" 为心跳，保持经过代理的长连接
+"""
+import json
+import time
+import threading
+from typing import Dict, Optional, Callable, List
+from config import MODULE_METRICS, STREAM_POLL_SECONDS, STREAM_HEARTBEAT_SECONDS, logger
+from snapshot import current_snapshot
+from weather import section_name
+from telemetry import Gauge
+
+RESPONSE_HEADERS = {
+    'Content-Type': 'text/event-stream; charset=utf-8',
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # 关闭 nginx 缓冲，事件即时送达
+}
+HEARTBEAT = b': ping\n\n'
+RETRY_MS = 5000
+
+# 推送给客户端的指标字段（完整数据仍通过 /api/dashboard 获取）
+_SUMMARY_FIELDS = ('id', 'value', 'secondaryValue', 'statusText', 'statusColor', 'dataDate')
+
+
+def format_event(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+def hello_event() -> bytes:
+    """连接建立时发送的首个事件（附带重连间隔）"""
+    snap = current_snapshot()
+    version = snap.version if snap else 0
+    return f'retry: {RETRY_MS}\n'.encode('ascii') + format_event('hello', {'version': version}, version)
+
+
+def valid_module(module: Optional[str]) -> bool:
+    return module is None or module in MODULE_METRICS
+
+
+def _load_items(snap) -> Dict[str, dict]:
+    return {item['id']: item for item in json.loads(bytes(snap.body('json')))}
+
+
+def _weather_summary(snap, module: str) -> Optional[dict]:
+    body = snap.body(section_name(module))
+    if body is None:
+        return None
+    doc = json.loads(bytes(body))
+    return {'score': doc['score'], 'scenario': doc['scenario']}
+
+
+class Broadcaster:
+    """
+    订阅者为 deliver(bytes) -> bool 回调，按模块分组（None 表示全部指标）
+    deliver 返回 False（连接积压过多）时该订阅者被移除
+    """
+
+    def __init__(self, poll: float = STREAM_POLL_SECONDS, heartbeat: float = STREAM_HEARTBEAT_SECONDS):
+        self.poll = poll
+        self.heartbeat = heartbeat
+        self._subscribers: Dict[Optional[str], Dict[int, Callable[[bytes], bool]]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._version = None
+        self._items: Dict[str, dict] = {}
+
+    def subscribe(self, module: Optional[str], deliver: Callable[[bytes], bool]) -> Callable[[], None]:
+        """注册订阅者，返回取消订阅函数；首次订阅时启动广播线程"""
+        with self._lock:
+            self._next_id += 1
+            key = self._next_id
+            self._subscribers.setdefault(module, {})[key] = deliver
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stream-broadcaster', daemon=True)
+                self._thread.start()
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.get(module, {}).pop(key, None)
+        return unsubscribe
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(len(group) for group in self._subscribers.values())
+
+    def _run(self):
+        snap = current_snapshot()
+        if snap is not None:
+            self._version, self._items = snap.version, _load_items(snap)
+        last_sent = time.monotonic()
+        while True:
+            time.sleep(self.poll)
+            try:
+                events = self._check()
+            except Exception as e:
+                logger.error(f"Stream broadcaster failed to read snapshot: {e}")
+                continue
+            if events:
+                self._publish(events)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= self.heartbeat:
+                self._publish({module: HEARTBEAT for module in self._modules()})
+                last_sent = time.monotonic()
+
+    def _modules(self) -> List[Optional[str]]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def _check(self) -> Dict[Optional[str], bytes]:
+        """快照版本变化时按模块生成事件；无变化返回空字典"""
+        snap = current_snapshot()
+        if snap is None or snap.version == self._version:
+            return {}
+        items = _load_items(snap)
+        changed = [{k: item.get(k) for k in _SUMMARY_FIELDS}
+                   for mid, item in items.items() if self._items.get(mid) != item]
+        self._version, self._items = snap.version, items
+        logger.info(f"Stream: snapshot v{snap.version}, {len(changed)} metrics changed")
+
+        events = {}
+        for module in [None] + list(MODULE_METRICS):
+            ids = set(MODULE_METRICS[module]) if module else None
+            subset = [c for c in changed if ids is None or c['id'] in ids]
+            if subset or module is None:
+                data = {'version': snap.version, 'dataVersion': snap.data_version, 'changed': subset}
+                if module:
+                    data['weather'] = _weather_summary(snap, module)
+                events[module] = format_event('update', data, snap.version)
+        return events
+
+    def _publish(self, events: Dict[Optional[str], bytes]):
+        with self._lock:
+            targets = [(module, key, deliver) for module, group in self._subscribers.items()
+                       if module in events for key, deliver in group.items()]
+        dropped = []
+        for module, key, deliver in targets:
+            try:
+                ok = deliver(events[module])
+            except Exception:
+                ok = False
+            if not ok:
+                dropped.append((module, key))
+        if dropped:
+            with self._lock:
+                for module, key in dropped:
+                    self._subscribers.get(module, {}).pop(key, None)
+            logger.warning(f"Stream: dropped {len(dropped)} lagging subscribers")
+
+
+BROADCASTER = Broadcaster()
+
+Gauge('stream_subscribers', 'Connected /api/stream clients', callback=lambda: {(): float(BROADCASTER.count())})
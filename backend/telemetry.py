@@ -0,0 +1,301 @@
+"""
+运行时指标（Prometheus 文本格式）
+计数器与直方图按固定数量的分片累加：线程按系统线程号映射到分片，只在该分片的锁上写入，
+没有全局锁，不同分片上的线程互不竞争；分片数固定，开发服务器每个请求一个新线程时也不会增长。
+采集（/metrics）时再把各分片求和。直方图使用预先确定的桶边界。
+"""
+import time
+import bisect
+import datetime
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 默认延迟桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 每个指标的分片数：线程按系统线程号映射到固定分片，分片数量与线程创建方式无关
+_SHARD_COUNT = 16
+
+
+class _ShardSet:
+    """固定数量的分片数组，每个分片一把锁；collect() 返回各位置的总和"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._shards = [[0.0] * size for _ in range(_SHARD_COUNT)]
+        self._locks = [threading.Lock() for _ in range(_SHARD_COUNT)]
+
+    def add(self, updates: Sequence[Tuple[int, float]]):
+        """在当前线程的分片上累加 (位置, 增量)"""
+        i = threading.get_native_id() % _SHARD_COUNT
+        values = self._shards[i]
+        with self._locks[i]:
+            for index, amount in updates:
+                values[index] += amount
+
+    def collect(self) -> List[float]:
+        totals = [0.0] * self.size
+        for lock, values in zip(self._locks, self._shards):
+            with lock:
+                for i, v in enumerate(values):
+                    totals[i] += v
+        return totals
+
+
+class _Metric(ABC):
+    """带标签的指标族，子指标按标签值缓存"""
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """创建一组标签值对应的子指标"""
+
+    def _label_str(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    @abstractmethod
+    def _render_child(self, key, child) -> List[str]:
+        """子指标的文本格式行"""
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _ShardSet(1)
+
+    def inc(self, amount: float = 1):
+        self._shards.add(((0, amount),))
+
+    def value(self) -> float:
+        return self._shards.collect()[0]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f'{self.name}{self._label_str(key)} {_fmt(child.value())}']
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # 各桶计数 + 溢出桶 + 总和
+        self._shards = _ShardSet(len(buckets) + 2)
+
+    def observe(self, value: float):
+        self._shards.add(((bisect.bisect_left(self.buckets, value), 1), (-1, value)))
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        totals = self._shards.collect()
+        return totals[:-1], totals[-1]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, key, child):
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _fmt(bound)
+            labels = self._label_str(key, 'le="%s"' % le)
+            lines.append(f'{self.name}_bucket{labels} {_fmt(cumulative)}')
+        lines.append(f'{self.name}_sum{self._label_str(key)} {_fmt(total)}')
+        lines.append(f'{self.name}_count{self._label_str(key)} {_fmt(cumulative)}')
+        return lines
+
+
+class Gauge(_Metric):
+    """采集时通过回调取值的仪表；回调返回 {标签值元组: 数值}"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        self.callback = callback
+        super().__init__(name, help_text, labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        try:
+            values = self.callback() if self.callback else {}
+        except Exception:
+            values = {}
+        for key, value in sorted(values.items()):
+            if value is not None:
+                lines.extend(self._render_child(key, value))
+        return lines
+
+    def _new_child(self):
+        raise TypeError(f'{self.name}: gauge values come from the callback, labels() is not supported')
+
+    def _render_child(self, key, value):
+        return [f'{self.name}{self._label_str(key)} {_fmt(value)}']
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+
+# ==================== 指标定义 ====================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Flask request latency by route', ['method', 'route', 'status'])
+JSON_STORE_LOCK_WAIT_SECONDS = Histogram(
+    'json_store_lock_wait_seconds', 'Time spent waiting for the json_store write lock',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+JSON_STORE_IO_SECONDS = Histogram(
+    'json_store_io_seconds', 'json_store file read / write duration', ['op', 'file'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+BCRYPT_SECONDS = Histogram(
+    'bcrypt_duration_seconds', 'bcrypt hash / check duration', ['op'],
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0))
+FRED_FETCH_SECONDS = Histogram(
+    'fred_fetch_duration_seconds', 'FRED series fetch latency in update_metrics', ['series'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+FRED_FETCH_ERRORS = Counter(
+    'fred_fetch_errors_total', 'FRED series fetch failures in update_metrics', ['series'])
+FRED_HTTP_RETRIES = Counter(
+    'fred_http_retries_total', 'FRED HTTP retries by cause', ['cause'])
+ALERT_DELIVERIES = Counter(
+    'alert_deliveries_total', 'Alert webhook batch deliveries by result', ['result'])
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit / miss)', ['cache', 'result'])
+
+
+def _snapshot_values():
+    """数据快照版本与距最近一次指标更新的秒数"""
+    from sqlalchemy import text
+    from models import engine
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT key, value FROM store_meta")).fetchall())
+        last_updated = conn.execute(text("SELECT MAX(last_updated) FROM metrics")).scalar()
+    values = {
+        ('data',): float(rows.get('data_version', 0)),
+        ('delta',): float(rows.get('delta_version', 0))
+    }
+    from snapshot import current_snapshot
+    snap = current_snapshot()
+    if snap is not None:
+        values[('dashboard',)] = float(snap.version)
+    age = None
+    if last_updated:
+        updated = datetime.datetime.fromisoformat(str(last_updated))
+        age = (datetime.datetime.utcnow() - updated).total_seconds()
+    return values, age
+
+
+Gauge('snapshot_version', 'Current data / delta version of the local store', ['kind'],
+      callback=lambda: _snapshot_values()[0])
+Gauge('snapshot_age_seconds', 'Seconds since the metrics table was last updated',
+      callback=lambda: {(): _snapshot_values()[1]})
+
+
+# ==================== Flask 接入 ====================
+
+def init_app(app):
+    """注册请求计时钩子与 /metrics 端点"""
+    from flask import g, request, Response
+
+    @app.before_request
+    def _start_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        started = getattr(g, '_request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+                time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
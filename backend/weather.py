@@ -0,0 +1,105 @@
+"""
+模块综合天气评分
+把模块内各指标的状态颜色归一化为 [-1, 1] 的读数，按 WEATHER_WEIGHTS 加权平均，
+得到 -100（全部危险）到 100（全部有利）的综合评分，并映射为前端的 Scenario 场景。
+
+历史序列用状态规则对每个指标的历史数组向量化分类，按日期对齐（低频序列向前填充）后
+同样加权；已有读数的权重不足 WEATHER_MIN_COVERAGE 的早期日期不输出。
+评分在每次发布仪表盘快照时计算一次，作为快照的 weather_<module> 段保存。
+"""
+from typing import Dict, List, Any
+import numpy as np
+import pandas as pd
+from config import MODULE_METRICS, WEATHER_WEIGHTS
+from status_engine import get_engine
+
+# 状态颜色 -> 归一化读数
+COLOR_SCORES = {'success': 1.0, 'neutral': 0.0, 'warning': -0.5, 'danger': -1.0}
+
+# 场景阈值（与 src/types.ts 的 Scenario 取值一致）
+OPPORTUNITY_SCORE = 25
+HIGH_RISK_SCORE = -25
+DIVERGENCE_SHARE = 0.35  # 有利与不利权重占比同时超过该值视为信号分歧
+WEATHER_MIN_COVERAGE = 0.5
+
+
+def section_name(module: str) -> str:
+    return f'weather_{module}'
+
+
+def scenario_for(score: float, favorable: float, adverse: float) -> str:
+    if favorable >= DIVERGENCE_SHARE and adverse >= DIVERGENCE_SHARE:
+        return 'DIVERGENCE'
+    if score >= OPPORTUNITY_SCORE:
+        return 'OPPORTUNITY'
+    if score <= HIGH_RISK_SCORE:
+        return 'HIGH_RISK'
+    return 'NORMAL'
+
+
+def _history_scores(engine, item: Dict[str, Any]) -> pd.Series:
+    """单个指标历史逐点分类后的读数序列（按日期索引）"""
+    history = item.get('history') or []
+    if not history:
+        return pd.Series(dtype=float)
+    values = [point['value'] for point in history]
+    labels = engine.classify_history(item['id'], values)
+    scores = [COLOR_SCORES.get(color, 0.0) for _, color in labels]
+    index = pd.to_datetime([point['date'] for point in history])
+    return pd.Series(scores, index=index).groupby(level=0).last()
+
+
+def score_history(engine, items: List[Dict[str, Any]], weights: np.ndarray) -> List[Dict[str, Any]]:
+    """按日期对齐各指标读数并加权，返回 [{'date', 'value'}]"""
+    series = [_history_scores(engine, item) for item in items]
+    if not any(len(s) for s in series):
+        return []
+    frame = pd.concat(series, axis=1).sort_index().ffill()
+    readings = frame.to_numpy(dtype=np.float64)
+
+    present = ~np.isnan(readings)
+    available = present @ weights
+    weighted = np.where(present, readings, 0.0) @ weights
+    keep = available >= WEATHER_MIN_COVERAGE * weights.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 * weighted / available
+    return [{'date': date.date().isoformat(), 'value': round(float(value), 1)}
+            for date, value in zip(frame.index[keep], values[keep])]
+
+
+def module_weather(module: str, items_by_id: Dict[str, Dict[str, Any]], engine=None) -> Dict[str, Any]:
+    """单个模块的综合评分、场景、各指标贡献与评分历史"""
+    engine = engine or get_engine()
+    overrides = WEATHER_WEIGHTS.get(module, {})
+    items = [items_by_id[mid] for mid in MODULE_METRICS[module] if mid in items_by_id]
+    weights = np.array([float(overrides.get(item['id'], 1.0)) for item in items])
+    readings = np.array([COLOR_SCORES.get(item.get('statusColor'), 0.0) for item in items])
+
+    total = weights.sum()
+    score = float(100 * readings @ weights / total) if total else 0.0
+    favorable = float(weights[readings > 0].sum() / total) if total else 0.0
+    adverse = float(weights[readings < 0].sum() / total) if total else 0.0
+    dates = [item.get('dataDate') for item in items if item.get('dataDate')]
+
+    return {
+        'module': module,
+        'score': round(score, 1),
+        'scenario': scenario_for(score, favorable, adverse),
+        'favorable': round(favorable, 3),
+        'adverse': round(adverse, 3),
+        'asOf': max(dates) if dates else None,
+        'components': [{
+            'id': item['id'],
+            'statusColor': item.get('statusColor'),
+            'weight': float(w),
+            'contribution': round(float(100 * r * w / total), 2)
+        } for item, w, r in zip(items, weights, readings)],
+        'history': score_history(engine, items, weights) if items else []
+    }
+
+
+def build_weather(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """由仪表盘条目计算全部模块的综合评分"""
+    engine = get_engine()
+    items_by_id = {item['id']: item for item in items}
+    return {module: module_weather(module, items_by_id, engine) for module in MODULE_METRICS}
@@ -1,9 +1,10 @@
 import React, { useState, useEffect } from 'react';
-import { MetricData, Scenario } from './types';
-import { generateDashboardData } from './services/logicService';
+import { MetricData, ModuleWeather, Scenario } from './types';
+import { generateDashboardData, fetchModuleWeather, subscribeToUpdates } from './services/logicService';
 import DashboardCard from './components/DashboardCard';
 import MetricDetailModal from './components/MetricDetailModal';
 import GoldPriceWidget from './components/GoldPriceWidget';
+import WeatherScoreWidget from './components/WeatherScoreWidget';
 import SponsorModal from './components/SponsorModal';
 import TrialExpirationBanner from './components/TrialExpirationBanner';
 import AuthPage from './pages/AuthPage';
@@ -16,6 +17,7 @@ const App: React.FC = () => {
   const [view, setView] = useState<'home' | 'dashboard-nasdaq' | 'dashboard-sp500' | 'dashboard-gold'>('home');
   const [metrics, setMetrics] = useState<MetricData[]>([]);
   const [scenario, setScenario] = useState<Scenario>(Scenario.Normal);
+  const [weather, setWeather] = useState<ModuleWeather | null>(null);
   const [lastUpdated, setLastUpdated] = useState<Date>(new Date());
   const [isLoading, setIsLoading] = useState<boolean>(true);
   const [selectedMetric, setSelectedMetric] = useState<MetricData | null>(null);
@@ -33,8 +35,14 @@ const App: React.FC = () => {
   const fetchData = async () => {
     setIsLoading(true);
     try {
-      const data = await generateDashboardData(scenario);
+      // 指标与模块综合评分并行拉取（评分由后端预先计算）
+      const [data, moduleWeather] = await Promise.all([
+        generateDashboardData(scenario),
+        view === 'home' ? Promise.resolve(null) : fetchModuleWeather(view.replace('dashboard-', '')),
+      ]);
       setMetrics(data);
+      setWeather(moduleWeather);
+      if (moduleWeather) setScenario(moduleWeather.scenario);
       setLastUpdated(new Date());
     } catch (error) {
       console.error("Failed to fetch dashboard data", error);
@@ -44,10 +52,17 @@ const App: React.FC = () => {
   };
 
   useEffect(() => {
-    if (view !== 'home' && metrics.length === 0 && isAuthenticated) {
+    // 综合评分按模块区分，切换模块时需要重新拉取
+    if (view !== 'home' && isAuthenticated && (metrics.length === 0 || weather?.module !== view.replace('dashboard-', ''))) {
       fetchData();
     }
   }, [view, isAuthenticated]);
+
+  // 仪表盘页面订阅更新推送，有新数据时重新拉取，无需轮询
+  useEffect(() => {
+    if (view === 'home' || !isAuthenticated) return;
+    return subscribeToUpdates(view.replace('dashboard-', ''), fetchData);
+  }, [view, isAuthenticated]);
   
   // 处理模块点击
   const handleModuleClick = (module: 'nasdaq' | 'sp500' | 'gold', moduleName: string) => {
@@ -331,6 +346,8 @@ const App: React.FC = () => {
           </div>
         ) : (
           <>
+            {weather && <WeatherScoreWidget weather={weather} />}
+
             {isGold ? (
               /* 黄金仪表盘布局 */
               <>
@@ -0,0 +1,61 @@
+import React from 'react';
+import { ModuleWeather, Scenario } from '../types';
+import { AreaChart, Area, ResponsiveContainer, YAxis, Tooltip, ReferenceLine } from 'recharts';
+import { CloudRain, Sun, CloudSun, CloudLightning } from 'lucide-react';
+
+interface WeatherScoreWidgetProps {
+  weather: ModuleWeather;
+}
+
+// 综合评分由后端随快照预先计算，这里只负责展示
+const SCENARIO_STYLE: Record<Scenario, { label: string; text: string; stroke: string; icon: React.ElementType }> = {
+  [Scenario.Opportunity]: { label: '晴朗 · 机会', text: 'text-emerald-400', stroke: '#34d399', icon: Sun },
+  [Scenario.Normal]: { label: '多云 · 中性', text: 'text-slate-300', stroke: '#94a3b8', icon: CloudSun },
+  [Scenario.Divergence]: { label: '阵雨 · 信号分歧', text: 'text-amber-400', stroke: '#fbbf24', icon: CloudRain },
+  [Scenario.HighRisk]: { label: '雷暴 · 高风险', text: 'text-rose-400', stroke: '#fb7185', icon: CloudLightning },
+};
+
+const WeatherScoreWidget: React.FC<WeatherScoreWidgetProps> = ({ weather }) => {
+  const style = SCENARIO_STYLE[weather.scenario] || SCENARIO_STYLE[Scenario.Normal];
+  const Icon = style.icon;
+
+  return (
+    <div className="bg-slate-800 border border-slate-700 rounded-xl p-5 mb-8 flex flex-col md:flex-row md:items-center gap-6">
+      <div className="flex items-center gap-4 md:w-72 shrink-0">
+        <Icon className={`w-10 h-10 ${style.text}`} />
+        <div>
+          <div className="text-xs text-slate-400">综合天气评分</div>
+          <div className={`text-3xl font-bold font-mono ${style.text}`}>
+            {weather.score > 0 ? '+' : ''}{weather.score.toFixed(1)}
+          </div>
+          <div className="text-xs text-slate-400">
+            {style.label} · 有利 {(weather.favorable * 100).toFixed(0)}% / 不利 {(weather.adverse * 100).toFixed(0)}%
+          </div>
+        </div>
+      </div>
+
+      {weather.history.length > 1 && (
+        <div className="flex-1 h-20">
+          <ResponsiveContainer width="100%" height="100%">
+            <AreaChart data={weather.history}>
+              <YAxis domain={[-100, 100]} hide />
+              <ReferenceLine y={0} stroke="#475569" strokeDasharray="3 3" />
+              <Tooltip
+                contentStyle={{ backgroundColor: '#1e293b', border: '1px solid #334155', fontSize: 12 }}
+                labelFormatter={(_, payload) => payload?.[0]?.payload?.date ?? ''}
+                formatter={(value) => [Number(value).toFixed(1), '评分']}
+              />
+              <Area type="monotone" dataKey="value" stroke={style.stroke} fill={style.stroke} fillOpacity={0.15} strokeWidth={2} isAnimationActive={false} />
+            </AreaChart>
+          </ResponsiveContainer>
+        </div>
+      )}
+
+      {weather.asOf && (
+        <div className="text-xs text-slate-500 md:w-28 shrink-0 md:text-right">截至 {weather.asOf}</div>
+      )}
+    </div>
+  );
+};
+
+export default WeatherScoreWidget;
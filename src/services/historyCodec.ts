@@ -0,0 +1,32 @@
+import { MetricData, HistoryPoint, CompactHistory } from '../types';
+
+// 紧凑格式的 MIME 类型，与后端 history_codec.py 保持一致
+export const COMPACT_JSON_MIMETYPE = 'application/vnd.nws.compact+json';
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// 将列式历史（起始日期 + 日期差分 + 数值）还原为 {date, value} 数组
+export const decodeHistory = (columns: CompactHistory): HistoryPoint[] => {
+  if (!columns || !columns.start) return [];
+
+  const [y, m, d] = columns.start.split('-').map(Number);
+  let current = Date.UTC(y, m - 1, d);
+  const history: HistoryPoint[] = new Array(columns.values.length);
+
+  for (let i = 0; i < columns.values.length; i++) {
+    current += columns.deltas[i] * DAY_MS;
+    history[i] = {
+      date: new Date(current).toISOString().slice(0, 10),
+      value: columns.values[i],
+    };
+  }
+  return history;
+};
+
+// 兼容两种格式：history 已是数组时原样返回
+export const decodeDashboard = (items: Array<Omit<MetricData, 'history'> & { history: HistoryPoint[] | CompactHistory }>): MetricData[] => {
+  return items.map(item => ({
+    ...item,
+    history: Array.isArray(item.history) ? item.history : decodeHistory(item.history),
+  })) as MetricData[];
+};
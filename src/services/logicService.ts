@@ -1,15 +1,52 @@
-import { MetricData, StatusColor, Scenario } from '../types';
+import { MetricData, StatusColor, Scenario, ModuleWeather } from '../types';
+import { decodeDashboard, COMPACT_JSON_MIMETYPE } from './historyCodec';
 
 // The frontend now simply calls the Python Backend
 const BACKEND_URL = 'http://localhost:5000/api/dashboard';
+const STREAM_URL = 'http://localhost:5000/api/stream';
+const WEATHER_URL = 'http://localhost:5000/api/weather';
+
+// 订阅指标更新推送（SSE），后端每次数据更新提交后推送一次，返回取消订阅函数
+export const subscribeToUpdates = (module: string, onUpdate: () => void): (() => void) => {
+  if (typeof EventSource === 'undefined') return () => {};
+  const source = new EventSource(`${STREAM_URL}?module=${encodeURIComponent(module)}`);
+  // 每次（重新）连接都会先收到 hello；服务重启或断线期间快照已更新时，版本与上次不同，需要补拉
+  let lastVersion: number | null = null;
+  const track = (event: Event, notify: boolean) => {
+    const version = JSON.parse((event as MessageEvent).data).version;
+    if (notify && lastVersion !== null && version !== lastVersion) onUpdate();
+    lastVersion = version;
+  };
+  source.addEventListener('hello', (event) => track(event, true));
+  source.addEventListener('update', (event) => {
+    track(event, false);
+    onUpdate();
+  });
+  return () => source.close();
+};
+
+// 模块综合评分由后端随快照预先计算，前端无需再逐个汇总指标状态
+export const fetchModuleWeather = async (module: string): Promise<ModuleWeather | null> => {
+  try {
+    const response = await fetch(`${WEATHER_URL}?module=${encodeURIComponent(module)}`);
+    if (!response.ok) {
+      throw new Error(`Backend API Error: ${response.statusText}`);
+    }
+    return await response.json();
+  } catch (error) {
+    console.error("Failed to fetch module weather", error);
+    return null;
+  }
+};
 
 export const generateDashboardData = async (scenario: Scenario = Scenario.Normal): Promise<MetricData[]> => {
   try {
-    const response = await fetch(BACKEND_URL);
+    // 请求紧凑列式格式，体积更小，解码后与原格式一致
+    const response = await fetch(BACKEND_URL, { headers: { Accept: COMPACT_JSON_MIMETYPE } });
     if (!response.ok) {
       throw new Error(`Backend API Error: ${response.statusText}`);
     }
-    const data: MetricData[] = await response.json();
+    const data: MetricData[] = decodeDashboard(await response.json());
     
     // Map backend string colors to Enum if necessary, though strings usually work fine in JS/TS if they match.
     // Ensure the shape matches exactly what UI expects.
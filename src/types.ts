@@ -5,6 +5,32 @@ export enum StatusColor {
   Neutral = 'neutral', // Grey
 }
 
+export interface HistoryPoint {
+  date: string;
+  value: number;
+}
+
+// 紧凑列式历史格式 (?format=compact)
+export interface CompactHistory {
+  start: string | null;  // 起始日期 YYYY-MM-DD
+  deltas: number[];      // 相邻点的天数差分，首项为 0
+  values: number[];      // 固定精度数值
+}
+
+// 当前值相对历史窗口的滚动统计
+export interface WindowStats {
+  zscore: number;
+  percentile: number; // 0-100
+  min: number;
+  max: number;
+  count: number;
+}
+
+export interface MetricStats {
+  asOf: string;
+  windows: { [window: string]: WindowStats | null }; // '1y' | '5y' | '10y'
+}
+
 export interface MetricData {
   id: string;
   name: string;
@@ -14,7 +40,8 @@ export interface MetricData {
   description: string;
   statusText: string;
   statusColor: StatusColor;
-  history: { date: string; value: number }[]; // For sparkline
+  history: HistoryPoint[]; // For sparkline
+  stats?: MetricStats | null; // 历史分位 / z-score
   // Additional fields for complex logic
   secondaryValue?: number; // e.g., for Ratio or Comparison
   formula?: string;
@@ -37,6 +64,25 @@ export enum Scenario {
   Divergence = 'DIVERGENCE',
 }
 
+// 模块综合天气评分 (/api/weather)，-100（全部危险）到 100（全部有利）
+export interface WeatherComponent {
+  id: string;
+  statusColor: StatusColor;
+  weight: number;
+  contribution: number; // 对总分的贡献
+}
+
+export interface ModuleWeather {
+  module: string;
+  score: number;
+  scenario: Scenario;
+  favorable: number; // 有利信号的权重占比
+  adverse: number;   // 不利信号的权重占比
+  asOf: string | null;
+  components: WeatherComponent[];
+  history: HistoryPoint[];
+}
+
 // ========== 用户认证相关类型 ==========
 
 export interface User {
@@ -18,20 +18,19 @@ fi
 if [ $? -eq 0 ]; then
     echo "[$(date)] ✓ Pull successful"
     
-    # 检查数据库文件是否有变化
-    if git diff --name-only HEAD@{1} HEAD | grep -q "backend/macro_weather_v3.db"; then
-        echo "[$(date)] Database updated, restarting service..."
-        
-        # 重启后端服务以加载新数据
-        sudo systemctl restart nasdaq-backend
-        
-        if [ $? -eq 0 ]; then
-            echo "[$(date)] ✓ Backend restarted successfully"
-        else
-            echo "[$(date)] ✗ Failed to restart backend"
-        fi
+    # 应用新的增量数据包（只传输 KB 级的 delta，不再拉取整个数据库）
+    cd backend
+    ./venv/bin/python scripts/apply_deltas.py
+    APPLY_STATUS=$?
+    cd ..
+    
+    if [ $APPLY_STATUS -eq 0 ]; then
+        # 应用 delta 时已发布新快照，各 worker 按文件标识自动重新映射，无需重启服务
+        echo "[$(date)] ✓ Deltas applied, snapshot republished"
+    elif [ $APPLY_STATUS -eq 2 ]; then
+        echo "[$(date)] No new data deltas"
     else
-        echo "[$(date)] No database changes, skip restart"
+        echo "[$(date)] ✗ Failed to apply data deltas"
     fi
 else
     echo "[$(date)] ✗ Git pull failed from all sources"